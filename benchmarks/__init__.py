@@ -0,0 +1 @@
+"""Benchmarks for the AI Agent, run against a local mock server."""
@@ -0,0 +1,65 @@
+"""Measure AIAgent.chat throughput as concurrency grows.
+
+Run with ``python -m benchmarks.bench_concurrency``. Each session gets its
+own ``AIAgent`` and all of them share one event loop, so throughput should
+scale roughly linearly with concurrency until the mock server saturates.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+from src.ai_agent.core.agent import AIAgent
+from src.ai_agent.core.config import Settings
+from src.ai_agent.providers.client_registry import shutdown_clients
+
+from .mock_server import MockOpenAIServer
+
+
+async def _run_level(base_url: str, concurrency: int,
+                     requests_per_session: int) -> float:
+    settings = Settings(
+        OPENAI_API_KEY="bench-key",
+        OPENAI_BASE_URL=base_url,
+        LOG_LEVEL="WARNING",
+    )
+    agents = [AIAgent(settings=settings) for _ in range(concurrency)]
+
+    async def session(agent: AIAgent) -> None:
+        for i in range(requests_per_session):
+            await agent.chat(f"Benchmark message {i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(agent) for agent in agents))
+    elapsed = time.perf_counter() - start
+
+    await shutdown_clients()
+    return concurrency * requests_per_session / elapsed
+
+
+def main(argv: List[str] = None) -> None:
+    """Run the concurrency sweep and print a throughput table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Mock server latency per request (s)")
+    parser.add_argument("--requests", type=int, default=5,
+                        help="Requests per session")
+    parser.add_argument("--levels", default="1,2,4,8,16,32",
+                        help="Comma-separated concurrency levels")
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.levels.split(",")]
+    with MockOpenAIServer(latency=args.latency) as server:
+        print(f"{'concurrency':>12} {'req/s':>10} {'speedup':>8}")
+        baseline = None
+        for level in levels:
+            rps = asyncio.run(
+                _run_level(server.base_url, level, args.requests)
+            )
+            baseline = baseline or rps
+            print(f"{level:>12} {rps:>10.1f} {rps / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Load-test ``ai-agent serve`` against a local mock provider.
+
+Run with ``python -m benchmarks.bench_server``. The agent server runs in
+this process on an ephemeral port with the OpenAI provider pointed at the
+mock server; each simulated client owns one session and sends its chat
+requests back to back over a keep-alive connection.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import h11
+
+from src.ai_agent.core.config import Settings
+from src.ai_agent.server.app import AgentServer
+
+from .mock_server import MockOpenAIServer
+from .suite import percentile
+
+
+class _Client:
+    """Minimal keep-alive HTTP/1.1 client, so the client side is cheap."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._conn = h11.Connection(h11.CLIENT)
+
+    async def request(self, method: str, path: str,
+                      payload: Optional[Dict[str, Any]] = None
+                      ) -> Tuple[int, Dict[str, Any]]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        assert self._reader is not None
+        body = json.dumps(payload).encode() if payload is not None else b""
+        headers = [("Host", self.host), ("Content-Length", str(len(body)))]
+        if body:
+            headers.append(("Content-Type", "application/json"))
+        self._writer.write(self._conn.send(h11.Request(
+            method=method, target=path, headers=headers
+        )))
+        self._writer.write(self._conn.send(h11.Data(data=body)))
+        self._writer.write(self._conn.send(h11.EndOfMessage()))
+        await self._writer.drain()
+
+        status = 0
+        chunks: List[bytes] = []
+        while True:
+            event = self._conn.next_event()
+            if event is h11.NEED_DATA:
+                self._conn.receive_data(await self._reader.read(65536))
+            elif isinstance(event, h11.Response):
+                status = event.status_code
+            elif isinstance(event, h11.Data):
+                chunks.append(event.data)
+            elif isinstance(event, h11.EndOfMessage):
+                break
+            else:
+                raise ConnectionError("Connection closed by the server")
+        self._conn.start_next_cycle()
+        return status, json.loads(b"".join(chunks) or b"{}")
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+async def _run(base_url: str, clients: int, requests_per_client: int,
+               max_sessions: int) -> None:
+    settings = Settings(
+        OPENAI_API_KEY="bench-key",
+        OPENAI_BASE_URL=base_url,
+        PROVIDER_VALIDATION="skip",
+        LOG_LEVEL="WARNING",
+    )
+    server = AgentServer(settings, host="127.0.0.1", port=0,
+                         max_sessions=max_sessions)
+    await server.start()
+    latencies: List[float] = []
+    errors = 0
+
+    async def client(index: int) -> None:
+        nonlocal errors
+        http = _Client(server.host, server.port)
+        try:
+            for i in range(requests_per_client):
+                start = time.perf_counter()
+                status, _ = await http.request(
+                    "POST", f"/sessions/client-{index}/chat",
+                    {"message": f"Load test message {i}"},
+                )
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors += 1
+        finally:
+            http.close()
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(client(i) for i in range(clients)))
+        elapsed = time.perf_counter() - start
+        probe = _Client(server.host, server.port)
+        _, health = await probe.request("GET", "/health")
+        probe.close()
+    finally:
+        await server.shutdown()
+
+    total = clients * requests_per_client
+    print(f"{'clients':>10} {'requests':>10} {'req/s':>10} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'sessions':>9}")
+    print(f"{clients:>10} {total:>10} {total / elapsed:>10.1f} "
+          f"{percentile(latencies, 0.5) * 1000:>8.1f} "
+          f"{percentile(latencies, 0.99) * 1000:>8.1f} "
+          f"{errors:>7} {health['sessions']:>9}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the load test and print throughput and latency."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Mock server latency per request (s)")
+    parser.add_argument("--clients", type=int, default=64,
+                        help="Concurrent clients, one session each")
+    parser.add_argument("--requests", type=int, default=10,
+                        help="Requests per client")
+    parser.add_argument("--max-sessions", type=int, default=1000,
+                        help="Server session limit")
+    args = parser.parse_args(argv)
+
+    with MockOpenAIServer(latency=args.latency) as mock:
+        asyncio.run(_run(mock.base_url, args.clients, args.requests,
+                         args.max_sessions))
+
+
+if __name__ == "__main__":
+    main()
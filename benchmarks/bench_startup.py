@@ -0,0 +1,101 @@
+"""Measure CLI import time and AIAgent construction time.
+
+Run with ``python -m benchmarks.bench_startup``. Import times come from
+``python -X importtime`` in a fresh interpreter per module. The mock
+server adds its latency to the model listing used for validation,
+standing in for the network round trip to the real API.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from src.ai_agent.core.agent import AIAgent
+from src.ai_agent.core.config import Settings
+from src.ai_agent.providers.validation_cache import clear_validation_caches
+
+from .mock_server import MockOpenAIServer
+
+
+# Entry points of the CLI commands, cheapest first
+STARTUP_MODULES = [
+    "src.ai_agent.cli.main",
+    "src.ai_agent.storage.conversation_log",
+    "src.ai_agent.core.agent",
+]
+
+
+def import_profile(module: str) -> Dict[str, float]:
+    """Cumulative import seconds of every module loaded by ``module``.
+
+    Runs ``python -X importtime -c "import <module>"`` so the result is
+    not skewed by modules this process already imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    profile: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        profile[name.strip()] = int(cumulative) / 1e6
+    return profile
+
+
+def _construct_ms(base_url: str, mode: str, rounds: int,
+                  cached: bool) -> List[float]:
+    settings = Settings(
+        OPENAI_API_KEY="bench-key",
+        OPENAI_BASE_URL=base_url,
+        PROVIDER_VALIDATION=mode,
+        LOG_LEVEL="WARNING",
+    )
+    timings = []
+    for _ in range(rounds):
+        if not cached:
+            clear_validation_caches()
+        start = time.perf_counter()
+        AIAgent(settings=settings)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main(argv: List[str] = None) -> None:
+    """Print median construction time per validation mode."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.2,
+                        help="Mock server latency per request (s)")
+    parser.add_argument("--rounds", type=int, default=10,
+                        help="Constructions per mode")
+    args = parser.parse_args(argv)
+
+    cases = [
+        ("eager (uncached)", "eager", False),
+        ("eager (cached)", "eager", True),
+        ("lazy", "lazy", False),
+        ("skip", "skip", False),
+    ]
+    print(f"{'module':>38} {'import ms':>10} {'modules':>8}")
+    for module in STARTUP_MODULES:
+        profile = import_profile(module)
+        print(f"{module:>38} {profile[module] * 1000:>10.2f} "
+              f"{len(profile):>8}")
+    print()
+
+    with MockOpenAIServer(latency=args.latency) as server:
+        print(f"{'mode':>18} {'median ms':>10} {'max ms':>8}")
+        for label, mode, cached in cases:
+            timings = _construct_ms(server.base_url, mode, args.rounds,
+                                    cached)
+            print(f"{label:>18} {statistics.median(timings):>10.2f} "
+                  f"{max(timings):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Local mock server speaking the OpenAI chat-completions protocol.
+
+Chat completions are answered as JSON or, with ``"stream": true``, as
+server-sent events like the real API. Latency, jitter and the rate of
+injected errors are configurable, so benchmarks can exercise the real
+HTTP path of the providers without network access or API keys.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Set
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """Request handler answering /v1/models and /v1/chat/completions."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid delayed-ACK stalls
+    disable_nagle_algorithm = True
+    server: "MockOpenAIServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Silence per-request logging."""
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_event(self, payload: Any) -> None:
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        body = f"data: {data}\n\n".encode("utf-8")
+        # One HTTP chunk per event, so each is flushed as it is produced
+        self.wfile.write(f"{len(body):x}\r\n".encode() + body + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, request: Dict[str, Any], content: str,
+                usage: Dict[str, Any]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        chunk = {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "mock-model"),
+        }
+        tokens = re.findall(r"\s*\S+", content)
+        for i, token in enumerate(tokens):
+            if i and self.server.token_delay:
+                time.sleep(self.server.token_delay)
+            delta = {"content": token}
+            if i == 0:
+                delta["role"] = "assistant"
+            self._send_event(dict(chunk, choices=[{
+                "index": 0, "delta": delta, "finish_reason": None,
+            }]))
+        self._send_event(dict(chunk, choices=[{
+            "index": 0, "delta": {}, "finish_reason": "stop",
+        }]))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self._send_event(dict(chunk, choices=[], usage=usage))
+        self._send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self) -> None:
+        """Answer the model listing used for config validation."""
+        if self.path.rstrip("/").endswith("/models"):
+            time.sleep(self.server.delay())
+            self._send_json(200, {
+                "object": "list",
+                "data": [{"id": "mock-model", "object": "model",
+                          "created": 0, "owned_by": "mock"}],
+            })
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self) -> None:
+        """Answer a chat completion after the configured latency."""
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+
+        time.sleep(self.server.delay())
+        self.server.record_request()
+
+        status = self.server.next_failure()
+        if status is not None:
+            self._send_json(status, {"error": {
+                "message": f"Injected failure ({status})",
+                "type": "server_error", "code": None,
+            }})
+            return
+
+        prompt_tokens = sum(
+            len(str(m.get("content", "")).split())
+            for m in request.get("messages", [])
+        )
+        cached_tokens = self.server.cached_prompt_tokens(
+            request.get("messages", [])
+        )
+        content = self.server.reply
+        completion_tokens = len(content.split())
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+        if request.get("stream"):
+            self._stream(request, content, usage)
+            return
+
+        self._send_json(200, {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        })
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a configurable per-request latency.
+
+    Each request waits ``latency`` seconds plus a uniform random
+    ``jitter`` either way; streamed replies also wait ``token_delay``
+    between tokens. A fraction ``error_rate`` of chat requests fails
+    with ``error_status``. ``seed`` makes jitter and errors repeatable.
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.05,
+                 reply: str = "Hello from the mock server.",
+                 jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 500, token_delay: float = 0.0,
+                 seed: Optional[int] = None):
+        super().__init__((host, port), MockOpenAIHandler)
+        self.latency = latency
+        self.reply = reply
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.token_delay = token_delay
+        self._random = random.Random(seed)
+        self.request_count = 0
+        self.error_count = 0
+        self._failures: List[int] = []
+        # Hashes of every message-list prefix seen, for prompt caching
+        self._prefixes: Set[str] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to hand to the OpenAI client."""
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}/v1"
+
+    def record_request(self) -> None:
+        """Count a served chat completion."""
+        with self._lock:
+            self.request_count += 1
+
+    def cached_prompt_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        """Tokens of the longest message prefix seen in earlier requests.
+
+        Simulates provider-side prefix caching at message granularity.
+        """
+        digest = hashlib.sha256()
+        prefixes = []
+        tokens = cached = 0
+        with self._lock:
+            for message in messages:
+                digest.update(json.dumps(message, sort_keys=True).encode())
+                tokens += len(str(message.get("content", "")).split())
+                prefix = digest.hexdigest()
+                if prefix in self._prefixes:
+                    cached = tokens
+                prefixes.append(prefix)
+            self._prefixes.update(prefixes)
+        return cached
+
+    def delay(self) -> float:
+        """Seconds the next request waits before it is answered."""
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            offset = self._random.uniform(-self.jitter, self.jitter)
+        return max(0.0, self.latency + offset)
+
+    def fail_next(self, count: int = 1, status: int = 500) -> None:
+        """Answer the next ``count`` chat requests with an error status."""
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def next_failure(self) -> Optional[int]:
+        """Status of the next failure, queued or drawn at random, if any."""
+        with self._lock:
+            if self._failures:
+                status: Optional[int] = self._failures.pop(0)
+            elif self.error_rate and self._random.random() < self.error_rate:
+                status = self.error_status
+            else:
+                return None
+            self.error_count += 1
+            return status
+
+    def start(self) -> "MockOpenAIServer":
+        """Serve in a background thread."""
+        self._thread = threading.Thread(
+            target=self.serve_forever, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and release the socket."""
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
@@ -0,0 +1,290 @@
+"""Run the benchmark suite and write the results as JSON.
+
+Run with ``python -m benchmarks.suite --output bench.json``. Every agent
+talks to the bundled mock server over real HTTP, so the numbers cover
+the OpenAI client, retries and the agent itself but not the network.
+Pass ``--compare`` with an earlier results file to print the change of
+each metric; the exit status is 1 when one got worse by more than
+``--max-regression``.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.ai_agent.core.agent import AIAgent
+from src.ai_agent.core.config import Settings
+from src.ai_agent.providers.client_registry import shutdown_clients
+
+from .bench_startup import import_profile
+from .mock_server import MockOpenAIServer
+
+# Metrics where a larger value is an improvement; all others are costs
+HIGHER_IS_BETTER = {"chat_throughput_rps"}
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of ``samples``."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _settings(base_url: str) -> Settings:
+    return Settings(
+        OPENAI_API_KEY="bench-key",
+        OPENAI_BASE_URL=base_url,
+        PROVIDER_VALIDATION="skip",
+        LOG_LEVEL="CRITICAL",
+    )
+
+
+async def _bench_chat(base_url: str, sessions: int,
+                      requests: int) -> Dict[str, float]:
+    """Throughput and latency of concurrent ``AIAgent.chat`` sessions."""
+    settings = _settings(base_url)
+    agents = [AIAgent(settings=settings) for _ in range(sessions)]
+    latencies: List[float] = []
+    errors = 0
+
+    async def session(agent: AIAgent) -> None:
+        nonlocal errors
+        for i in range(requests):
+            start = time.perf_counter()
+            try:
+                await agent.chat(f"Benchmark message {i}")
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(agent) for agent in agents))
+    elapsed = time.perf_counter() - start
+    await shutdown_clients()
+
+    return {
+        "chat_throughput_rps": len(latencies) / elapsed,
+        "chat_latency_p50_ms": percentile(latencies, 0.5) * 1000,
+        "chat_latency_p99_ms": percentile(latencies, 0.99) * 1000,
+        "chat_error_rate": errors / (sessions * requests),
+    }
+
+
+async def _bench_stream(base_url: str, sessions: int,
+                        requests: int) -> Dict[str, float]:
+    """Time to first token and total time of ``AIAgent.chat_stream``."""
+    settings = _settings(base_url)
+    agents = [AIAgent(settings=settings) for _ in range(sessions)]
+    first_tokens: List[float] = []
+    totals: List[float] = []
+
+    async def session(agent: AIAgent) -> None:
+        for i in range(requests):
+            start = time.perf_counter()
+            try:
+                async for _ in agent.chat_stream(
+                    f"Benchmark message {i}",
+                    on_first_token=first_tokens.append,
+                ):
+                    pass
+            except Exception:
+                continue
+            totals.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(session(agent) for agent in agents))
+    await shutdown_clients()
+
+    return {
+        "stream_ttft_p50_ms": percentile(first_tokens, 0.5) * 1000,
+        "stream_ttft_p99_ms": percentile(first_tokens, 0.99) * 1000,
+        "stream_latency_p50_ms": percentile(totals, 0.5) * 1000,
+    }
+
+
+async def _bench_memory(base_url: str, sessions: int,
+                        turns: int) -> Dict[str, float]:
+    """Python heap held per session after ``turns`` chat turns each.
+
+    Shared state (the HTTP client, caches) is spread over the sessions,
+    so use enough of them for it not to dominate.
+    """
+    settings = _settings(base_url)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        agents = [AIAgent(settings=settings) for _ in range(sessions)]
+        for i in range(turns):
+            await asyncio.gather(*(
+                agent.chat(f"Memory benchmark message {i}")
+                for agent in agents
+            ))
+        gc.collect()
+        held = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    await shutdown_clients()
+    return {"memory_per_session_kb": held / sessions / 1024}
+
+
+def _bench_startup(base_url: str, rounds: int) -> Dict[str, float]:
+    """Import time of the CLI and agent, and agent construction time."""
+    settings = _settings(base_url)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        AIAgent(settings=settings)
+        timings.append(time.perf_counter() - start)
+    return {
+        "import_cli_ms":
+            import_profile("src.ai_agent.cli.main")[
+                "src.ai_agent.cli.main"] * 1000,
+        "import_agent_ms":
+            import_profile("src.ai_agent.core.agent")[
+                "src.ai_agent.core.agent"] * 1000,
+        "agent_construct_ms": statistics.median(timings) * 1000,
+    }
+
+
+def _commit() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run every benchmark against one mock server and collect results."""
+    metrics: Dict[str, float] = {}
+    with MockOpenAIServer(latency=args.latency, jitter=args.jitter,
+                          error_rate=args.error_rate,
+                          token_delay=args.token_delay,
+                          seed=args.seed) as server:
+        metrics.update(asyncio.run(
+            _bench_chat(server.base_url, args.sessions, args.requests)
+        ))
+        metrics.update(asyncio.run(
+            _bench_stream(server.base_url, args.sessions, args.requests)
+        ))
+        metrics.update(asyncio.run(
+            _bench_memory(server.base_url, args.memory_sessions,
+                          args.memory_turns)
+        ))
+        if not args.skip_startup:
+            metrics.update(_bench_startup(server.base_url,
+                                          args.startup_rounds))
+
+    config = {key: value for key, value in vars(args).items()
+              if key not in ("output", "compare", "max_regression")}
+    return {
+        "commit": _commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "metrics": metrics,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any],
+            max_regression: float) -> Tuple[List[str], List[str]]:
+    """Report lines per shared metric and the metrics that regressed.
+
+    A metric regresses when it got worse by more than ``max_regression``
+    (a fraction) relative to the baseline.
+    """
+    lines = []
+    regressed = []
+    old_metrics = baseline.get("metrics", {})
+    for name, new in results["metrics"].items():
+        old = old_metrics.get(name)
+        if old is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        worse = -change if name in HIGHER_IS_BETTER else change
+        flag = ""
+        if worse > max_regression:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        lines.append(f"{name:>24} {old:>12.2f} {new:>12.2f} "
+                     f"{change:>+8.1%}{flag}")
+    return lines, regressed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the suite, write the JSON results and compare them."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", default="bench.json",
+                        help="File to write the JSON results to")
+    parser.add_argument("--compare", default=None,
+                        help="Earlier results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.1,
+                        help="Tolerated relative change for the worse")
+    parser.add_argument("--latency", type=float, default=0.02,
+                        help="Mock server latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.005,
+                        help="Uniform random latency variation (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="Fraction of requests failing with a 500")
+    parser.add_argument("--token-delay", type=float, default=0.001,
+                        help="Delay between streamed tokens (s)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed for jitter and injected errors")
+    parser.add_argument("--sessions", type=int, default=32,
+                        help="Concurrent agent sessions")
+    parser.add_argument("--requests", type=int, default=10,
+                        help="Requests per session")
+    parser.add_argument("--memory-sessions", type=int, default=200,
+                        help="Sessions for the memory benchmark")
+    parser.add_argument("--memory-turns", type=int, default=5,
+                        help="Chat turns per session for memory")
+    parser.add_argument("--startup-rounds", type=int, default=10,
+                        help="Agent constructions for startup time")
+    parser.add_argument("--skip-startup", action="store_true",
+                        help="Skip the import and construction timings")
+    args = parser.parse_args(argv)
+
+    # Injected errors would log every retry; keep the timings clean
+    logging.disable(logging.CRITICAL)
+    try:
+        results = run_suite(args)
+    finally:
+        logging.disable(logging.NOTSET)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+
+    for name, value in results["metrics"].items():
+        print(f"{name:>24} {value:>12.2f}")
+    print(f"→ {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        lines, regressed = compare(results, baseline, args.max_regression)
+        print(f"\n{'metric':>24} {'baseline':>12} {'current':>12} "
+              f"{'change':>8}")
+        print("\n".join(lines))
+        if regressed:
+            print(f"\n{len(regressed)} metrics regressed by more than "
+                  f"{args.max_regression:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -31,10 +31,17 @@ setup(
         "openai>=1.0.0",
         "python-dotenv>=0.19.0",
         "click>=8.0.0",
+        "h11>=0.14.0",
         "pydantic>=2.0.0",
         "rich>=13.0.0",
     ],
     extras_require={
+        "tokens": [
+            "tiktoken>=0.5.0",
+        ],
+        "semantic": [
+            "numpy>=1.24.0",
+        ],
         "dev": [
             "pytest>=7.0.0",
             "pytest-cov>=4.0.0",
@@ -1,12 +1,39 @@
 """AI Agent - A simple, extensible conversational AI assistant."""
 
-from src.ai_agent.core.agent import AIAgent
-from src.ai_agent.core.config import Settings
-from src.ai_agent.core.exceptions import AIAgentException
-from src.ai_agent.providers.base_provider import BaseProvider
-from src.ai_agent.providers.openai_provider import OpenAIProvider
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from src.ai_agent.core.agent import AIAgent
+    from src.ai_agent.core.config import Settings
+    from src.ai_agent.core.exceptions import AIAgentException
+    from src.ai_agent.providers.base_provider import BaseProvider
+    from src.ai_agent.providers.openai_provider import OpenAIProvider
 
 __version__ = "0.1.0"
 __all__ = ["AIAgent", "Settings",
            "AIAgentException", "BaseProvider",
            "OpenAIProvider"]
+
+# Imported on first access, so that importing any submodule (the CLI in
+# particular) does not load the agent, openai and pydantic-settings
+_LAZY_IMPORTS = {
+    "AIAgent": "src.ai_agent.core.agent",
+    "Settings": "src.ai_agent.core.config",
+    "AIAgentException": "src.ai_agent.core.exceptions",
+    "BaseProvider": "src.ai_agent.providers.base_provider",
+    "OpenAIProvider": "src.ai_agent.providers.openai_provider",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_IMPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,394 @@
+import asyncio
+import heapq
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import (
+    Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+)
+
+from pydantic import BaseModel
+
+from src.ai_agent.core.agent import AIAgent
+from src.ai_agent.core.config import Settings
+from src.ai_agent.core.exceptions import AIAgentException
+from src.ai_agent.providers.base_provider import BatchResult, Message
+from src.ai_agent.providers.client_registry import shutdown_clients
+from src.ai_agent.providers.rate_limiter import (
+    SharedTokenBucket, TokenBucket, set_shared_budget
+)
+from src.ai_agent.providers.response_cache import make_request_key
+from src.ai_agent.storage.journal import Journal
+from src.ai_agent.utils.files import atomic_write
+
+MANIFEST = "manifest.json"
+
+
+def iter_prompts(filepath: str, prompt_field: str = "prompt",
+                 id_field: str = "id", shard: int = 0,
+                 shards: int = 1) -> Iterator[Tuple[int, Any, str]]:
+    """Yield ``(index, id, prompt)`` for each prompt of a JSONL file.
+
+    Each non-empty line is a JSON object with the prompt in
+    ``prompt_field`` or a plain JSON string; the index counts non-empty
+    lines. With ``shards`` > 1 only every ``shards``-th prompt starting
+    at ``shard`` is parsed and yielded.
+    """
+    index = 0
+    with open(filepath, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if index % shards == shard:
+                record = json.loads(line)
+                if isinstance(record, dict):
+                    record_id = record.get(id_field, index)
+                    prompt = record.get(prompt_field, "")
+                else:
+                    record_id = index
+                    prompt = record
+                yield index, record_id, (
+                    prompt if isinstance(prompt, str) else ""
+                )
+            index += 1
+
+
+def request_key(agent: AIAgent, record_id: Any, prompt: str) -> str:
+    """Deterministic key of one batch input answered by ``agent``.
+
+    The key covers the input id and prompt and everything about the
+    agent that changes the answer (model, system prompt, temperature and
+    max tokens), so a checkpointed answer is only reused for the same
+    request.
+    """
+    return make_request_key(
+        agent.settings.openai_model,
+        [Message(role="system", content=agent.system_prompt),
+         Message(role="user", content=prompt.strip())],
+        max_tokens=agent.settings.openai_max_tokens,
+        temperature=agent.settings.openai_temperature,
+        input_id=record_id,
+    )
+
+
+def result_record(record_id: Any, index: int, result: BatchResult,
+                  key: Optional[str] = None) -> Dict[str, Any]:
+    """Output line of one batch result."""
+    record: Dict[str, Any] = {"id": record_id, "index": index}
+    if key is not None:
+        record["key"] = key
+    if result.response is not None:
+        record["response"] = result.response.content
+        record["usage"] = result.response.usage
+    else:
+        record["error"] = result.error
+    return record
+
+
+class ShardJob(BaseModel):
+    """Work of one worker process: every ``shards``-th prompt."""
+
+    input_file: str
+    shard_file: str
+    shard: int
+    shards: int
+    prompt_field: str = "prompt"
+    id_field: str = "id"
+    concurrency: int = 8
+    # Settings fields or aliases overriding the environment
+    settings: Dict[str, Any] = {}
+
+
+def _compact_shard(path: Path) -> None:
+    """Rewrite a shard file in index order, keeping each last record."""
+    offsets: Dict[int, int] = {}
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            offsets[json.loads(line)["index"]] = offset
+            offset += len(line)
+
+    def write(out: TextIO) -> None:
+        with open(path, "rb") as f:
+            for index in sorted(offsets):
+                f.seek(offsets[index])
+                out.write(f.readline().decode("utf-8"))
+
+    atomic_write(path, write)
+
+
+# Worker process state, set by the pool initializer
+_answered: Optional[Any] = None
+_skipped: Optional[Any] = None
+
+
+def _init_worker(requests: Optional[TokenBucket],
+                 tokens: Optional[TokenBucket], answered: Any,
+                 skipped: Any) -> None:
+    global _answered, _skipped
+    set_shared_budget(requests, tokens)
+    _answered = answered
+    _skipped = skipped
+
+
+def _tick(counter: Optional[Any], count: int = 1) -> None:
+    if counter is not None:
+        with counter.get_lock():
+            counter.value += count
+
+
+async def _answer_shard(job: ShardJob, journal: Journal) -> Dict[str, int]:
+    agent = AIAgent(settings=Settings(**job.settings))
+    # Key and success of the last record of each index; a later record
+    # of an index supersedes earlier ones
+    previous: Dict[int, Tuple[Optional[str], bool]] = {}
+    last_index = -1
+    in_order = True
+    for record in journal.records():
+        index = record["index"]
+        in_order = in_order and index > last_index
+        last_index = index
+        previous[index] = (record.get("key"), "response" in record)
+
+    todo = []
+    skipped = retried = 0
+    for index, record_id, prompt in iter_prompts(
+        job.input_file, job.prompt_field, job.id_field, job.shard,
+        job.shards,
+    ):
+        key = request_key(agent, record_id, prompt)
+        done = previous.get(index)
+        if done is not None and done == (key, True):
+            skipped += 1
+            continue
+        if done is not None:
+            # Failed, or answered for a request that has since changed
+            retried += 1
+        todo.append((index, record_id, prompt, key))
+    _tick(_skipped, skipped)
+
+    succeeded = failed = 0
+    try:
+        async for result in agent.iter_chat_many(
+            [prompt for _, _, prompt, _ in todo],
+            concurrency=job.concurrency, ordered=True,
+        ):
+            index, record_id, _, key = todo[result.index]
+            if result.ok:
+                succeeded += 1
+            else:
+                failed += 1
+            journal.write(result_record(record_id, index, result, key))
+            _tick(_answered)
+    finally:
+        await shutdown_clients()
+    if retried or not in_order:
+        journal.close()
+        _compact_shard(Path(journal.filepath))
+    return {"succeeded": succeeded, "failed": failed, "skipped": skipped,
+            "retried": retried}
+
+
+def run_shard(job: ShardJob) -> Dict[str, int]:
+    """Answer the prompts of one shard not answered by an earlier run.
+
+    Results are appended to ``job.shard_file`` as they arrive, so the
+    file is always a checkpoint of the shard. A prompt is skipped when
+    its last result succeeded for the same request key; failed prompts,
+    prompts in flight when a run stopped and prompts whose request
+    changed are answered again. The file is left in input order.
+    """
+    journal = Journal(job.shard_file)
+    journal.open()
+    try:
+        return asyncio.run(_answer_shard(job, journal))
+    finally:
+        journal.close()
+
+
+def _iter_shard(path: Path) -> Iterator[Tuple[int, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)["index"], line
+
+
+def merge_shards(shard_files: List[Path], output_file: str) -> int:
+    """Merge shard files, each in input order, into one ordered file."""
+    count = 0
+
+    def write(out: TextIO) -> None:
+        nonlocal count
+        for _, line in heapq.merge(*(_iter_shard(path)
+                                     for path in shard_files)):
+            out.write(line)
+            count += 1
+
+    atomic_write(output_file, write)
+    return count
+
+
+class BatchProgress:
+    """Counts, throughput and ETA of a running batch.
+
+    Throughput only counts prompts answered by this run, so prompts
+    skipped as answered by an earlier run do not make the ETA
+    optimistic.
+    """
+
+    def __init__(self, total: int):
+        self.total = total
+        self.skipped = 0
+        self.answered = 0
+        self._start = time.monotonic()
+
+    @property
+    def completed(self) -> int:
+        """Prompts answered by this run or an earlier one."""
+        return self.skipped + self.answered
+
+    @property
+    def remaining(self) -> int:
+        """Prompts still to be answered."""
+        return max(self.total - self.completed, 0)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since this run started."""
+        return time.monotonic() - self._start
+
+    @property
+    def throughput(self) -> float:
+        """Prompts answered per second by this run."""
+        elapsed = self.elapsed
+        return self.answered / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Estimated seconds left, or None before the first answer."""
+        throughput = self.throughput
+        if not throughput:
+            return None
+        return self.remaining / throughput
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Progress as a plain dictionary."""
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "answered": self.answered,
+            "skipped": self.skipped,
+            "remaining": self.remaining,
+            "elapsed": self.elapsed,
+            "throughput": self.throughput,
+            "eta": self.eta,
+        }
+
+
+def _count_prompts(filepath: str) -> int:
+    with open(filepath, "rb") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def _check_manifest(parts_dir: Path, manifest: Dict[str, Any]) -> None:
+    path = parts_dir / MANIFEST
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous != manifest:
+            raise AIAgentException(
+                f"{parts_dir} holds an unfinished run with other input or "
+                f"options; delete it to start over"
+            )
+        return
+    atomic_write(path, lambda f: json.dump(manifest, f, indent=2))
+
+
+def run_batch(input_file: str, output_file: str, workers: int,
+              concurrency: int = 8, prompt_field: str = "prompt",
+              id_field: str = "id",
+              settings: Optional[Dict[str, Any]] = None,
+              requests_per_minute: Optional[int] = None,
+              tokens_per_minute: Optional[int] = None,
+              on_progress: Optional[Callable[[BatchProgress], None]] = None,
+              ) -> Dict[str, int]:
+    """Answer a JSONL file of prompts with a pool of worker processes.
+
+    Prompts are dealt round-robin to ``workers`` processes, each running
+    its own agent with ``concurrency`` requests in flight. The optional
+    requests/tokens per-minute budget is shared by all workers. Results
+    are checkpointed to ``<output_file>.parts/`` as they arrive, each
+    with the deterministic ``request_key`` of its prompt. Running the
+    same command again after a crash, deploy or quota error skips every
+    prompt already answered for the same key and sends only failed and
+    interrupted ones. Once every shard is done they are merged into
+    ``output_file`` in input order; the checkpoint is removed only when
+    every prompt succeeded. ``on_progress`` is called about once
+    a second with a ``BatchProgress``.
+    """
+    if workers < 1:
+        raise AIAgentException("At least one worker is required")
+    parts_dir = Path(f"{output_file}.parts")
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    _check_manifest(parts_dir, {
+        "input_file": os.path.abspath(input_file),
+        "input_size": os.path.getsize(input_file),
+        "workers": workers,
+        "prompt_field": prompt_field,
+        "id_field": id_field,
+    })
+    total = _count_prompts(input_file)
+    # Workers create rate limiters only when a budget is configured
+    settings = dict(settings or {})
+    if requests_per_minute:
+        settings["RATE_LIMIT_RPM"] = requests_per_minute
+    if tokens_per_minute:
+        settings["RATE_LIMIT_TPM"] = tokens_per_minute
+    shard_files = [parts_dir / f"shard-{shard:04d}.jsonl"
+                   for shard in range(workers)]
+    jobs = [
+        ShardJob(input_file=input_file, shard_file=str(shard_file),
+                 shard=shard, shards=workers, prompt_field=prompt_field,
+                 id_field=id_field, concurrency=concurrency,
+                 settings=settings)
+        for shard, shard_file in enumerate(shard_files)
+    ]
+
+    # Spawned workers do not inherit the parent's event loop or clients
+    context = multiprocessing.get_context("spawn")
+    answered = context.Value("q", 0)
+    skipped = context.Value("q", 0)
+    budget = (
+        SharedTokenBucket(requests_per_minute, context=context)
+        if requests_per_minute else None,
+        SharedTokenBucket(tokens_per_minute, context=context)
+        if tokens_per_minute else None,
+    )
+    progress = BatchProgress(total)
+    summary = {"succeeded": 0, "failed": 0, "skipped": 0, "retried": 0}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker,
+                             initargs=(*budget, answered, skipped)) as pool:
+        futures = [pool.submit(run_shard, job) for job in jobs]
+        pending = set(futures)
+        while pending:
+            finished, pending = wait(pending, timeout=1.0,
+                                     return_when=FIRST_EXCEPTION)
+            if on_progress:
+                progress.answered = answered.value
+                progress.skipped = skipped.value
+                on_progress(progress)
+            for future in finished:
+                # A worker that crashed fails the run; shards stay resumable
+                for key, value in future.result().items():
+                    summary[key] += value
+
+    summary["written"] = merge_shards(shard_files, output_file)
+    # Keep the checkpoint while prompts failed, so that a rerun after
+    # quota errors only sends those again
+    if not summary["failed"]:
+        shutil.rmtree(parts_dir)
+    return summary
@@ -1,21 +1,24 @@
 import asyncio
-from typing import cast, Any, Dict
+import json
+import os
+import time
+from typing import cast, Any, Dict, List, Optional, Tuple, TYPE_CHECKING
 
 import click
 from rich.console import Console
-from rich.prompt import Prompt
-from rich.panel import Panel
-from rich.table import Table
 from datetime import datetime
 from pathlib import Path
 
-from src.ai_agent.core.agent import AIAgent
-from src.ai_agent.core.config import Settings
-from src.ai_agent.core.exceptions import AIAgentException
+# Commands import what they use when they run, so that `load` does not
+# pay for openai and the agent, and `--help` for none of them
+if TYPE_CHECKING:
+    from src.ai_agent.core.agent import AIAgent
 
 
 console = Console()
 
+DEFAULT_STORE_PATH = ".cache/conversations.sqlite3"
+
 
 @click.group()
 @click.option("--debug", is_flag=True,
@@ -41,10 +44,26 @@ def cli(ctx: click.Context, debug: bool) -> None:
     "--save-dir", default="conversations",
     help="Directory to save conversations"
 )
+@click.option("--stream/--no-stream", default=True,
+              help="Print tokens as they arrive")
+@click.option(
+    "--save-format", type=click.Choice(["json", "jsonl"]), default="json",
+    help="jsonl keeps appending every turn to the file after a save"
+)
+@click.option("--session", default=None,
+              help="Resume or start a session in the conversation store")
 @click.pass_context
 def chat(ctx: click.Context, model: str, temperature: float,
-         max_tokens: int, save_dir: str) -> None:
+         max_tokens: int, save_dir: str, stream: bool,
+         save_format: str, session: Optional[str]) -> None:
     """Start an interactive chat session."""
+    from rich.panel import Panel
+
+    from src.ai_agent.core.agent import AIAgent
+    from src.ai_agent.core.config import Settings
+    from src.ai_agent.storage.conversation_store import (
+        SQLiteConversationStore
+    )
 
     try:
         # Initialize settings
@@ -60,6 +79,10 @@ def chat(ctx: click.Context, model: str, temperature: float,
 
         # Initialize agent
         agent = AIAgent(settings=settings)
+        store = None
+        if session:
+            store = SQLiteConversationStore(settings.conversation_store_path)
+            agent.attach_store(store, session)
 
         # Welcome message
         console.print(
@@ -73,15 +96,25 @@ def chat(ctx: click.Context, model: str, temperature: float,
         )
 
         # Main chat loop
-        asyncio.run(_chat_loop(agent, save_dir))
+        try:
+            asyncio.run(_chat_loop(agent, save_dir, stream, save_format))
+        finally:
+            agent.detach_log()
+            if store is not None:
+                store.close()
 
     except Exception as e:
         console.print(f"[red]Error: {e}[/red]")
         raise click.Abort()
 
 
-async def _chat_loop(agent: AIAgent, save_dir: str) -> None:
+async def _chat_loop(agent: "AIAgent", save_dir: str,
+                     stream: bool = True,
+                     save_format: str = "json") -> None:
     """Main chat loop."""
+    from rich.prompt import Prompt
+
+    from src.ai_agent.core.exceptions import AIAgentException
 
     while True:
         try:
@@ -103,7 +136,7 @@ async def _chat_loop(agent: AIAgent, save_dir: str) -> None:
                 _show_summary(agent)
                 continue
             elif user_input.lower() == "save":
-                _save_conversation(agent, save_dir)
+                _save_conversation(agent, save_dir, save_format)
                 continue
             elif user_input.lower().startswith("load "):
                 filepath = user_input[5:].strip()
@@ -116,6 +149,10 @@ async def _chat_loop(agent: AIAgent, save_dir: str) -> None:
             # Get AI response
             console.print("[bold green]AI:[/bold green] ", end="")
 
+            if stream:
+                await _print_stream(agent, user_input)
+                continue
+
             with console.status("[bold green]Thinking...[/bold green]"):
                 response = await agent.chat(user_input)
 
@@ -130,8 +167,17 @@ async def _chat_loop(agent: AIAgent, save_dir: str) -> None:
             console.print(f"[red]Unexpected Error: {e}[/red]")
 
 
+async def _print_stream(agent: "AIAgent", message: str) -> None:
+    """Print response tokens as they arrive."""
+    async for token in agent.chat_stream(message):
+        console.print(token, end="", markup=False, highlight=False)
+    console.print()
+
+
 def _show_help() -> None:
     """Show help information."""
+    from rich.table import Table
+
     table = Table(title="Available Commands")
     table.add_column("Command", style="cyan")
     table.add_column("Description", style="white")
@@ -151,8 +197,10 @@ def _show_help() -> None:
     console.print(table)
 
 
-def _show_summary(agent: AIAgent) -> None:
+def _show_summary(agent: "AIAgent") -> None:
     """Show conversation summary."""
+    from rich.table import Table
+
     summary = agent.get_conversation_summary()
 
     table = Table(title="Conversation Summary")
@@ -160,31 +208,45 @@ def _show_summary(agent: AIAgent) -> None:
     table.add_column("Value", style="white")
 
     for key, value in summary.items():
+        if isinstance(value, float):
+            value = f"{value:.3f}"
         table.add_row(key.replace("_", " ").title(), str(value))
 
     console.print(table)
 
 
-def _save_conversation(agent: AIAgent, save_dir: str) -> None:
+def _save_conversation(agent: "AIAgent", save_dir: str,
+                       save_format: str = "json") -> None:
     """Save conversation to file."""
     try:
+        # An attached log already holds every turn
+        if agent.log_path:
+            agent.save_conversation(agent.log_path)
+            console.print(
+                f"[green]✓ Conversation saved to {agent.log_path}[/green]"
+            )
+            return
+
         # Create save directory
         Path(save_dir).mkdir(parents=True, exist_ok=True)
 
         # Generate filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"conversation_{timestamp}.json"
+        filename = f"conversation_{timestamp}.{save_format}"
         filepath = Path(save_dir) / filename
 
-        # Save conversation
-        agent.save_conversation(str(filepath))
+        # Save conversation; a JSONL log keeps recording later turns
+        if save_format == "jsonl":
+            agent.attach_log(str(filepath))
+        else:
+            agent.save_conversation(str(filepath))
         console.print(f"[green]✓ Conversation saved to {filepath}[/green]")
 
     except Exception as e:
         console.print(f"[red]Failed to save conversation: {e}[/red]")
 
 
-def _load_conversation(agent: AIAgent, filepath: str) -> None:
+def _load_conversation(agent: "AIAgent", filepath: str) -> None:
     """Load conversation from file."""
     try:
         agent.load_conversation(filepath)
@@ -206,9 +268,13 @@ def _load_conversation(agent: AIAgent, filepath: str) -> None:
               type=float, help="Response creativity")
 @click.option("--max-tokens", default=150,
               type=int, help="Maximum response length")
+@click.option("--stream/--no-stream", default=True,
+              help="Print tokens as they arrive")
 def ask(message: str, model: str,
-        temperature: float, max_tokens: int) -> None:
+        temperature: float, max_tokens: int, stream: bool) -> None:
     """Ask the AI a single question."""
+    from src.ai_agent.core.agent import AIAgent
+    from src.ai_agent.core.config import Settings
 
     try:
         # Initialize settings
@@ -216,10 +282,19 @@ def ask(message: str, model: str,
         settings.openai_model = model
         settings.openai_temperature = temperature
         settings.openai_max_tokens = max_tokens
+        # The question itself fails on a bad key; unless configured,
+        # skip the extra validation round trip before sending it
+        if "provider_validation" not in settings.model_fields_set:
+            settings.provider_validation = "skip"
 
         # Initialize agent
         agent = AIAgent(settings=settings)
 
+        if stream:
+            console.print("[bold green]AI:[/bold green] ", end="")
+            asyncio.run(_print_stream(agent, message))
+            return
+
         async def get_response() -> str:
             return await agent.chat(message)
 
@@ -232,47 +307,362 @@ def ask(message: str, model: str,
 
 
 @cli.command()
-@click.argument("filepath", type=click.Path(exists=True))
-def load(filepath: str) -> None:
-    """Load and display a conversation file."""
+@click.argument("input_file", type=click.Path(exists=True))
+@click.argument("output_file", type=click.Path())
+@click.option("--concurrency", default=None, type=int,
+              help="Maximum prompts in flight (default: BATCH_CONCURRENCY)")
+@click.option("--prompt-field", default="prompt",
+              help="JSON field holding the prompt")
+@click.option("--id-field", default="id",
+              help="JSON field identifying each prompt")
+@click.option("--ordered/--unordered", default=True,
+              help="Write results in input order or as they complete")
+@click.option("--model", default="gpt-3.5-turbo",
+              help="AI model to use")
+@click.option("--temperature", default=0.7,
+              type=float, help="Response creativity")
+@click.option("--max-tokens", default=150,
+              type=int, help="Maximum response length")
+def batch(input_file: str, output_file: str, concurrency: Optional[int],
+          prompt_field: str, id_field: str, ordered: bool, model: str,
+          temperature: float, max_tokens: int) -> None:
+    """Answer every prompt of a JSONL file, writing results as JSONL.
+
+    Each input line is a JSON object with the prompt in PROMPT_FIELD (for
+    example ``--prompt-field body --id-field request_id``) or a plain JSON
+    string. Each prompt is an independent conversation.
+    """
+    from src.ai_agent.batch.runner import iter_prompts
+    from src.ai_agent.core.agent import AIAgent
+    from src.ai_agent.core.config import Settings
 
     try:
-        import json
+        # Initialize settings
+        settings = Settings()
+        settings.openai_model = model
+        settings.openai_temperature = temperature
+        settings.openai_max_tokens = max_tokens
+
+        items = list(iter_prompts(input_file, prompt_field, id_field))
+        ids = [record_id for _, record_id, _ in items]
+        prompts = [prompt for _, _, prompt in items]
+
+        # Initialize agent
+        agent = AIAgent(settings=settings)
 
-        with open(filepath, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        start = time.perf_counter()
+        succeeded, failed = asyncio.run(_run_batch(
+            agent, ids, prompts, output_file, concurrency, ordered
+        ))
+        elapsed = time.perf_counter() - start
 
-        # Display conversation info
         console.print(
-            Panel.fit(
-                f"Agent: {data.get('agent_name', 'Unknown')}\n"
-                f"Model: {data.get('model', 'Unknown')}\n"
-                f"Saved: {data.get('saved_at', 'Unknown')}\n"
-                f"Messages: {len(data.get('conversation', []))}",
-                title="Conversation Info",
-                border_style="blue",
-            )
+            f"[green]✓ {succeeded} succeeded[/green], "
+            f"[red]{failed} failed[/red] in {elapsed:.1f}s "
+            f"→ {output_file}"
         )
 
-        # Display messages
-        for msg in data.get("conversation", []):
-            role = msg["role"].title()
-            content = msg["content"]
-            timestamp = msg.get("timestamp", "")
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise click.Abort()
+
 
-            if role == "User":
-                console.print(f"[bold blue]{role}:[/bold blue] {content}")
+async def _run_batch(agent: "AIAgent", ids: List[Any], prompts: List[str],
+                     output_file: str, concurrency: Optional[int],
+                     ordered: bool) -> Tuple[int, int]:
+    """Run a batch, writing each result as soon as it may be written."""
+    from src.ai_agent.batch.runner import result_record
+
+    succeeded = failed = 0
+    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        async for result in agent.iter_chat_many(
+            prompts, concurrency=concurrency, ordered=ordered
+        ):
+            if result.ok:
+                succeeded += 1
             else:
-                console.print(f"[bold green]{role}:[/bold green] {content}")
+                failed += 1
+            record = result_record(ids[result.index], result.index, result)
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+    return succeeded, failed
+
+
+@cli.command("run-batch")
+@click.argument("input_file", type=click.Path(exists=True))
+@click.argument("output_file", type=click.Path())
+@click.option("--workers", default=os.cpu_count() or 1, type=int,
+              show_default=True, help="Worker processes")
+@click.option("--concurrency", default=None, type=int,
+              help="Prompts in flight per worker "
+                   "(default: BATCH_CONCURRENCY)")
+@click.option("--prompt-field", default="prompt",
+              help="JSON field holding the prompt")
+@click.option("--id-field", default="id",
+              help="JSON field identifying each prompt")
+@click.option("--rpm", default=None, type=int,
+              help="Requests per minute shared by all workers")
+@click.option("--tpm", default=None, type=int,
+              help="Tokens per minute shared by all workers")
+@click.option("--model", default="gpt-3.5-turbo",
+              help="AI model to use")
+@click.option("--temperature", default=0.7,
+              type=float, help="Response creativity")
+@click.option("--max-tokens", default=150,
+              type=int, help="Maximum response length")
+def run_batch(input_file: str, output_file: str, workers: int,
+              concurrency: Optional[int], prompt_field: str, id_field: str,
+              rpm: Optional[int], tpm: Optional[int], model: str,
+              temperature: float, max_tokens: int) -> None:
+    """Answer a large JSONL file of prompts with worker processes.
+
+    Like ``batch``, but prompts are spread over WORKERS processes sharing
+    one rate budget (--rpm/--tpm, or RATE_LIMIT_RPM/TPM). Results are
+    checkpointed next to OUTPUT_FILE with a request key per prompt; run
+    the same command again after a crash or quota error and only failed
+    or interrupted prompts are sent again. The output is in input order.
+    """
+    from src.ai_agent.batch.runner import BatchProgress
+    from src.ai_agent.batch.runner import run_batch as run_batch_job
+    from src.ai_agent.core.config import Settings
+
+    try:
+        settings = Settings()
+        start = time.perf_counter()
+        with console.status("Starting workers...") as status:
+            def show(progress: BatchProgress) -> None:
+                eta = progress.eta
+                status.update(
+                    f"{progress.completed}/{progress.total} prompts, "
+                    f"{progress.throughput:.1f}/s, ETA "
+                    f"{_format_duration(eta) if eta is not None else '?'}"
+                )
+
+            summary = run_batch_job(
+                input_file, output_file, workers,
+                concurrency=concurrency or settings.batch_concurrency,
+                prompt_field=prompt_field,
+                id_field=id_field,
+                settings={"OPENAI_MODEL": model,
+                          "OPENAI_TEMPERATURE": temperature,
+                          "OPENAI_MAX_TOKENS": max_tokens},
+                requests_per_minute=rpm or settings.rate_limit_rpm,
+                tokens_per_minute=tpm or settings.rate_limit_tpm,
+                on_progress=show,
+            )
+        elapsed = time.perf_counter() - start
 
-            if timestamp:
-                console.print(f"[dim]{timestamp}[/dim]")
-            console.print()
+        console.print(
+            f"[green]✓ {summary['succeeded']} succeeded[/green], "
+            f"[red]{summary['failed']} failed[/red], "
+            f"{summary['skipped']} already answered, "
+            f"{summary['retried']} retried in {elapsed:.1f}s "
+            f"→ {output_file}"
+        )
+
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise click.Abort()
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+
+@cli.command()
+@click.argument("filepath", required=False, type=click.Path(exists=True))
+@click.option("--store", "store_path", default=DEFAULT_STORE_PATH,
+              envvar="CONVERSATION_STORE_PATH",
+              help="Conversation store to query without FILEPATH")
+@click.option("--session", default=None,
+              help="Show this session of the store")
+@click.option("--agent", "agent_name", default=None,
+              help="Only list sessions of this agent")
+@click.option("--model", default=None,
+              help="Only list sessions using this model")
+@click.option("--since", default=None,
+              help="Only list sessions updated since this ISO date")
+@click.option("--limit", default=20, type=int,
+              help="Maximum sessions to list")
+def load(filepath: Optional[str], store_path: str, session: Optional[str],
+         agent_name: Optional[str], model: Optional[str],
+         since: Optional[str], limit: int) -> None:
+    """Load and display a conversation file or stored session.
+
+    Without FILEPATH or --session, lists the sessions of the store.
+    """
+    from rich.table import Table
+
+    from src.ai_agent.core.exceptions import AIAgentException
+    from src.ai_agent.storage.conversation_log import read_conversation_file
+
+    try:
+        if filepath:
+            _print_conversation(read_conversation_file(filepath))
+            return
+
+        from src.ai_agent.storage.conversation_store import (
+            SQLiteConversationStore
+        )
+
+        if not Path(store_path).exists():
+            raise AIAgentException(
+                f"Conversation store not found: {store_path}"
+            )
+        store = SQLiteConversationStore(store_path)
+        try:
+            if session:
+                info = store.get_session(session)
+                if info is None:
+                    raise AIAgentException(f"Session not found: {session}")
+                _print_conversation({
+                    "agent_name": info.agent_name,
+                    "model": info.model,
+                    "saved_at": datetime.fromtimestamp(
+                        info.updated_at).isoformat(),
+                    "conversation": [
+                        msg.model_dump()
+                        for msg in store.load_messages(session)
+                    ],
+                })
+                return
+
+            sessions = store.list_sessions(
+                agent_name=agent_name, model=model,
+                since=(datetime.fromisoformat(since).timestamp()
+                       if since else None),
+                limit=limit,
+            )
+        finally:
+            store.close()
+
+        table = Table(title="Stored Conversations")
+        table.add_column("Session", style="cyan")
+        table.add_column("Agent", style="white")
+        table.add_column("Model", style="white")
+        table.add_column("Messages", style="white", justify="right")
+        table.add_column("Updated", style="dim")
+        for info in sessions:
+            table.add_row(
+                info.session_id, info.agent_name, info.model,
+                str(info.message_count),
+                datetime.fromtimestamp(info.updated_at).strftime(
+                    "%Y-%m-%d %H:%M:%S"),
+            )
+        console.print(table)
 
     except Exception as e:
         console.print(f"[red]Error loading conversation: {e}[/red]")
         raise click.Abort()
 
 
+def _print_conversation(data: Dict[str, Any]) -> None:
+    """Display a conversation with its info panel."""
+    from rich.panel import Panel
+
+    # Display conversation info
+    console.print(
+        Panel.fit(
+            f"Agent: {data.get('agent_name', 'Unknown')}\n"
+            f"Model: {data.get('model', 'Unknown')}\n"
+            f"Saved: {data.get('saved_at', 'Unknown')}\n"
+            f"Messages: {len(data.get('conversation', []))}",
+            title="Conversation Info",
+            border_style="blue",
+        )
+    )
+
+    # Display messages
+    for msg in data.get("conversation", []):
+        role = msg["role"].title()
+        content = msg["content"]
+        timestamp = msg.get("timestamp", "")
+
+        if role == "User":
+            console.print(f"[bold blue]{role}:[/bold blue] {content}")
+        else:
+            console.print(f"[bold green]{role}:[/bold green] {content}")
+
+        if timestamp:
+            console.print(f"[dim]{timestamp}[/dim]")
+        console.print()
+
+
+@cli.command("import")
+@click.argument("paths", nargs=-1, required=True,
+                type=click.Path(exists=True))
+@click.option("--store", "store_path", default=DEFAULT_STORE_PATH,
+              envvar="CONVERSATION_STORE_PATH",
+              help="Conversation store to import into")
+def import_command(paths: Tuple[str, ...], store_path: str) -> None:
+    """Import saved JSON/JSONL conversations into the store.
+
+    PATHS may be files or directories such as ``conversations/``; each
+    file becomes a session named after it plus a hash of its path, and
+    files imported before are skipped.
+    """
+    from src.ai_agent.storage.conversation_store import (
+        SQLiteConversationStore, import_conversations
+    )
+
+    try:
+        store = SQLiteConversationStore(store_path)
+        try:
+            imported = import_conversations(store, paths)
+            total = len(store)
+        finally:
+            store.close()
+        console.print(
+            f"[green]✓ Imported {imported} conversations[/green] "
+            f"({total} in {store_path})"
+        )
+
+    except Exception as e:
+        console.print(f"[red]Error importing conversations: {e}[/red]")
+        raise click.Abort()
+
+
+@cli.command()
+@click.option("--host", default=None, help="Address to listen on")
+@click.option("--port", default=None, type=int, help="Port to listen on")
+@click.option("--max-sessions", default=None, type=int,
+              help="Sessions kept before evicting the least recently used")
+@click.option("--session-ttl", default=None, type=float,
+              help="Seconds before an idle session is evicted")
+@click.pass_context
+def serve(ctx: click.Context, host: Optional[str], port: Optional[int],
+          max_sessions: Optional[int],
+          session_ttl: Optional[float]) -> None:
+    """Serve agent sessions over an async HTTP API."""
+    from src.ai_agent.core.config import Settings
+    from src.ai_agent.server.app import serve as serve_app
+
+    try:
+        settings = Settings()
+        ctx_dict = cast(Dict[str, Any], ctx.obj)
+        if ctx_dict.get("debug", False):
+            settings.log_level = "DEBUG"
+
+        console.print(
+            f"[green]Serving on http://{host or settings.server_host}:"
+            f"{port or settings.server_port}[/green] (Ctrl+C to stop)"
+        )
+        asyncio.run(serve_app(
+            settings, host=host, port=port, max_sessions=max_sessions,
+            session_ttl=session_ttl,
+        ))
+
+    except Exception as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise click.Abort()
+
+
 if __name__ == "__main__":
     cli()
@@ -1,13 +1,61 @@
+import asyncio
 import json
-from typing import List, Dict, Any, Optional
+import time
+from typing import (
+    AsyncIterator, Callable, Iterable, List, Dict, Any, Optional, Tuple
+)
 from datetime import datetime
 from pathlib import Path
 
 from .config import Settings
-from .exceptions import AIAgentException, ValidationException
-from src.ai_agent.providers.base_provider import BaseProvider, Message
+from .context import (
+    TOKENS_PER_REPLY, ContextWindow, get_context_length, get_tokenizer
+)
+from .exceptions import (
+    AIAgentException, ConfigurationException, ValidationException
+)
+from .history import ConversationHistory
+from .stats import UsageStats
+from .summary import ConversationSummarizer
+from src.ai_agent.providers.base_provider import (
+    BaseProvider, BatchResult, ChatResponse, Message
+)
+from src.ai_agent.providers.cached_provider import CachedProvider
+from src.ai_agent.providers.client_registry import PoolConfig
+from src.ai_agent.providers.coalescing_provider import (
+    CoalescingProvider, shared_single_flight
+)
+from src.ai_agent.providers.instrumented_provider import (
+    InstrumentedProvider
+)
 from src.ai_agent.providers.openai_provider import OpenAIProvider
-from src.ai_agent.utils.logger import setup_logger
+from src.ai_agent.providers.rate_limiter import (
+    RateLimiter, shared_rate_limiter
+)
+from src.ai_agent.providers.response_cache import shared_cache_backend
+from src.ai_agent.providers.router_provider import (
+    RouterProvider, shared_router
+)
+from src.ai_agent.providers.retrying_provider import (
+    RetryingProvider, RetryPolicy
+)
+from src.ai_agent.providers.semantic_cache import shared_semantic_cache
+from src.ai_agent.providers.semantic_cached_provider import (
+    SemanticCachedProvider
+)
+from src.ai_agent.providers.validation_cache import (
+    ValidationCache, shared_validation_cache
+)
+from src.ai_agent.storage.conversation_log import (
+    ConversationLog, LoadedLog, is_log_path
+)
+from src.ai_agent.storage.conversation_store import ConversationStore
+from src.ai_agent.telemetry.instrumentation import (
+    CallRecord, Telemetry, shared_telemetry
+)
+from src.ai_agent.utils.concurrency import bounded_map, in_order
+from src.ai_agent.utils.files import atomic_write
+from src.ai_agent.utils.logger import configure_logging, setup_logger
 
 
 class AIAgent:
@@ -19,27 +67,270 @@ class AIAgent:
         provider: Optional[BaseProvider] = None,
     ):
         self.settings = settings or Settings()
+        try:
+            configure_logging(self.settings.log_format,
+                              self.settings.log_debug_sample_rate)
+        except ValueError as e:
+            raise ConfigurationException(str(e)) from e
         self.logger = setup_logger("AIAgent", level=self.settings.log_level)
 
+        # Record agent and provider calls only when telemetry is on
+        self.telemetry: Optional[Telemetry] = None
+        if self.settings.metrics_enabled or self.settings.trace_export_path:
+            self.telemetry = shared_telemetry(
+                metrics=self.settings.metrics_enabled,
+                trace_path=self.settings.trace_export_path,
+            )
+
         # Initialize provider
-        if provider:
-            self.provider = provider
+        if provider is not None and self.telemetry is not None:
+            self.provider: BaseProvider = InstrumentedProvider(
+                provider, self.telemetry
+            )
         else:
-            self.provider = OpenAIProvider(
-                api_key=self.settings.openai_api_key,
-                model=self.settings.openai_model
+            self.provider = provider or self._create_default_provider()
+
+        # Endpoint and credentials scoping shared requests and responses
+        if provider is not None:
+            scope = f"provider-{id(provider)}"
+        else:
+            scope = "|".join([
+                ValidationCache.make_key(self.settings.openai_api_key,
+                                         self.settings.openai_base_url),
+                self.settings.router_endpoints or "",
+            ])
+
+        # Send identical concurrent requests upstream only once
+        if self.settings.request_coalescing:
+            self.provider = CoalescingProvider(
+                self.provider, shared_single_flight(), scope
             )
 
-        # Validate provider
-        if not self.provider.validate_config():
-            raise AIAgentException("Provider configuration is invalid")
+        # Serve near-duplicate prompts from the shared semantic cache,
+        # behind the cheaper exact-match cache below
+        if self.settings.semantic_cache:
+            self.provider = SemanticCachedProvider(
+                self.provider,
+                shared_semantic_cache(
+                    threshold=self.settings.semantic_cache_threshold,
+                    max_entries=self.settings.semantic_cache_max_entries,
+                    ttl=self.settings.semantic_cache_ttl,
+                    dimensions=self.settings.semantic_cache_dimensions,
+                ),
+                cache_all=self.settings.response_cache_all,
+                scope=scope,
+                temperature=self.settings.openai_temperature,
+            )
+
+        # Serve identical requests from the shared response cache
+        if self.settings.response_cache.lower() != "off":
+            self.provider = CachedProvider(
+                self.provider,
+                shared_cache_backend(
+                    self.settings.response_cache,
+                    max_entries=self.settings.response_cache_max_entries,
+                    ttl=self.settings.response_cache_ttl,
+                    path=self.settings.response_cache_path,
+                ),
+                cache_all=self.settings.response_cache_all,
+                scope=scope,
+                temperature=self.settings.openai_temperature,
+            )
+
+        # Validate provider now, on first use, or never
+        validation_mode = self.settings.provider_validation.lower()
+        if validation_mode not in ("eager", "lazy", "skip"):
+            raise ConfigurationException(
+                f"Unknown provider validation mode: {validation_mode}"
+            )
+        self._provider_validated = validation_mode == "skip"
+        if validation_mode == "eager":
+            if not self.provider.validate_config():
+                raise AIAgentException("Provider configuration is invalid")
+            self._provider_validated = True
 
         # Initialize conversation
-        self.conversation_history: List[Message] = []
+        self._history = self._new_history()
+        # Token and latency totals of every request, kept across clears
+        self.usage_stats = UsageStats()
+        self._log: Optional[ConversationLog] = None
+        # JSONL files saved to: path -> (history generation, messages, prompt)
+        self._log_saves: Dict[str, Tuple[int, int, str]] = {}
+        # Attached store session; messages before _store_offset are paged
+        # out of memory and counted per role in _paged_role_counts
+        self._store: Optional[ConversationStore] = None
+        self._session_id: Optional[str] = None
+        self._store_offset = 0
+        self._paged_role_counts: Dict[str, int] = {}
+        self._resident_messages: Optional[int] = None
         self.system_prompt = self._get_default_system_prompt()
+        self._system_message = Message(role="system",
+                                       content=self.system_prompt)
+
+        # Token-budgeted window over the history sent with each turn
+        model = getattr(self.provider, "model", None)
+        self.model = model if isinstance(model, str) \
+            else self.settings.openai_model
+        self.tokenizer = get_tokenizer(self.model)
+        self.context_window = ContextWindow(
+            self.tokenizer,
+            max_messages=self.settings.conversation_history_limit,
+            chunk=self.settings.context_window_chunk,
+        )
+        # Sent after the system prompt with every turn
+        self.pinned_messages: List[Message] = []
+
+        # Rolling summary of the turns older than the recent window
+        self.summarizer: Optional[ConversationSummarizer] = None
+        if self.settings.conversation_summary:
+            summary_provider = self.provider
+            if provider is None and self.settings.summary_model:
+                summary_provider = self._create_openai_provider(
+                    self.settings.openai_base_url,
+                    model=self.settings.summary_model,
+                )
+            self.summarizer = ConversationSummarizer(
+                summary_provider,
+                keep_messages=self.settings.summary_keep_messages,
+                batch_messages=self.settings.summary_batch_messages,
+                max_tokens=self.settings.summary_max_tokens,
+            )
 
-        self.logger.info(
-            f"AI Agent initialized with {self.provider.__class__.__name__}"
+        self.logger.info("AI Agent initialized with %s",
+                         self.provider.__class__.__name__)
+
+    def _new_history(
+        self, messages: Iterable[Message] = ()
+    ) -> ConversationHistory:
+        """Create a history bounded by the resident message setting."""
+        return ConversationHistory(
+            messages,
+            max_resident=self.settings.history_resident_messages,
+            spill_dir=self.settings.history_spill_dir,
+        )
+
+    @property
+    def conversation_history(self) -> ConversationHistory:
+        """Messages of the conversation, oldest first."""
+        return self._history
+
+    @conversation_history.setter
+    def conversation_history(self, messages: Iterable[Message]) -> None:
+        self._history = self._new_history(messages)
+        if self.summarizer is not None:
+            self.summarizer.reset()
+
+    def _create_default_provider(self) -> BaseProvider:
+        """Build the OpenAI provider described by the settings.
+
+        With ``router_endpoints`` set, requests are balanced over
+        ``openai_base_url`` and every extra endpoint by a shared router.
+        """
+        policy = RetryPolicy(
+            max_attempts=self.settings.retry_max_attempts,
+            base_delay=self.settings.retry_base_delay,
+            max_delay=self.settings.retry_max_delay,
+            attempt_timeout=self.settings.request_timeout,
+            total_timeout=self.settings.total_timeout,
+            hedge_after=self.settings.hedge_after,
+            hedge_percentile=self.settings.hedge_percentile,
+        )
+        endpoints = [
+            url.strip()
+            for url in (self.settings.router_endpoints or "").split(",")
+            if url.strip()
+        ]
+        if not endpoints:
+            provider: BaseProvider = self._create_openai_provider(
+                self.settings.openai_base_url
+            )
+            return RetryingProvider(provider, policy)
+
+        base_urls = [self.settings.openai_base_url] + endpoints
+        try:
+            weights = [
+                float(w) for w in
+                (self.settings.router_weights or "").split(",") if w.strip()
+            ]
+        except ValueError:
+            raise ConfigurationException(
+                f"Invalid router weights: {self.settings.router_weights}"
+            )
+        key = self._router_key(base_urls, weights)
+        provider = shared_router(key, lambda: RouterProvider(
+            [self._create_openai_provider(url) for url in base_urls],
+            strategy=self.settings.router_strategy,
+            weights=weights or None,
+            names=[url or "default" for url in base_urls],
+            failure_threshold=self.settings.router_failure_threshold,
+            recovery_time=self.settings.router_recovery_time,
+        ))
+        return RetryingProvider(provider, policy)
+
+    def _router_key(self, base_urls: List[Optional[str]],
+                    weights: List[float]) -> str:
+        """Key of the shared router for these settings.
+
+        Covers every setting the router or its backends are built from,
+        so agents configured differently never share a router.
+        """
+        settings = self.settings
+        return json.dumps([
+            ValidationCache.make_key(settings.openai_api_key, None),
+            settings.openai_model, base_urls,
+            settings.router_strategy, weights,
+            settings.router_failure_threshold,
+            settings.router_recovery_time,
+            settings.http_max_connections,
+            settings.http_max_keepalive_connections,
+            settings.http_keepalive_expiry, settings.http2,
+            settings.rate_limit_rpm, settings.rate_limit_tpm,
+            settings.rate_limit_max_concurrency,
+            settings.validation_cache_ttl, settings.validation_cache_path,
+            settings.metrics_enabled, settings.trace_export_path,
+        ])
+
+    def _create_openai_provider(
+        self, base_url: Optional[str], model: Optional[str] = None
+    ) -> BaseProvider:
+        """Build an OpenAI provider for one endpoint."""
+        provider = OpenAIProvider(
+            api_key=self.settings.openai_api_key,
+            model=model or self.settings.openai_model,
+            base_url=base_url,
+            validation_cache=shared_validation_cache(
+                ttl=self.settings.validation_cache_ttl,
+                path=self.settings.validation_cache_path,
+            ),
+            pool_config=PoolConfig(
+                max_connections=self.settings.http_max_connections,
+                max_keepalive_connections=(
+                    self.settings.http_max_keepalive_connections
+                ),
+                keepalive_expiry=self.settings.http_keepalive_expiry,
+                http2=self.settings.http2,
+                # Retries are handled by the agent's retry policy
+                max_retries=0,
+            ),
+            rate_limiter=self._create_rate_limiter(base_url),
+        )
+        if self.telemetry is not None:
+            # Innermost, so that every attempt is recorded
+            return InstrumentedProvider(provider, self.telemetry)
+        return provider
+
+    def _create_rate_limiter(
+        self, base_url: Optional[str]
+    ) -> Optional[RateLimiter]:
+        """Get the process-wide rate limiter for a key and endpoint."""
+        if not (self.settings.rate_limit_rpm or self.settings.rate_limit_tpm):
+            return None
+        return shared_rate_limiter(
+            ValidationCache.make_key(self.settings.openai_api_key,
+                                     base_url),
+            requests_per_minute=self.settings.rate_limit_rpm,
+            tokens_per_minute=self.settings.rate_limit_tpm,
+            max_concurrency=self.settings.rate_limit_max_concurrency,
         )
 
     def _get_default_system_prompt(self) -> str:
@@ -69,28 +360,141 @@ class AIAgent:
             raise ValidationException("System prompt cannot be empty")
 
         self.system_prompt = prompt
+        if self._store is not None and self._session_id is not None:
+            self._store.set_system_prompt(self._session_id, prompt)
+        if self._log is not None:
+            self._log.record_system_prompt(prompt)
+            self._compact_log()
         self.logger.info("System prompt updated")
 
-    async def chat(self, message: str, **kwargs: Any) -> str:
-        """Send a message and get response."""
-        if not message.strip():
-            raise ValidationException("Message cannot be empty")
+    def pin_message(self, content: str, role: str = "system") -> None:
+        """Send a message with every turn, right after the system prompt.
+
+        Pinned messages are not part of the history and never fall out of
+        the window, so they stay in the cacheable prompt prefix.
+        """
+        if not content.strip():
+            raise ValidationException("Pinned message cannot be empty")
+        self.pinned_messages.append(Message(role=role, content=content))
+
+    def clear_pinned_messages(self) -> None:
+        """Stop sending the pinned messages."""
+        self.pinned_messages = []
+
+    async def _ensure_provider_validated(self) -> None:
+        """Validate the provider on first use in lazy mode."""
+        if self._provider_validated:
+            return
+        if not await self.provider.avalidate_config():
+            raise AIAgentException("Provider configuration is invalid")
+        self._provider_validated = True
 
+    def _prepare_messages(self, message: str) -> List[Message]:
+        """Record the user message and build the prompt for the provider."""
         # Add user message to history
         user_message = Message(
             role="user", content=message.strip(),
             timestamp=datetime.now().isoformat()
         )
-        self.conversation_history.append(user_message)
+        self._append_message(user_message)
 
         # Prepare messages for API
-        messages = [Message(role="system", content=self.system_prompt)]
+        if self._system_message.content != self.system_prompt:
+            self._system_message = Message(role="system",
+                                           content=self.system_prompt)
+        # System prompt and pinned messages form a fixed prefix
+        messages = [self._system_message, *self.pinned_messages]
+        budget = self.prompt_token_budget() - sum(
+            self.tokenizer.count_message(m) for m in messages
+        )
+
+        # Older turns are represented by the rolling summary
+        summary = self.summarizer.message if self.summarizer else None
+        if summary is not None:
+            messages.append(summary)
+            budget -= self.tokenizer.count_message(summary)
 
-        # Add recent conversation history
-        recent_history = self.conversation_history[
-                         -self.settings.conversation_history_limit:
-                         ]
+        # Add as much recent history as fits in the prompt token budget
+        recent_history = self.context_window.select(
+            self.conversation_history, budget
+        )
+        if summary is not None and self.summarizer is not None:
+            window_start = (self._store_offset
+                            + len(self.conversation_history)
+                            - len(recent_history))
+            summarized = self.summarizer.covered - window_start
+            if summarized > 0:
+                recent_history = recent_history[summarized:]
         messages.extend(recent_history)
+        return messages
+
+    def _start_call(self, name: str) -> Optional[CallRecord]:
+        """Start recording a call, if telemetry is enabled."""
+        if self.telemetry is None:
+            return None
+        return self.telemetry.start(name, self.model)
+
+    def _finish_call(self, record: Optional[CallRecord],
+                     error: Optional[BaseException] = None) -> None:
+        """Stop recording a call started by ``_start_call``."""
+        if record is not None and self.telemetry is not None:
+            self.telemetry.finish(record, error)
+
+    def _maybe_summarize(self) -> None:
+        """Start a summary update once enough old turns piled up."""
+        if self.summarizer is None:
+            return
+        total = self._store_offset + len(self.conversation_history)
+        if not self.summarizer.due(total):
+            return
+        upto = total - self.summarizer.keep_messages
+        # Messages paged out to the store before being summarized are
+        # skipped rather than read back
+        start = max(0, self.summarizer.covered - self._store_offset)
+        self.summarizer.schedule(
+            self.conversation_history[start:upto - self._store_offset],
+            upto,
+        )
+
+    async def wait_for_summary(self) -> None:
+        """Wait until the summary update in progress, if any, is done."""
+        if self.summarizer is not None:
+            await self.summarizer.wait()
+
+    def prompt_token_budget(self) -> int:
+        """Get the token budget for the system prompt and history."""
+        if self.settings.context_token_budget:
+            return self.settings.context_token_budget
+        return (get_context_length(self.model)
+                - self.settings.openai_max_tokens
+                - TOKENS_PER_REPLY)
+
+    def _add_assistant_message(self, content: str) -> None:
+        """Append an assistant reply to the history."""
+        assistant_message = Message(
+            role="assistant",
+            content=content,
+            timestamp=datetime.now().isoformat(),
+        )
+        self._append_message(assistant_message)
+
+    def _append_message(self, message: Message) -> None:
+        """Append a message to the history and the attached log/store."""
+        self.conversation_history.append(message)
+        if self._log is not None:
+            self._log.append(message)
+        if self._store is not None and self._session_id is not None:
+            self._store.append_messages(self._session_id, [message])
+            self._page_out()
+
+    async def chat(self, message: str, **kwargs: Any) -> str:
+        """Send a message and get response."""
+        if not message.strip():
+            raise ValidationException("Message cannot be empty")
+        await self._ensure_provider_validated()
+        messages = self._prepare_messages(message)
+        start = time.perf_counter()
+        record = self._start_call("agent.chat")
 
         try:
             # Get response from provider
@@ -100,33 +504,164 @@ class AIAgent:
                 temperature=self.settings.openai_temperature,
                 **kwargs,
             )
+        except Exception as e:
+            self.usage_stats.record_failure()
+            self.logger.error("Chat failed: %s", e)
+            self._finish_call(record, e)
+            raise
+        except asyncio.CancelledError as e:
+            self._finish_call(record, e)
+            raise
 
-            # Add assistant response to history
-            assistant_message = Message(
-                role="assistant",
-                content=response.content,
-                timestamp=datetime.now().isoformat(),
-            )
-            self.conversation_history.append(assistant_message)
+        self.usage_stats.record_response(time.perf_counter() - start,
+                                         response.usage)
+        if record is not None:
+            record.first_byte()
+            if record.cache is None:
+                # Cached answers cost no tokens
+                record.add_usage(response.usage)
+            self._finish_call(record)
+
+        # Add assistant response to history
+        self._add_assistant_message(response.content)
+        self._maybe_summarize()
 
-            self.logger.info(f"Chat completed - tokens used: {response.usage}")
+        self.logger.info("Chat completed - tokens used: %s", response.usage)
 
-            return response.content
+        return response.content
+
+    async def chat_stream(
+        self,
+        message: str,
+        on_first_token: Optional[Callable[[float], None]] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        """Send a message and yield response tokens as they arrive.
+
+        ``on_first_token`` is called with the time-to-first-token in
+        seconds. The assembled reply is added to the history once the
+        stream finishes.
+        """
+        if not message.strip():
+            raise ValidationException("Message cannot be empty")
+        await self._ensure_provider_validated()
+        messages = self._prepare_messages(message)
+        parts: List[str] = []
+        start = time.perf_counter()
+        record = self._start_call("agent.chat_stream")
+        error: Optional[BaseException] = None
+
+        try:
+            async for token in self.provider.stream(
+                messages=messages,
+                max_tokens=self.settings.openai_max_tokens,
+                temperature=self.settings.openai_temperature,
+                **kwargs,
+            ):
+                if not parts:
+                    ttft = time.perf_counter() - start
+                    self.usage_stats.time_to_first_token.record(ttft)
+                    self.logger.debug("Time to first token: %.3fs", ttft)
+                    if on_first_token:
+                        on_first_token(ttft)
+                    if record is not None:
+                        record.first_byte()
+                parts.append(token)
+                yield token
 
         except Exception as e:
-            self.logger.error(f"Chat failed: {e}")
+            error = e
+            self.usage_stats.record_failure()
+            self.logger.error("Chat stream failed: %s", e)
+            raise
+        except asyncio.CancelledError as e:
+            error = e
             raise
+        finally:
+            self._finish_call(record, error)
+
+        elapsed = time.perf_counter() - start
+        self.usage_stats.record_response(elapsed)
+        self._add_assistant_message("".join(parts).strip())
+        self._maybe_summarize()
+        self.logger.info("Chat stream completed in %.3fs", elapsed)
+
+    async def iter_chat_many(
+        self,
+        prompts: Iterable[str],
+        concurrency: Optional[int] = None,
+        ordered: bool = False,
+        **kwargs: Any,
+    ) -> AsyncIterator[BatchResult]:
+        """Answer independent prompts concurrently, yielding results.
+
+        Each prompt is sent as its own conversation with the system prompt
+        and leaves ``conversation_history`` untouched. Results are yielded
+        as they complete, or in input order when ``ordered`` is set.
+        """
+        await self._ensure_provider_validated()
+        system_message = Message(role="system", content=self.system_prompt)
+
+        async def answer(prompt: str) -> ChatResponse:
+            if not prompt or not prompt.strip():
+                raise ValidationException("Message cannot be empty")
+            return await self.provider.chat(
+                messages=[system_message,
+                          Message(role="user", content=prompt.strip())],
+                max_tokens=self.settings.openai_max_tokens,
+                temperature=self.settings.openai_temperature,
+                **kwargs,
+            )
+
+        results = bounded_map(
+            answer, prompts,
+            concurrency or self.settings.batch_concurrency,
+        )
+        if ordered:
+            results = in_order(results)
+        async for index, outcome in results:
+            yield BatchResult.from_outcome(index, outcome)
+
+    async def chat_many(
+        self,
+        prompts: Iterable[str],
+        concurrency: Optional[int] = None,
+        **kwargs: Any,
+    ) -> List[BatchResult]:
+        """Answer independent prompts concurrently, in input order.
+
+        A failed prompt is reported in its result and does not abort the
+        rest of the batch.
+        """
+        results = [
+            result async for result in self.iter_chat_many(
+                prompts, concurrency=concurrency, ordered=True, **kwargs
+            )
+        ]
+        failed = sum(1 for result in results if not result.ok)
+        self.logger.info("Batch completed - %s prompts, %s failed",
+                         len(results), failed)
+        return results
 
     def get_conversation_summary(self) -> Dict[str, Any]:
-        """Get conversation summary."""
+        """Get conversation summary.
+
+        Message counts are kept by the history, plus those of messages
+        paged out to an attached store, and token and latency totals by
+        ``usage_stats``, so this takes constant time.
+        """
+        role_counts = self.conversation_history.role_counts()
+        for role, count in self._paged_role_counts.items():
+            if count:
+                role_counts[role] = role_counts.get(role, 0) + count
         return {
-            "total_messages": len(self.conversation_history),
-            "user_messages": len(
-                [m for m in self.conversation_history if m.role == "user"]
-            ),
-            "assistant_messages": len(
-                [m for m in self.conversation_history if m.role == "assistant"]
-            ),
+            "total_messages": (self._store_offset
+                               + len(self.conversation_history)),
+            "user_messages": role_counts.get("user", 0),
+            "assistant_messages": role_counts.get("assistant", 0),
+            "messages_by_role": role_counts,
+            **self.usage_stats.as_dict(),
+            **(self.summarizer.as_dict() if self.summarizer else {}),
             "model": (
                 self.provider.model if hasattr(
                     self.provider, "model") else "unknown"
@@ -141,11 +676,201 @@ class AIAgent:
     def clear_history(self) -> None:
         """Clear conversation history."""
         self.conversation_history = []
+        if self._store is not None and self._session_id is not None:
+            self._store.clear_messages(self._session_id)
+            self._store_offset = 0
+            self._paged_role_counts = {}
+        if self._log is not None:
+            self._log.record_clear()
+            self._compact_log()
         self.logger.info("Conversation history cleared")
 
+    def attach_store(self, store: ConversationStore,
+                     session_id: Optional[str] = None,
+                     resident_messages: Optional[int] = None) -> str:
+        """Persist the conversation to a session of a conversation store.
+
+        An existing ``session_id`` is resumed: its system prompt and its
+        last ``resident_messages`` messages are loaded. Otherwise a new
+        session is created with the current history. Each new message is
+        then appended to the store, and only the most recent
+        ``resident_messages`` are kept in memory; older ones can be paged
+        back in with ``load_older_messages``. Returns the session id.
+        """
+        self.detach_store()
+        if resident_messages is None:
+            resident_messages = (
+                self.settings.conversation_store_resident_messages
+            )
+        info = store.get_session(session_id) if session_id else None
+        if info is None:
+            info = store.create_session(
+                session_id,
+                agent_name=self.settings.agent_name,
+                model=self.model,
+                system_prompt=self.system_prompt,
+                messages=self.conversation_history,
+            )
+            self._store_offset = 0
+        else:
+            self.conversation_history = store.load_messages(
+                info.session_id, limit=resident_messages
+            )
+            self._store_offset = (info.message_count
+                                  - len(self.conversation_history))
+            self._paged_role_counts = store.count_roles(
+                info.session_id, before=self._store_offset
+            )
+            if info.system_prompt:
+                self.system_prompt = info.system_prompt
+
+        self._store = store
+        self._session_id = info.session_id
+        self._resident_messages = resident_messages
+        self._page_out(force=True)
+        self.logger.info("Conversation store session %s", info.session_id)
+        return info.session_id
+
+    def detach_store(self) -> None:
+        """Stop persisting to the attached conversation store, if any."""
+        self._store = None
+        self._session_id = None
+        self._store_offset = 0
+        self._paged_role_counts = {}
+        self._resident_messages = None
+
+    @property
+    def session_id(self) -> Optional[str]:
+        """Id of the attached conversation store session."""
+        return self._session_id
+
+    def _page_out(self, force: bool = False) -> None:
+        """Drop the oldest messages from memory once over the limit.
+
+        Trimming waits for a quarter of the limit in extra messages, so
+        the history is not copied on every turn.
+        """
+        limit = self._resident_messages
+        if limit is None:
+            return
+        excess = len(self.conversation_history) - limit
+        if excess <= 0 or (not force and excess < max(1, limit // 4)):
+            return
+        for message in self.conversation_history[:excess]:
+            self._paged_role_counts[message.role] = (
+                self._paged_role_counts.get(message.role, 0) + 1
+            )
+        self._history = self._new_history(
+            self.conversation_history[excess:]
+        )
+        self._store_offset += excess
+
+    def load_older_messages(self, count: int) -> int:
+        """Page up to ``count`` earlier messages back in from the store.
+
+        Returns the number of messages loaded. They are paged out again
+        once the history grows past the resident limit.
+        """
+        if self._store is None or self._session_id is None:
+            raise AIAgentException("No conversation store is attached")
+        older = self._store.load_messages(
+            self._session_id, limit=count, before=self._store_offset
+        )
+        if older:
+            self._history = self._new_history(
+                older + self.conversation_history
+            )
+            self._store_offset -= len(older)
+            for message in older:
+                self._paged_role_counts[message.role] -= 1
+        return len(older)
+
+    def _log_header(self) -> Dict[str, Any]:
+        """Header record of a JSONL conversation log."""
+        return {
+            "agent_name": self.settings.agent_name,
+            "model": (
+                self.provider.model
+                if hasattr(self.provider, "model")
+                else "unknown"
+            ),
+            "system_prompt": self.system_prompt,
+            "created_at": datetime.now().isoformat(),
+        }
+
+    def _new_log(self, filepath: str, fsync: str) -> ConversationLog:
+        return ConversationLog(
+            filepath,
+            fsync=fsync,
+            fsync_interval=self.settings.conversation_log_fsync_interval,
+        )
+
+    def attach_log(self, filepath: str) -> None:
+        """Persist every new message to an append-only JSONL log.
+
+        The log is (re)written atomically with the current conversation,
+        then each message is appended as it is added and fsync'ed
+        according to ``conversation_log_fsync``.
+        """
+        self.detach_log()
+        log = self._new_log(filepath, self.settings.conversation_log_fsync)
+        try:
+            log.create(self._log_header(), self.conversation_history)
+        except OSError as e:
+            raise AIAgentException(f"Failed to open conversation log: {e}")
+        self._log = log
+        self.logger.info("Conversation log attached to %s", filepath)
+
+    def detach_log(self) -> None:
+        """Sync and close the attached conversation log, if any."""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    @property
+    def log_path(self) -> Optional[str]:
+        """Path of the attached conversation log."""
+        return self._log.filepath if self._log is not None else None
+
+    def _compact_log(self) -> None:
+        """Rewrite the attached log once superseded records dominate."""
+        if self._log is not None and self._log.needs_compaction():
+            self._log.create(self._log_header(), self.conversation_history)
+
+    def _save_log(self, filepath: str) -> None:
+        """Save to a JSONL log, appending only what changed since."""
+        if self._log is not None and self._log.filepath == filepath:
+            self._log.sync()
+            return
+
+        history = self.conversation_history
+        previous = self._log_saves.get(filepath)
+        log = self._new_log(filepath, "never")
+        if (previous is not None and previous[0] == history.generation
+                and previous[1] <= len(history) and Path(filepath).exists()):
+            log.reopen()
+            if previous[2] != self.system_prompt:
+                log.record_system_prompt(self.system_prompt)
+            for message in history[previous[1]:]:
+                log.append(message)
+        else:
+            log.create(self._log_header(), history)
+        log.close()
+        self._log_saves[filepath] = (history.generation, len(history),
+                                     self.system_prompt)
+
     def save_conversation(self, filepath: str) -> None:
-        """Save conversation to file."""
+        """Save conversation to file.
+
+        Paths ending in ``.jsonl`` use the append-only log format, so
+        repeated saves to the same file only write the new messages.
+        """
         try:
+            if is_log_path(filepath):
+                self._save_log(filepath)
+                self.logger.info("Conversation saved to %s", filepath)
+                return
+
             data = {
                 "agent_name": self.settings.agent_name,
                 "model": (
@@ -160,20 +885,41 @@ class AIAgent:
                 "summary": self.get_conversation_summary(),
             }
 
-            Path(filepath).parent.mkdir(parents=True, exist_ok=True)
-
-            with open(filepath, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            atomic_write(
+                filepath,
+                lambda f: json.dump(data, f, indent=2, ensure_ascii=False),
+            )
 
-            self.logger.info(f"Conversation saved to {filepath}")
+            self.logger.info("Conversation saved to %s", filepath)
 
         except Exception as e:
-            self.logger.error(f"Failed to save conversation: {e}")
+            self.logger.error("Failed to save conversation: %s", e)
             raise AIAgentException(f"Failed to save conversation: {e}")
 
+    def _load_log(self, filepath: str) -> None:
+        """Stream a JSONL conversation log into the history."""
+        loaded = LoadedLog(filepath)
+        history = self._new_history()
+        for record in loaded.events():
+            kind = record.pop("type", None)
+            if kind == "message":
+                history.append(Message(**record))
+            elif kind == "clear":
+                history.clear()
+        self._history = history
+        if self.summarizer is not None:
+            self.summarizer.reset()
+        if loaded.system_prompt:
+            self.system_prompt = loaded.system_prompt
+
     def load_conversation(self, filepath: str) -> None:
         """Load conversation from file."""
         try:
+            if is_log_path(filepath):
+                self._load_log(filepath)
+                self.logger.info("Conversation loaded from %s", filepath)
+                return
+
             with open(filepath, "r", encoding="utf-8") as f:
                 data = json.load(f)
 
@@ -186,12 +932,14 @@ class AIAgent:
             if "system_prompt" in data:
                 self.system_prompt = data["system_prompt"]
 
-            self.logger.info(f"Conversation loaded from {filepath}")
+            self.logger.info("Conversation loaded from %s", filepath)
 
         except FileNotFoundError:
             raise AIAgentException(f"File not found: {filepath}")
         except json.JSONDecodeError as e:
             raise AIAgentException(f"Invalid JSON in file: {e}")
+        except AIAgentException:
+            raise
         except Exception as e:
             raise AIAgentException(f"Failed to load conversation: {e}")
 
@@ -200,4 +948,4 @@ class AIAgent:
         recent = self.conversation_history[-count:] \
             if self.conversation_history \
             else []
-        return [msg.dict() for msg in recent]
+        return [msg.model_dump() for msg in recent]
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -10,6 +12,8 @@ class Settings(BaseSettings):
     openai_model: str = Field(default="gpt-3.5-turbo", alias="OPENAI_MODEL")
     openai_max_tokens: int = Field(default=150, alias="OPENAI_MAX_TOKENS")
     openai_temperature: float = Field(default=0.7, alias="OPENAI_TEMPERATURE")
+    openai_base_url: Optional[str] = Field(default=None,
+                                           alias="OPENAI_BASE_URL")
     anthropic_api_key: str = Field(default="", alias="ANTHROPIC_API_KEY")
     google_api_key: str = Field(default="", alias="GOOGLE_API_KEY")
     # Agent Configuration
@@ -18,9 +22,179 @@ class Settings(BaseSettings):
                                    alias="AGENT_PERSONALITY")
     conversation_history_limit: int = Field(default=20,
                                             alias="CONVERSATION_HISTORY_LIMIT")
+    # Prompt tokens for system prompt plus history; None derives it from
+    # the model context length minus the completion budget
+    context_token_budget: Optional[int] = Field(
+        default=None, alias="CONTEXT_TOKEN_BUDGET"
+    )
+    # Drop old history in aligned chunks of this many messages instead of
+    # one at a time, so the prompt prefix stays stable between drops and
+    # provider-side prompt caching hits; None slides the window
+    context_window_chunk: Optional[int] = Field(
+        default=None, alias="CONTEXT_WINDOW_CHUNK"
+    )
+
+    # Client-side rate limiting shared by every agent using the same key;
+    # disabled unless a requests or tokens per minute budget is set
+    rate_limit_rpm: Optional[int] = Field(default=None,
+                                          alias="RATE_LIMIT_RPM")
+    rate_limit_tpm: Optional[int] = Field(default=None,
+                                          alias="RATE_LIMIT_TPM")
+    rate_limit_max_concurrency: int = Field(
+        default=64, alias="RATE_LIMIT_MAX_CONCURRENCY"
+    )
+
+    # Retries of transient failures (timeouts, 5xx, 429) with jittered
+    # exponential backoff, per-attempt and per-call deadlines in seconds,
+    # and optional hedged requests after a fixed delay or a percentile of
+    # recent latencies (e.g. 0.95)
+    retry_max_attempts: int = Field(default=3, alias="RETRY_MAX_ATTEMPTS")
+    retry_base_delay: float = Field(default=0.5, alias="RETRY_BASE_DELAY")
+    retry_max_delay: float = Field(default=8.0, alias="RETRY_MAX_DELAY")
+    request_timeout: Optional[float] = Field(default=60.0,
+                                             alias="REQUEST_TIMEOUT")
+    total_timeout: Optional[float] = Field(default=180.0,
+                                           alias="TOTAL_TIMEOUT")
+    hedge_after: Optional[float] = Field(default=None, alias="HEDGE_AFTER")
+    hedge_percentile: Optional[float] = Field(default=None,
+                                              alias="HEDGE_PERCENTILE")
+
+    # Extra OpenAI-compatible endpoints (comma-separated base URLs) to
+    # balance over together with openai_base_url: "weighted",
+    # "least_outstanding" or "ewma" routing, optional comma-separated
+    # weights (primary first) and per-endpoint circuit breakers
+    router_endpoints: Optional[str] = Field(default=None,
+                                            alias="ROUTER_ENDPOINTS")
+    router_strategy: str = Field(default="ewma", alias="ROUTER_STRATEGY")
+    router_weights: Optional[str] = Field(default=None,
+                                          alias="ROUTER_WEIGHTS")
+    router_failure_threshold: int = Field(
+        default=5, alias="ROUTER_FAILURE_THRESHOLD"
+    )
+    router_recovery_time: float = Field(default=30.0,
+                                        alias="ROUTER_RECOVERY_TIME")
+
+    # Durability of JSONL conversation logs: "always" fsyncs every
+    # message, "interval" at most once per interval, "never" leaves it to
+    # the operating system
+    conversation_log_fsync: str = Field(default="interval",
+                                        alias="CONVERSATION_LOG_FSYNC")
+    conversation_log_fsync_interval: float = Field(
+        default=1.0, alias="CONVERSATION_LOG_FSYNC_INTERVAL"
+    )
+
+    # Messages of a conversation kept in memory; when set, older ones are
+    # spilled to a temporary file (in history_spill_dir, or the system
+    # default). None keeps the whole conversation in memory.
+    history_resident_messages: Optional[int] = Field(
+        default=None, alias="HISTORY_RESIDENT_MESSAGES"
+    )
+    history_spill_dir: Optional[str] = Field(default=None,
+                                             alias="HISTORY_SPILL_DIR")
+
+    # SQLite conversation store used by the CLI, and how many recent
+    # messages an attached agent keeps in memory (None keeps them all)
+    conversation_store_path: str = Field(
+        default=".cache/conversations.sqlite3",
+        alias="CONVERSATION_STORE_PATH"
+    )
+    conversation_store_resident_messages: Optional[int] = Field(
+        default=None, alias="CONVERSATION_STORE_RESIDENT_MESSAGES"
+    )
+
+    # Maximum prompts in flight for chat_many and the batch commands
+    # (per worker for run-batch) unless --concurrency is given
+    batch_concurrency: int = Field(default=8, alias="BATCH_CONCURRENCY")
+
+    # Provider validation: "eager" (on construction), "lazy" (on first
+    # chat) or "skip"; successful checks are cached per key and endpoint
+    provider_validation: str = Field(default="lazy",
+                                     alias="PROVIDER_VALIDATION")
+    validation_cache_ttl: float = Field(default=3600.0,
+                                        alias="VALIDATION_CACHE_TTL")
+    validation_cache_path: Optional[str] = Field(
+        default=None, alias="VALIDATION_CACHE_PATH"
+    )
+
+    # HTTP connection pool shared by providers with the same credentials
+    http_max_connections: int = Field(default=100,
+                                      alias="HTTP_MAX_CONNECTIONS")
+    http_max_keepalive_connections: int = Field(
+        default=20, alias="HTTP_MAX_KEEPALIVE_CONNECTIONS"
+    )
+    http_keepalive_expiry: float = Field(default=30.0,
+                                         alias="HTTP_KEEPALIVE_EXPIRY")
+    http2: bool = Field(default=False, alias="HTTP2")
+
+    # Response cache for identical requests: "off", "memory" or "sqlite".
+    # Only temperature 0 requests are cached unless cache_all is set
+    response_cache: str = Field(default="off", alias="RESPONSE_CACHE")
+    response_cache_ttl: float = Field(default=3600.0,
+                                      alias="RESPONSE_CACHE_TTL")
+    response_cache_max_entries: int = Field(
+        default=1024, alias="RESPONSE_CACHE_MAX_ENTRIES"
+    )
+    response_cache_path: str = Field(default=".cache/responses.sqlite3",
+                                     alias="RESPONSE_CACHE_PATH")
+    response_cache_all: bool = Field(default=False,
+                                     alias="RESPONSE_CACHE_ALL")
+
+    # Rolling summary of the turns older than the summary_keep_messages
+    # most recent ones, updated in the background once
+    # summary_batch_messages more have piled up; summary_model (defaults
+    # to openai_model) can be a cheaper model
+    conversation_summary: bool = Field(default=False,
+                                       alias="CONVERSATION_SUMMARY")
+    summary_keep_messages: int = Field(default=6,
+                                       alias="SUMMARY_KEEP_MESSAGES")
+    summary_batch_messages: int = Field(default=10,
+                                        alias="SUMMARY_BATCH_MESSAGES")
+    summary_max_tokens: int = Field(default=256, alias="SUMMARY_MAX_TOKENS")
+    summary_model: Optional[str] = Field(default=None, alias="SUMMARY_MODEL")
+
+    # Identical requests in flight at the same time (e.g. from different
+    # server sessions) are sent upstream once and share the reply
+    request_coalescing: bool = Field(default=False,
+                                     alias="REQUEST_COALESCING")
+
+    # Semantic cache for near-duplicate prompts: the latest user message
+    # is embedded locally and a cached reply is served above the cosine
+    # similarity threshold. Shares response_cache_all
+    semantic_cache: bool = Field(default=False, alias="SEMANTIC_CACHE")
+    semantic_cache_threshold: float = Field(
+        default=0.9, alias="SEMANTIC_CACHE_THRESHOLD"
+    )
+    semantic_cache_max_entries: int = Field(
+        default=1024, alias="SEMANTIC_CACHE_MAX_ENTRIES"
+    )
+    semantic_cache_ttl: float = Field(default=3600.0,
+                                      alias="SEMANTIC_CACHE_TTL")
+    semantic_cache_dimensions: int = Field(
+        default=512, alias="SEMANTIC_CACHE_DIMENSIONS"
+    )
+
+    # Telemetry of agent and provider calls: Prometheus metrics (served
+    # at /metrics by ai-agent serve) and OTLP/JSON traces appended to a
+    # file. Nothing is recorded while both are off
+    metrics_enabled: bool = Field(default=False, alias="METRICS_ENABLED")
+    trace_export_path: Optional[str] = Field(default=None,
+                                             alias="TRACE_EXPORT_PATH")
+
+    # HTTP server (ai-agent serve): sessions are evicted least recently
+    # used first beyond the limit and after the idle TTL in seconds
+    server_host: str = Field(default="127.0.0.1", alias="SERVER_HOST")
+    server_port: int = Field(default=8000, alias="SERVER_PORT")
+    server_max_sessions: int = Field(default=1000,
+                                     alias="SERVER_MAX_SESSIONS")
+    server_session_ttl: float = Field(default=1800.0,
+                                      alias="SERVER_SESSION_TTL")
 
-    # Logging
+    # Logging: "rich" console output, or "json" lines written by a
+    # background thread; only a fraction of DEBUG records is kept
     log_level: str = Field("INFO", alias="LOG_LEVEL")
+    log_format: str = Field(default="rich", alias="LOG_FORMAT")
+    log_debug_sample_rate: float = Field(default=1.0,
+                                         alias="LOG_DEBUG_SAMPLE_RATE")
 
     model_config = {
         "env_file": ".env",
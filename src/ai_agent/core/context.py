@@ -0,0 +1,155 @@
+import math
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence
+
+from src.ai_agent.providers.base_provider import Message
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+
+# Context window sizes by model prefix; the longest matching prefix wins
+MODEL_CONTEXT_TOKENS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+}
+DEFAULT_CONTEXT_TOKENS = 4096
+
+# Per-message framing overhead and reply priming used by chat models
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+
+def get_context_length(model: str) -> int:
+    """Get the context window size of a model."""
+    matches = [prefix for prefix in MODEL_CONTEXT_TOKENS
+               if model.startswith(prefix)]
+    if not matches:
+        return DEFAULT_CONTEXT_TOKENS
+    return MODEL_CONTEXT_TOKENS[max(matches, key=len)]
+
+
+class Tokenizer:
+    """Counts tokens for a model.
+
+    Uses ``tiktoken`` when it is installed and falls back to an estimate
+    of four characters per token otherwise.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self._encoding: Any = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        self.name = (
+            self._encoding.name if self._encoding is not None
+            else "approx-4"
+        )
+
+    def count(self, text: str) -> int:
+        """Count tokens in a piece of text."""
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return math.ceil(len(text) / 4)
+
+    def _count_message(self, message: Message) -> int:
+        return (TOKENS_PER_MESSAGE + self.count(message.role)
+                + self.count(message.content))
+
+    def count_message(self, message: Message) -> int:
+        """Count tokens of a message, cached per message object."""
+        return message.count_tokens(self.name, self._count_message)
+
+
+@lru_cache(maxsize=32)
+def get_tokenizer(model: str) -> Tokenizer:
+    """Get a shared tokenizer for a model."""
+    return Tokenizer(model)
+
+
+class ContextWindow:
+    """Token-budgeted sliding window over a conversation history.
+
+    The window keeps a running token total for the selected suffix of the
+    history. New messages are added to the total and the oldest ones are
+    dropped until the budget fits, so every message is counted and
+    evicted at most once and each turn costs O(1) amortized. Replacing
+    the history list, shrinking it or raising the budget resets the
+    window.
+
+    With ``chunk`` set, the start of the window only moves to multiples
+    of ``chunk`` messages. The window then grows append-only between
+    drops, so consecutive prompts share their prefix and provider-side
+    prompt caching keeps hitting.
+    """
+
+    def __init__(self, tokenizer: Tokenizer,
+                 max_messages: Optional[int] = None,
+                 chunk: Optional[int] = None):
+        self.tokenizer = tokenizer
+        self.max_messages = max_messages
+        self.chunk = chunk
+        self.total_tokens = 0
+        self._history: Optional[Sequence[Message]] = None
+        self._start = 0
+        self._end = 0
+        self._budget = 0
+
+    def reset(self) -> None:
+        """Forget the tracked window."""
+        self.total_tokens = 0
+        self._history = None
+        self._start = 0
+        self._end = 0
+        self._budget = 0
+
+    def select(self, history: Sequence[Message],
+               budget: int) -> List[Message]:
+        """Select the newest messages that fit in ``budget`` tokens.
+
+        The newest message is always included, even if it alone exceeds
+        the budget.
+        """
+        if (history is not self._history or len(history) < self._end
+                or budget > self._budget):
+            self.reset()
+            self._history = history
+            # Only the messages that could possibly fit need counting
+            if self.max_messages:
+                self._start = self._end = self._aligned(
+                    max(0, len(history) - self.max_messages),
+                    len(history),
+                )
+        self._budget = budget
+
+        for message in history[self._end:]:
+            self.total_tokens += self.tokenizer.count_message(message)
+        self._end = len(history)
+
+        while self._end - self._start > 1 and (
+            self.total_tokens > budget
+            or (self.max_messages
+                and self._end - self._start > self.max_messages)
+        ):
+            start = self._aligned(self._start + 1, self._end)
+            for message in history[self._start:start]:
+                self.total_tokens -= self.tokenizer.count_message(message)
+            self._start = start
+
+        return list(history[self._start:self._end])
+
+    def _aligned(self, start: int, end: int) -> int:
+        """Round a window start up to the next chunk boundary."""
+        if self.chunk and self.chunk > 1:
+            start = -(-start // self.chunk) * self.chunk
+        # The newest message always stays in the window
+        return max(0, min(start, end - 1))
@@ -10,6 +10,24 @@ class APIException(AIAgentException):
     pass
 
 
+class TransientAPIException(APIException):
+    """Exception raised for API errors that may succeed when retried."""
+
+    pass
+
+
+class RateLimitException(TransientAPIException):
+    """Exception raised when the provider rejects a request as rate limited."""
+
+    pass
+
+
+class TimeoutException(TransientAPIException):
+    """Exception raised when a request exceeds its deadline."""
+
+    pass
+
+
 class ConfigurationException(AIAgentException):
     """Exception raised for configuration errors."""
 
@@ -0,0 +1,243 @@
+import itertools
+import json
+import os
+import sys
+import tempfile
+import weakref
+from array import array
+from datetime import datetime, timedelta
+from typing import (
+    Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union, overload
+)
+
+from src.ai_agent.providers.base_provider import (
+    Message, cached_token_counts, token_counts
+)
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+Timestamp = Union[int, str, None]
+
+# Source of history generations, unique across every history
+_generations = itertools.count()
+
+
+def encode_timestamp(timestamp: Optional[str]) -> Timestamp:
+    """Pack a naive ISO timestamp into integer microseconds.
+
+    The conversion is exact, so ``decode_timestamp`` restores the same
+    string. Timestamps with a UTC offset or in another format are kept
+    as they are.
+    """
+    if timestamp is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return timestamp
+    if parsed.tzinfo is not None or parsed.isoformat() != timestamp:
+        return timestamp
+    return (parsed - _EPOCH) // _MICROSECOND
+
+
+def decode_timestamp(timestamp: Timestamp) -> Optional[str]:
+    """Restore a timestamp packed by ``encode_timestamp``."""
+    if isinstance(timestamp, int):
+        return (_EPOCH + timestamp * _MICROSECOND).isoformat()
+    return timestamp
+
+
+class _Record:
+    """Compact in-memory form of a message."""
+
+    __slots__ = ("role", "content", "timestamp", "tokens")
+
+    def __init__(self, role: str, content: str, timestamp: Timestamp,
+                 tokens: Optional[Dict[str, int]] = None):
+        self.role = role
+        self.content = content
+        self.timestamp = timestamp
+        self.tokens = tokens
+
+    @classmethod
+    def from_message(cls, message: Message) -> "_Record":
+        return cls(
+            sys.intern(message.role),
+            message.content,
+            encode_timestamp(message.timestamp),
+            # Keep token counts already computed for the message
+            cached_token_counts(message) or None,
+        )
+
+    def to_message(self) -> Message:
+        message = Message(role=self.role, content=self.content,
+                          timestamp=decode_timestamp(self.timestamp))
+        # Share the counts, so tokens counted on the copy are kept
+        if self.tokens is None:
+            self.tokens = {}
+        token_counts(message, self.tokens)
+        return message
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+class ConversationHistory(Sequence[Message]):
+    """Memory-bounded conversation history.
+
+    Messages are kept as slotted records with interned roles and integer
+    timestamps, and indexing returns fresh ``Message`` objects. Only the
+    newest ``max_resident`` messages stay in memory: once a quarter more
+    have accumulated, the oldest are spilled to a temporary JSONL file
+    and read back transparently when accessed. Counts per role are kept
+    up to date, so summaries never touch spilled messages.
+
+    ``generation`` is unique to each history and changes on ``clear``,
+    so a saved length is only valid while the generation is the same.
+    """
+
+    def __init__(self, messages: Iterable[Message] = (),
+                 max_resident: Optional[int] = None,
+                 spill_dir: Optional[str] = None):
+        self.max_resident = max_resident
+        self.spill_dir = spill_dir
+        self._hot: List[_Record] = []
+        self._offsets = array("q")
+        self._spill_path: Optional[str] = None
+        self._spill_size = 0
+        self._finalizer: Optional[weakref.finalize] = None
+        self._role_counts: Dict[str, int] = {}
+        self.generation = next(_generations)
+        self.extend(messages)
+
+    def __len__(self) -> int:
+        return len(self._offsets) + len(self._hot)
+
+    @property
+    def spilled(self) -> int:
+        """Number of messages spilled to disk."""
+        return len(self._offsets)
+
+    def count_role(self, role: str) -> int:
+        """Number of messages with a role."""
+        return self._role_counts.get(role, 0)
+
+    def role_counts(self) -> Dict[str, int]:
+        """Number of messages per role."""
+        return dict(self._role_counts)
+
+    def append(self, message: Message) -> None:
+        """Append a message, spilling old ones if over the limit."""
+        record = _Record.from_message(message)
+        self._hot.append(record)
+        self._role_counts[record.role] = (
+            self._role_counts.get(record.role, 0) + 1
+        )
+        if self.max_resident is not None and (
+            len(self._hot) - self.max_resident
+            >= max(1, self.max_resident // 4)
+        ):
+            self._spill(len(self._hot) - self.max_resident)
+
+    def extend(self, messages: Iterable[Message]) -> None:
+        """Append several messages."""
+        for message in messages:
+            self.append(message)
+
+    def clear(self) -> None:
+        """Remove every message and the spill file."""
+        self.generation = next(_generations)
+        self._hot = []
+        self._offsets = array("q")
+        self._role_counts = {}
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self._spill_path = None
+        self._spill_size = 0
+
+    def _spill(self, count: int) -> None:
+        """Move the ``count`` oldest in-memory records to the spill file."""
+        if self._spill_path is None:
+            fd, self._spill_path = tempfile.mkstemp(
+                dir=self.spill_dir, prefix="history-", suffix=".jsonl"
+            )
+            os.close(fd)
+            self._finalizer = weakref.finalize(
+                self, _remove_file, self._spill_path
+            )
+        lines = []
+        for record in self._hot[:count]:
+            line = json.dumps(
+                [record.role, record.content, record.timestamp,
+                 record.tokens],
+                ensure_ascii=False, separators=(",", ":"),
+            ).encode("utf-8") + b"\n"
+            self._offsets.append(self._spill_size)
+            self._spill_size += len(line)
+            lines.append(line)
+        # The file is only opened while in use, so idle histories hold no
+        # file descriptors
+        with open(self._spill_path, "ab") as f:
+            f.writelines(lines)
+        del self._hot[:count]
+
+    def _read_spilled(self, start: int, stop: int) -> Iterator[_Record]:
+        """Read spilled records ``start`` to ``stop`` sequentially."""
+        if start >= stop or self._spill_path is None:
+            return
+        with open(self._spill_path, "rb") as f:
+            f.seek(self._offsets[start])
+            for _ in range(stop - start):
+                role, content, timestamp, tokens = json.loads(f.readline())
+                yield _Record(sys.intern(role), content, timestamp, tokens)
+
+    def _records(self, start: int, stop: int) -> Iterator[_Record]:
+        spilled = len(self._offsets)
+        yield from self._read_spilled(start, min(stop, spilled))
+        yield from self._hot[max(start, spilled) - spilled:
+                             max(stop, spilled) - spilled]
+
+    @overload
+    def __getitem__(self, index: int) -> Message: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Message]: ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[Message, List[Message]]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return [r.to_message() for r in self._records(start, stop)]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return next(self._records(index, index + 1)).to_message()
+
+    def __iter__(self) -> Iterator[Message]:
+        for record in self._records(0, len(self)):
+            yield record.to_message()
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (list, ConversationHistory)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __add__(self, other: Iterable[Message]) -> List[Message]:
+        return list(self) + list(other)
+
+    def __radd__(self, other: Iterable[Message]) -> List[Message]:
+        return list(other) + list(self)
+
+    def __repr__(self) -> str:
+        return (f"ConversationHistory({len(self)} messages, "
+                f"{self.spilled} spilled)")
@@ -0,0 +1,115 @@
+import math
+from typing import Any, Dict, Optional
+
+
+class LatencyHistogram:
+    """Latency distribution in a fixed number of log-spaced buckets.
+
+    Recording is O(1) and percentiles cost O(buckets) regardless of how
+    many samples were recorded; a percentile is the upper bound of its
+    bucket, so it overestimates by less than ``growth - 1`` (10%).
+    """
+
+    def __init__(self, min_value: float = 0.001, max_value: float = 600.0,
+                 growth: float = 1.1):
+        self.min_value = min_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self._buckets = [0] * (
+            math.ceil(math.log(max_value / min_value) / self._log_growth) + 2
+        )
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Record one latency."""
+        if seconds <= self.min_value:
+            index = 0
+        else:
+            index = min(
+                len(self._buckets) - 1,
+                math.ceil(math.log(seconds / self.min_value)
+                          / self._log_growth),
+            )
+        self._buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Mean latency, or None without samples."""
+        return self.total / self.count if self.count else None
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Latency below which ``fraction`` of the samples fall."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for index, bucket in enumerate(self._buckets):
+            seen += bucket
+            if seen >= rank:
+                return min(self.min_value * self.growth ** index, self.max)
+        return self.max
+
+
+class UsageStats:
+    """Running totals of the requests an agent made.
+
+    Token counts come from ``ChatResponse.usage``; streamed replies
+    contribute their latency and time to first token only.
+    """
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.failed_requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.total_tokens = 0
+        self.cached_tokens = 0
+        self.latency = LatencyHistogram()
+        self.time_to_first_token = LatencyHistogram()
+
+    def record_response(self, seconds: float,
+                        usage: Optional[Dict[str, Any]] = None) -> None:
+        """Record a successful request and its token usage."""
+        self.requests += 1
+        self.latency.record(seconds)
+        if usage:
+            self.prompt_tokens += usage.get("prompt_tokens") or 0
+            self.completion_tokens += usage.get("completion_tokens") or 0
+            self.total_tokens += usage.get("total_tokens") or 0
+            self.cached_tokens += usage.get("cached_tokens") or 0
+
+    @property
+    def prompt_cache_hit_rate(self) -> float:
+        """Fraction of prompt tokens served from the provider's cache."""
+        if not self.prompt_tokens:
+            return 0.0
+        return self.cached_tokens / self.prompt_tokens
+
+    def record_failure(self) -> None:
+        """Record a failed request."""
+        self.requests += 1
+        self.failed_requests += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the totals and latency percentiles as a dictionary."""
+        return {
+            "requests": self.requests,
+            "failed_requests": self.failed_requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "cached_tokens": self.cached_tokens,
+            "prompt_cache_hit_rate": self.prompt_cache_hit_rate,
+            "latency_mean": self.latency.mean,
+            "latency_p50": self.latency.percentile(0.5),
+            "latency_p90": self.latency.percentile(0.9),
+            "latency_p99": self.latency.percentile(0.99),
+            "time_to_first_token_p50": (
+                self.time_to_first_token.percentile(0.5)
+            ),
+        }
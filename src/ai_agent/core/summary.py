@@ -0,0 +1,105 @@
+import asyncio
+from typing import Any, Dict, Optional, Sequence
+
+from .exceptions import ConfigurationException
+from src.ai_agent.providers.base_provider import BaseProvider, Message
+from src.ai_agent.utils.logger import setup_logger
+
+SUMMARY_INSTRUCTIONS = (
+    "You keep a concise running summary of a conversation between a user "
+    "and an assistant. Merge the new messages into the current summary, "
+    "keeping facts, names, numbers, decisions, user preferences and open "
+    "questions. Reply with the updated summary only."
+)
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+class ConversationSummarizer:
+    """Rolling summary of the messages older than the recent window.
+
+    Once ``batch_messages`` messages have piled up beyond the
+    ``keep_messages`` most recent ones, they are merged into the summary
+    by a background task, so turns never wait for it. Positions are
+    counted from the start of the conversation; ``covered`` messages are
+    represented by the summary and need not be sent again.
+    """
+
+    def __init__(self, provider: BaseProvider, keep_messages: int = 6,
+                 batch_messages: int = 10, max_tokens: int = 256):
+        if keep_messages < 1 or batch_messages < 1:
+            raise ConfigurationException(
+                "Summary keep and batch sizes must be at least 1"
+            )
+        self.provider = provider
+        self.keep_messages = keep_messages
+        self.batch_messages = batch_messages
+        self.max_tokens = max_tokens
+        self.text = ""
+        self.covered = 0
+        # Built once per update so its token count is cached on it
+        self.message: Optional[Message] = None
+        self.stats: Dict[str, int] = {"updates": 0, "failures": 0}
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.logger = setup_logger(self.__class__.__name__)
+
+    def due(self, total: int) -> bool:
+        """Whether enough old messages wait to be summarized."""
+        if self._task is not None and not self._task.done():
+            return False
+        pending = total - self.covered - self.keep_messages
+        return pending >= self.batch_messages
+
+    def schedule(self, messages: Sequence[Message], upto: int) -> None:
+        """Merge ``messages``, ending at ``upto``, in the background."""
+        self._task = asyncio.create_task(
+            self._update(list(messages), upto)
+        )
+
+    def _request(self, messages: Sequence[Message]) -> str:
+        lines = "\n".join(f"{m.role}: {m.content}" for m in messages)
+        return (f"Current summary:\n{self.text or '(empty)'}\n\n"
+                f"New messages:\n{lines}")
+
+    async def _update(self, messages: Sequence[Message], upto: int) -> None:
+        try:
+            response = await self.provider.chat(
+                messages=[
+                    Message(role="system", content=SUMMARY_INSTRUCTIONS),
+                    Message(role="user", content=self._request(messages)),
+                ],
+                max_tokens=self.max_tokens,
+                temperature=0,
+            )
+        except Exception as e:
+            # The same messages are summarized again after the next turn
+            self.stats["failures"] += 1
+            self.logger.warning("Conversation summary failed: %s", e)
+            return
+        self.text = response.content.strip()
+        self.covered = upto
+        self.message = Message(role="system",
+                               content=SUMMARY_PREFIX + self.text)
+        self.stats["updates"] += 1
+        self.logger.debug("Summarized %s messages", upto)
+
+    async def wait(self) -> None:
+        """Wait for the summary update in progress, if any."""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    def reset(self) -> None:
+        """Drop the summary and any update in progress."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._task = None
+        self.text = ""
+        self.covered = 0
+        self.message = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the summary state as a dictionary."""
+        return {
+            "summarized_messages": self.covered,
+            "summary_updates": self.stats["updates"],
+            "summary_failures": self.stats["failures"],
+        }
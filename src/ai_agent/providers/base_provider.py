@@ -1,15 +1,58 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import (
+    AsyncIterator, Callable, List, Dict, Any, Optional, Sequence, Union
+)
 from pydantic import BaseModel
 
+from src.ai_agent.utils.concurrency import bounded_map
+
 
 class Message(BaseModel):
     """Message model."""
 
+    # Token counts per tokenizer live in a slot rather than a field or
+    # private attribute, so equality and serialization ignore them and
+    # they are freed together with the message
+    __slots__ = ("_token_counts",)
+
     role: str
     content: str
     timestamp: Optional[str] = None
 
+    def count_tokens(self, tokenizer_name: str,
+                     counter: Callable[["Message"], int]) -> int:
+        """Count tokens with ``counter``, caching per tokenizer."""
+        counts = token_counts(self)
+        count = counts.get(tokenizer_name)
+        if count is None:
+            count = counter(self)
+            counts[tokenizer_name] = count
+        return count
+
+
+def token_counts(message: Message,
+                 counts: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Token counts cached for ``message``, per tokenizer.
+
+    Passing ``counts`` makes the message share that dictionary, so that
+    counts made on one copy of a message are seen by the others.
+    """
+    if counts is None:
+        counts = cached_token_counts(message)
+        if counts is not None:
+            return counts
+        counts = {}
+    object.__setattr__(message, "_token_counts", counts)
+    return counts
+
+
+def cached_token_counts(message: Message) -> Optional[Dict[str, int]]:
+    """Token counts already cached for ``message``, if any."""
+    counts: Optional[Dict[str, int]]
+    counts = getattr(message, "_token_counts", None)
+    return counts
+
 
 class ChatResponse(BaseModel):
     """Chat response model."""
@@ -19,6 +62,29 @@ class ChatResponse(BaseModel):
     usage: Optional[Dict[str, Any]] = None
 
 
+class BatchResult(BaseModel):
+    """Outcome of one item of a batch."""
+
+    index: int
+    response: Optional[ChatResponse] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the item succeeded."""
+        return self.error is None
+
+    @classmethod
+    def from_outcome(cls, index: int,
+                     outcome: Union[ChatResponse, Exception]
+                     ) -> "BatchResult":
+        """Build a result from a response or the exception raised."""
+        if isinstance(outcome, Exception):
+            return cls(index=index,
+                       error=f"{outcome.__class__.__name__}: {outcome}")
+        return cls(index=index, response=outcome)
+
+
 class BaseProvider(ABC):
     """Base class for AI providers."""
 
@@ -31,7 +97,57 @@ class BaseProvider(ABC):
         """Send chat messages and get response."""
         pass
 
+    async def stream(self, messages: List[Message],
+                     **kwargs: Any) -> AsyncIterator[str]:
+        """Stream response tokens as they arrive.
+
+        Providers without native streaming yield the whole completion
+        as a single chunk.
+        """
+        response = await self.chat(messages, **kwargs)
+        yield response.content
+
+    async def iter_batch_chat(
+        self,
+        conversations: Sequence[List[Message]],
+        concurrency: int = 8,
+        **kwargs: Any,
+    ) -> AsyncIterator[BatchResult]:
+        """Run independent chats concurrently, yielding as they complete."""
+        async def run(messages: List[Message]) -> ChatResponse:
+            return await self.chat(messages, **kwargs)
+
+        async for index, outcome in bounded_map(run, conversations,
+                                                concurrency):
+            yield BatchResult.from_outcome(index, outcome)
+
+    async def batch_chat(
+        self,
+        conversations: Sequence[List[Message]],
+        concurrency: int = 8,
+        **kwargs: Any,
+    ) -> List[BatchResult]:
+        """Run independent chats concurrently, returning results in order.
+
+        A failed item is reported in its result and does not abort the
+        rest of the batch.
+        """
+        results: List[Optional[BatchResult]] = [None] * len(conversations)
+        async for result in self.iter_batch_chat(
+            conversations, concurrency=concurrency, **kwargs
+        ):
+            results[result.index] = result
+        return [result for result in results if result is not None]
+
     @abstractmethod
     def validate_config(self) -> bool:
         """Validate provider configuration."""
         pass
+
+    async def avalidate_config(self) -> bool:
+        """Validate provider configuration without blocking the loop."""
+        return await asyncio.to_thread(self.validate_config)
+
+    async def aclose(self) -> None:
+        """Release network resources held by the provider."""
+        pass
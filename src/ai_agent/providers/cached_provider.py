@@ -0,0 +1,108 @@
+import asyncio
+from typing import Any, AsyncIterator, Callable, List, Optional, TypeVar
+
+from .base_provider import BaseProvider, ChatResponse, Message
+from .response_cache import CacheBackend, CacheStats, make_request_key
+from src.ai_agent.telemetry.instrumentation import current_call
+
+T = TypeVar("T")
+
+
+class CachedProvider(BaseProvider):
+    """Provider wrapper that serves identical requests from a cache.
+
+    Only deterministic requests (temperature 0) are cached unless
+    ``cache_all`` is set; ``temperature`` is the configured one used when
+    a request does not pass its own. Keys are confined to ``scope``, the
+    endpoint and credentials of the wrapped provider.
+    """
+
+    def __init__(self, provider: BaseProvider, backend: CacheBackend,
+                 cache_all: bool = False, scope: str = "",
+                 temperature: Optional[float] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.provider = provider
+        self.backend = backend
+        self.cache_all = cache_all
+        self.scope = scope
+        self.temperature = temperature
+        self.stats = CacheStats()
+
+    @property
+    def model(self) -> str:
+        """Model of the wrapped provider."""
+        return str(getattr(self.provider, "model", "unknown"))
+
+    async def _call(self, func: Callable[..., T], *args: Any) -> T:
+        if self.backend.blocking:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    def _cache_key(self, messages: List[Message],
+                   kwargs: Any) -> Optional[str]:
+        params = dict(kwargs)
+        if self.temperature is not None:
+            params.setdefault("temperature", self.temperature)
+        if not self.cache_all and params.get("temperature") != 0:
+            self.stats.bypassed += 1
+            return None
+        return make_request_key(self.model, messages, self.scope, **params)
+
+    def _record_hit(self) -> None:
+        self.stats.hits += 1
+        record = current_call()
+        if record is not None:
+            record.cache = "exact"
+
+    async def chat(self, messages: List[Message],
+                   **kwargs: Any) -> ChatResponse:
+        """Serve the chat from the cache or the wrapped provider."""
+        key = self._cache_key(messages, kwargs)
+        if key is None:
+            return await self.provider.chat(messages, **kwargs)
+
+        cached = await self._call(self.backend.get, key)
+        if cached is not None:
+            self._record_hit()
+            return cached
+
+        self.stats.misses += 1
+        response = await self.provider.chat(messages, **kwargs)
+        await self._call(self.backend.set, key, response)
+        return response
+
+    async def stream(self, messages: List[Message],
+                     **kwargs: Any) -> AsyncIterator[str]:
+        """Stream from the wrapped provider, replaying cached replies."""
+        key = self._cache_key(messages, kwargs)
+        if key is None:
+            async for token in self.provider.stream(messages, **kwargs):
+                yield token
+            return
+
+        cached = await self._call(self.backend.get, key)
+        if cached is not None:
+            self._record_hit()
+            yield cached.content
+            return
+
+        self.stats.misses += 1
+        parts: List[str] = []
+        async for token in self.provider.stream(messages, **kwargs):
+            parts.append(token)
+            yield token
+        response = ChatResponse(content="".join(parts).strip(),
+                                model=self.model)
+        await self._call(self.backend.set, key, response)
+
+    def validate_config(self) -> bool:
+        """Validate the wrapped provider."""
+        return self.provider.validate_config()
+
+    async def avalidate_config(self) -> bool:
+        """Validate the wrapped provider without blocking the loop."""
+        return await self.provider.avalidate_config()
+
+    async def aclose(self) -> None:
+        """Release the wrapped provider's resources."""
+        await self.provider.aclose()
@@ -0,0 +1,161 @@
+import importlib.util
+import threading
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import openai
+from pydantic import BaseModel
+
+# Pool limits must come from the HTTP library the SDK builds its clients
+# on: httpx2 for current releases, httpx before that
+try:
+    import httpx2 as httpx
+except ImportError:  # pragma: no cover
+    import httpx  # type: ignore[no-redef]
+
+from .validation_cache import ValidationCache
+from src.ai_agent.core.exceptions import ConfigurationException
+
+
+class PoolConfig(BaseModel):
+    """HTTP connection pool configuration."""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    # Retries performed by the OpenAI SDK itself
+    max_retries: int = 2
+
+    model_config = {"frozen": True}
+
+    def limits(self) -> httpx.Limits:
+        """Build the httpx pool limits."""
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+ClientKey = Tuple[str, PoolConfig]
+ResponseHook = Callable[[Mapping[str, str], int], None]
+
+
+class ClientRegistry:
+    """Process-wide registry of OpenAI clients keyed by credentials.
+
+    Providers created with the same API key, endpoint and pool settings
+    share one client and therefore one pool of warm keep-alive
+    connections. Async clients are bound to the event loop they first
+    connect on, so call ``aclose`` before that loop shuts down.
+    """
+
+    def __init__(self) -> None:
+        self._async_clients: Dict[ClientKey, openai.AsyncOpenAI] = {}
+        self._sync_clients: Dict[ClientKey, openai.OpenAI] = {}
+        self._response_hooks: Dict[ClientKey, List[ResponseHook]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(api_key: str, base_url: Optional[str],
+             pool: PoolConfig) -> ClientKey:
+        return ValidationCache.make_key(api_key, base_url), pool
+
+    @staticmethod
+    def _check_http2(pool: PoolConfig) -> None:
+        if pool.http2 and importlib.util.find_spec("h2") is None:
+            raise ConfigurationException(
+                "HTTP/2 requires the 'h2' package: pip install httpx[http2]"
+            )
+
+    def get_async_client(self, api_key: str, base_url: Optional[str] = None,
+                         pool: Optional[PoolConfig] = None
+                         ) -> openai.AsyncOpenAI:
+        """Get or create the shared async client for these credentials."""
+        pool = pool or PoolConfig()
+        key = self._key(api_key, base_url, pool)
+        with self._lock:
+            client = self._async_clients.get(key)
+            if client is None:
+                self._check_http2(pool)
+                client = openai.AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    max_retries=pool.max_retries,
+                    http_client=openai.DefaultAsyncHttpxClient(
+                        limits=pool.limits(), http2=pool.http2,
+                        event_hooks={"response": [self._dispatcher(key)]},
+                    ),
+                )
+                self._async_clients[key] = client
+            return client
+
+    def _dispatcher(self, key: ClientKey) -> Callable[[Any], Any]:
+        async def dispatch(response: Any) -> None:
+            for hook in self._response_hooks.get(key, ()):
+                hook(response.headers, response.status_code)
+        return dispatch
+
+    def add_response_hook(self, hook: ResponseHook, api_key: str,
+                          base_url: Optional[str] = None,
+                          pool: Optional[PoolConfig] = None) -> None:
+        """Call ``hook(headers, status_code)`` for every async response.
+
+        Adding the same hook twice for a client has no effect.
+        """
+        key = self._key(api_key, base_url, pool or PoolConfig())
+        with self._lock:
+            hooks = self._response_hooks.setdefault(key, [])
+            if hook not in hooks:
+                hooks.append(hook)
+
+    def get_sync_client(self, api_key: str, base_url: Optional[str] = None,
+                        pool: Optional[PoolConfig] = None) -> openai.OpenAI:
+        """Get or create the shared blocking client for these credentials."""
+        pool = pool or PoolConfig()
+        key = self._key(api_key, base_url, pool)
+        with self._lock:
+            client = self._sync_clients.get(key)
+            if client is None:
+                self._check_http2(pool)
+                client = openai.OpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    max_retries=pool.max_retries,
+                    http_client=openai.DefaultHttpxClient(
+                        limits=pool.limits(), http2=pool.http2
+                    ),
+                )
+                self._sync_clients[key] = client
+            return client
+
+    def __len__(self) -> int:
+        return len(self._async_clients) + len(self._sync_clients)
+
+    def clear(self) -> None:
+        """Forget all clients without closing them."""
+        with self._lock:
+            self._async_clients.clear()
+            self._sync_clients.clear()
+            self._response_hooks.clear()
+
+    async def aclose(self) -> None:
+        """Close every registered client and empty the registry."""
+        with self._lock:
+            async_clients = list(self._async_clients.values())
+            sync_clients = list(self._sync_clients.values())
+            self._async_clients.clear()
+            self._sync_clients.clear()
+
+        for sync_client in sync_clients:
+            sync_client.close()
+        for async_client in async_clients:
+            await async_client.close()
+
+
+client_registry = ClientRegistry()
+
+
+async def shutdown_clients() -> None:
+    """Close the shared clients of the process-wide registry."""
+    await client_registry.aclose()
@@ -0,0 +1,77 @@
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .base_provider import BaseProvider, ChatResponse, Message
+from .response_cache import make_request_key
+from src.ai_agent.utils.concurrency import SingleFlight
+
+
+class CoalescingProvider(BaseProvider):
+    """Provider wrapper sending identical concurrent requests only once.
+
+    Requests are identified by the hash of their model, messages and
+    parameters, prefixed with ``namespace`` so that providers with
+    different credentials or endpoints never share a call. Every caller
+    of a coalesced chat gets its own copy of the ``ChatResponse``; every
+    subscriber of a coalesced stream gets all of its tokens.
+    """
+
+    def __init__(self, provider: BaseProvider,
+                 group: Optional[SingleFlight] = None,
+                 namespace: str = "", **kwargs: Any):
+        super().__init__(**kwargs)
+        self.provider = provider
+        self.group = group if group is not None else SingleFlight()
+        self.namespace = namespace
+
+    @property
+    def model(self) -> str:
+        """Model of the wrapped provider."""
+        return str(getattr(self.provider, "model", "unknown"))
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Upstream calls, coalesced and cancelled requests."""
+        return self.group.stats
+
+    def _key(self, messages: List[Message], kwargs: Any) -> str:
+        return (f"{self.namespace}:"
+                f"{make_request_key(self.model, messages, **kwargs)}")
+
+    async def chat(self, messages: List[Message],
+                   **kwargs: Any) -> ChatResponse:
+        """Chat, joining an identical request already in flight."""
+        response = await self.group.do(
+            self._key(messages, kwargs),
+            lambda: self.provider.chat(messages, **kwargs),
+        )
+        # Callers may modify their response; keep the shared one intact
+        return response.model_copy(deep=True)
+
+    async def stream(self, messages: List[Message],
+                     **kwargs: Any) -> AsyncIterator[str]:
+        """Stream, subscribing to an identical stream already in flight."""
+        async for token in self.group.stream(
+            self._key(messages, kwargs),
+            lambda: self.provider.stream(messages, **kwargs),
+        ):
+            yield token
+
+    def validate_config(self) -> bool:
+        """Validate the wrapped provider."""
+        return self.provider.validate_config()
+
+    async def avalidate_config(self) -> bool:
+        """Validate the wrapped provider without blocking the loop."""
+        return await self.provider.avalidate_config()
+
+    async def aclose(self) -> None:
+        """Release the wrapped provider's resources."""
+        await self.provider.aclose()
+
+
+_shared_group = SingleFlight()
+
+
+def shared_single_flight() -> SingleFlight:
+    """Get the process-wide group of in-flight requests."""
+    return _shared_group
@@ -0,0 +1,68 @@
+from typing import Any, AsyncIterator, List, Optional
+
+from .base_provider import BaseProvider, ChatResponse, Message
+from src.ai_agent.telemetry.instrumentation import Telemetry
+
+
+class InstrumentedProvider(BaseProvider):
+    """Provider wrapper recording each call with a ``Telemetry``.
+
+    Calls are recorded as ``provider.chat`` / ``provider.stream`` and
+    nested in the agent call in progress. Wrapping the innermost
+    provider records every attempt, including retries and hedges.
+    """
+
+    def __init__(self, provider: BaseProvider, telemetry: Telemetry,
+                 **kwargs: Any):
+        super().__init__(**kwargs)
+        self.provider = provider
+        self.telemetry = telemetry
+
+    @property
+    def model(self) -> str:
+        """Model of the wrapped provider."""
+        return str(getattr(self.provider, "model", "unknown"))
+
+    async def chat(self, messages: List[Message],
+                   **kwargs: Any) -> ChatResponse:
+        """Chat through the wrapped provider, recording the call."""
+        record = self.telemetry.start("provider.chat", self.model)
+        try:
+            response = await self.provider.chat(messages, **kwargs)
+        except BaseException as e:
+            self.telemetry.finish(record, e)
+            raise
+        record.first_byte()
+        record.add_usage(response.usage)
+        self.telemetry.finish(record)
+        return response
+
+    async def stream(self, messages: List[Message],
+                     **kwargs: Any) -> AsyncIterator[str]:
+        """Stream through the wrapped provider, recording the call."""
+        record = self.telemetry.start("provider.stream", self.model)
+        error: Optional[BaseException] = None
+        try:
+            async for token in self.provider.stream(messages, **kwargs):
+                record.first_byte()
+                yield token
+        except GeneratorExit:
+            # The consumer stopped early; that is not a failure
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.telemetry.finish(record, error)
+
+    def validate_config(self) -> bool:
+        """Validate the wrapped provider."""
+        return self.provider.validate_config()
+
+    async def avalidate_config(self) -> bool:
+        """Validate the wrapped provider without blocking the loop."""
+        return await self.provider.avalidate_config()
+
+    async def aclose(self) -> None:
+        """Release the wrapped provider's resources."""
+        await self.provider.aclose()
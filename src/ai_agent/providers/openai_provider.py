@@ -1,10 +1,20 @@
 import openai
-from typing import Any, cast, List
+from contextlib import nullcontext
+from typing import (
+    Any, AsyncContextManager, AsyncIterator, cast, List, Optional
+)
 
 from openai.types.chat import ChatCompletionMessageParam
 
 from .base_provider import BaseProvider, Message, ChatResponse
-from src.ai_agent.core.exceptions import APIException, ConfigurationException
+from .client_registry import ClientRegistry, PoolConfig, client_registry
+from .rate_limiter import RateLimiter, Reservation
+from .validation_cache import ValidationCache, shared_validation_cache
+from src.ai_agent.core.context import get_tokenizer
+from src.ai_agent.core.exceptions import (
+    APIException, ConfigurationException, RateLimitException,
+    TransientAPIException
+)
 from src.ai_agent.utils.logger import setup_logger
 
 
@@ -12,25 +22,112 @@ class OpenAIProvider(BaseProvider):
     """OpenAI API provider."""
 
     def __init__(self, api_key: str,
-                 model: str = "gpt-3.5-turbo", **kwargs: Any):
+                 model: str = "gpt-3.5-turbo",
+                 base_url: Optional[str] = None,
+                 validation_cache: Optional[ValidationCache] = None,
+                 pool_config: Optional[PoolConfig] = None,
+                 registry: Optional[ClientRegistry] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 **kwargs: Any):
         super().__init__(**kwargs)
 
         if not api_key:
             raise ConfigurationException("OpenAI API key is required")
 
-        self.client = openai.OpenAI(api_key=api_key)
+        self.api_key = api_key
+        self.base_url = base_url
+        self.pool_config = pool_config or PoolConfig()
+        self.registry = (
+            registry if registry is not None else client_registry
+        )
+        # Async client shared with every provider using the same
+        # credentials, so sessions reuse warm pooled connections
+        self.client = self.registry.get_async_client(
+            api_key, base_url, self.pool_config
+        )
         self.model = model
+        self.validation_cache = (
+            validation_cache or shared_validation_cache()
+        )
+        self._validation_key = ValidationCache.make_key(api_key, base_url)
+        self.rate_limiter = rate_limiter
+        if rate_limiter is not None:
+            # Keep the limiter in sync with the server's view of the quota
+            self.registry.add_response_hook(
+                rate_limiter.observe_headers, api_key, base_url,
+                self.pool_config,
+            )
         self.logger = setup_logger(self.__class__.__name__)
 
     def validate_config(self) -> bool:
         """Validate OpenAI configuration."""
+        if self.validation_cache.is_valid(self._validation_key):
+            return True
         try:
-            self.client.models.list()
+            # Validation is synchronous, so it uses a blocking client
+            self.registry.get_sync_client(
+                self.api_key, self.base_url, self.pool_config
+            ).models.list()
+            self.validation_cache.mark_valid(self._validation_key)
             return True
         except Exception as e:
-            self.logger.error(f"OpenAI configuration validation failed: {e}")
+            self.logger.error("OpenAI configuration validation failed: %s", e)
             return False
 
+    async def avalidate_config(self) -> bool:
+        """Validate OpenAI configuration without blocking the loop."""
+        if self.validation_cache.is_valid(self._validation_key):
+            return True
+        try:
+            await self.client.models.list()
+            self.validation_cache.mark_valid(self._validation_key)
+            return True
+        except Exception as e:
+            self.logger.error("OpenAI configuration validation failed: %s", e)
+            return False
+
+    @staticmethod
+    def _to_openai_messages(
+        messages: List[Message],
+    ) -> List[ChatCompletionMessageParam]:
+        """Convert messages to OpenAI format."""
+        return cast(
+            List[ChatCompletionMessageParam],
+            [{"role": m.role, "content": m.content} for m in messages]
+        )
+
+    def _reserve(self, messages: List[Message],
+                 max_tokens: int) -> AsyncContextManager[Reservation]:
+        """Reserve rate-limit budget for a request, if limited."""
+        if self.rate_limiter is None:
+            return nullcontext(Reservation())
+        tokenizer = get_tokenizer(self.model)
+        estimated = max_tokens + sum(
+            tokenizer.count_message(m) for m in messages
+        )
+        return self.rate_limiter.reserve(estimated)
+
+    def _convert_error(self, error: Exception) -> APIException:
+        """Map an OpenAI SDK error onto the agent's exceptions.
+
+        Rate limits, timeouts, connection failures and 5xx responses are
+        transient and may be retried; everything else is fatal.
+        """
+        if isinstance(error, openai.RateLimitError):
+            self.logger.error("OpenAI rate limit exceeded: %s", error)
+            return RateLimitException(f"OpenAI rate limit exceeded: {error}")
+        if isinstance(error, openai.APIConnectionError) or (
+            isinstance(error, openai.APIStatusError)
+            and error.status_code >= 500
+        ):
+            self.logger.error("OpenAI transient error: %s", error)
+            return TransientAPIException(f"OpenAI API error: {error}")
+        if isinstance(error, openai.APIError):
+            self.logger.error("OpenAI API error: %s", error)
+            return APIException(f"OpenAI API error: {error}")
+        self.logger.error("Unexpected error: %s", error)
+        return APIException(f"Unexpected error: {error}")
+
     async def chat(
         self,
         messages: List[Message],
@@ -41,24 +138,22 @@ class OpenAIProvider(BaseProvider):
         """Send chat to OpenAI API."""
 
         try:
-            # Convert messages to OpenAI format
-            openai_messages: List[ChatCompletionMessageParam] = cast(
-                List[ChatCompletionMessageParam],
-                [{"role": m.role, "content": m.content} for m in messages]
-            )
-
-            self.logger.debug(
-                f"Sending {len(openai_messages)} messages to OpenAI"
-            )
-
-            # Make API call
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=openai_messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                **kwargs,
-            )
+            openai_messages = self._to_openai_messages(messages)
+
+            self.logger.debug("Sending %s messages to OpenAI",
+                              len(openai_messages))
+
+            # Make API call within the rate-limit budget
+            async with self._reserve(messages, max_tokens) as reservation:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=openai_messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    **kwargs,
+                )
+                if response.usage is not None:
+                    reservation.actual_tokens = response.usage.total_tokens
 
             # Extract response
             content = response.choices[0].message.content.strip()
@@ -68,6 +163,12 @@ class OpenAIProvider(BaseProvider):
                     "completion_tokens": response.usage.completion_tokens,
                     "total_tokens": response.usage.total_tokens,
                 }
+                # Prompt tokens served from the provider's prefix cache
+                details = getattr(response.usage, "prompt_tokens_details",
+                                  None)
+                cached = getattr(details, "cached_tokens", None)
+                if cached is not None:
+                    usage["cached_tokens"] = cached
             else:
                 usage = {
                     "prompt_tokens": 0,
@@ -75,13 +176,49 @@ class OpenAIProvider(BaseProvider):
                     "total_tokens": 0,
                 }
 
-            self.logger.debug(f"Received response: {usage}")
+            self.logger.debug("Received response: %s", usage)
 
             return ChatResponse(content=content, model=self.model, usage=usage)
 
-        except openai.APIError as e:
-            self.logger.error(f"OpenAI API error: {e}")
-            raise APIException(f"OpenAI API error: {e}")
         except Exception as e:
-            self.logger.error(f"Unexpected error: {e}")
-            raise APIException(f"Unexpected error: {e}")
+            raise self._convert_error(e) from e
+
+    async def stream(
+        self,
+        messages: List[Message],
+        max_tokens: int = 150,
+        temperature: float = 0.7,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        """Stream chat tokens from OpenAI API as server-sent events."""
+
+        try:
+            openai_messages = self._to_openai_messages(messages)
+
+            self.logger.debug("Streaming %s messages from OpenAI",
+                              len(openai_messages))
+
+            async with self._reserve(messages, max_tokens) as reservation:
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=openai_messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **kwargs,
+                )
+
+                async for chunk in stream:
+                    if chunk.usage is not None:
+                        reservation.actual_tokens = chunk.usage.total_tokens
+                        self.logger.debug("Stream finished: %s tokens",
+                                          chunk.usage.total_tokens)
+                    if not chunk.choices:
+                        continue
+                    token = chunk.choices[0].delta.content
+                    if token:
+                        yield token
+
+        except Exception as e:
+            raise self._convert_error(e) from e
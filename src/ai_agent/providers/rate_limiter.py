@@ -0,0 +1,351 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import (
+    Any, AsyncIterator, Deque, Dict, Mapping, Optional, Tuple
+)
+
+from src.ai_agent.telemetry.instrumentation import current_call
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate.
+
+    The level may go negative when a reservation turns out to have been
+    underestimated; later callers then wait for the debt to refill.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = 10.0):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity,
+                         self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` tokens are available."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float) -> None:
+        """Take tokens out of the bucket."""
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Give back (positive) or take extra (negative) tokens."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+    def cap(self, remaining: float) -> None:
+        """Lower the level to a server-reported remaining budget."""
+        self._refill()
+        self.level = min(self.level, remaining)
+
+
+class SharedTokenBucket(TokenBucket):
+    """Token bucket whose level is shared by several processes.
+
+    Create it in the parent and hand it to worker processes when they
+    start (e.g. through a pool initializer); every operation is atomic
+    across processes. Relies on ``time.monotonic`` being system-wide,
+    as it is on Linux and macOS.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = 10.0,
+                 context: Optional[Any] = None):
+        context = context or multiprocessing.get_context()
+        # Level and last refill time
+        self._state = context.Array("d", 2)
+        super().__init__(per_minute, burst_seconds)
+
+    @property
+    def level(self) -> float:
+        return float(self._state[0])
+
+    @level.setter
+    def level(self, value: float) -> None:
+        self._state[0] = value
+
+    @property
+    def _updated(self) -> float:
+        return float(self._state[1])
+
+    @_updated.setter
+    def _updated(self, value: float) -> None:
+        self._state[1] = value
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` tokens are available."""
+        with self._state.get_lock():
+            return super().wait_time(amount)
+
+    def consume(self, amount: float) -> None:
+        """Take tokens out of the bucket."""
+        with self._state.get_lock():
+            super().consume(amount)
+
+    def adjust(self, amount: float) -> None:
+        """Give back (positive) or take extra (negative) tokens."""
+        with self._state.get_lock():
+            super().adjust(amount)
+
+    def cap(self, remaining: float) -> None:
+        """Lower the level to a server-reported remaining budget."""
+        with self._state.get_lock():
+            super().cap(remaining)
+
+
+class Reservation:
+    """Budget held for one request; set ``actual_tokens`` once known."""
+
+    def __init__(self, estimated_tokens: int = 0):
+        self.estimated_tokens = estimated_tokens
+        self.actual_tokens: Optional[int] = None
+
+
+class RateLimiter:
+    """Client-side request and token budget with adaptive concurrency.
+
+    Requests wait until both the requests-per-minute and tokens-per-minute
+    buckets can cover them and a concurrency slot is free. The
+    concurrency limit grows by one after a full window of successes and
+    halves on every rate-limit response (AIMD), so throughput settles
+    just under the quota instead of oscillating through 429 storms.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None,
+                 tokens_per_minute: Optional[int] = None,
+                 max_concurrency: int = 64, min_concurrency: int = 1,
+                 burst_seconds: float = 10.0,
+                 requests_bucket: Optional[TokenBucket] = None,
+                 tokens_bucket: Optional[TokenBucket] = None):
+        # Given buckets (e.g. shared with other processes) take precedence
+        self.requests = requests_bucket or (
+            TokenBucket(requests_per_minute, burst_seconds)
+            if requests_per_minute else None
+        )
+        self.tokens = tokens_bucket or (
+            TokenBucket(tokens_per_minute, burst_seconds)
+            if tokens_per_minute else None
+        )
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = max_concurrency
+        self.in_flight = 0
+        self.rate_limited = 0
+        self._successes = 0
+        self._lock = threading.Lock()
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+
+    def _budget_wait(self, tokens: int) -> float:
+        with self._lock:
+            wait = max(
+                self.requests.wait_time(1) if self.requests else 0.0,
+                self.tokens.wait_time(tokens) if self.tokens else 0.0,
+            )
+            if wait == 0.0:
+                if self.requests:
+                    self.requests.consume(1)
+                if self.tokens:
+                    self.tokens.consume(tokens)
+            return wait
+
+    async def _acquire_slot(self) -> None:
+        while True:
+            with self._lock:
+                if self.in_flight < self.concurrency_limit:
+                    self.in_flight += 1
+                    return
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                self._wake()
+                raise
+
+    def _wake(self) -> None:
+        with self._lock:
+            free = self.concurrency_limit - self.in_flight
+            while free > 0 and self._waiters:
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    waiter.get_loop().call_soon_threadsafe(
+                        _resolve, waiter
+                    )
+                    free -= 1
+
+    async def acquire(self, estimated_tokens: int = 0) -> None:
+        """Wait for a concurrency slot and budget for one request."""
+        await self._acquire_slot()
+        try:
+            while True:
+                wait = self._budget_wait(estimated_tokens)
+                if wait == 0.0:
+                    return
+                await asyncio.sleep(wait)
+        except BaseException:
+            self.release(success=False)
+            raise
+
+    def release(self, estimated_tokens: int = 0,
+                actual_tokens: Optional[int] = None,
+                success: bool = True,
+                rate_limited: bool = False) -> None:
+        """Free the slot and reconcile the estimate with actual usage.
+
+        Without ``actual_tokens`` the estimate is kept as spent. Pass
+        ``rate_limited`` for 429s not already seen by ``observe_headers``.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if self.tokens and actual_tokens is not None:
+                self.tokens.adjust(estimated_tokens - actual_tokens)
+            if rate_limited:
+                self._on_rate_limited()
+            elif success:
+                self._successes += 1
+                if (self._successes >= self.concurrency_limit
+                        and self.concurrency_limit < self.max_concurrency):
+                    self.concurrency_limit += 1
+                    self._successes = 0
+        self._wake()
+
+    @asynccontextmanager
+    async def reserve(self,
+                      estimated_tokens: int = 0) -> AsyncIterator[Reservation]:
+        """Hold budget and a slot for the duration of one request."""
+        start = time.perf_counter()
+        await self.acquire(estimated_tokens)
+        record = current_call()
+        if record is not None:
+            record.queue_time += time.perf_counter() - start
+        reservation = Reservation(estimated_tokens)
+        success = False
+        try:
+            yield reservation
+            success = True
+        finally:
+            self.release(estimated_tokens, reservation.actual_tokens,
+                         success=success)
+
+    def _on_rate_limited(self) -> None:
+        self.rate_limited += 1
+        self._successes = 0
+        self.concurrency_limit = max(self.min_concurrency,
+                                     self.concurrency_limit // 2)
+
+    def observe_headers(self, headers: Mapping[str, str],
+                        status_code: int = 200) -> None:
+        """Sync the buckets with the provider's rate-limit headers.
+
+        Understands the ``x-ratelimit-remaining-requests`` and
+        ``x-ratelimit-remaining-tokens`` headers sent by OpenAI.
+        """
+        with self._lock:
+            remaining_requests = _header_number(
+                headers, "x-ratelimit-remaining-requests"
+            )
+            remaining_tokens = _header_number(
+                headers, "x-ratelimit-remaining-tokens"
+            )
+            if self.requests and remaining_requests is not None:
+                self.requests.cap(remaining_requests)
+            if self.tokens and remaining_tokens is not None:
+                self.tokens.cap(remaining_tokens)
+            if status_code == 429:
+                self._on_rate_limited()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the limiter state as a dictionary."""
+        return {
+            "concurrency_limit": self.concurrency_limit,
+            "in_flight": self.in_flight,
+            "rate_limited": self.rate_limited,
+            "requests_available": (
+                self.requests.level if self.requests else None
+            ),
+            "tokens_available": self.tokens.level if self.tokens else None,
+        }
+
+
+def _resolve(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def _header_number(headers: Mapping[str, str],
+                   name: str) -> Optional[float]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+_shared_limiters: Dict[str, RateLimiter] = {}
+_shared_lock = threading.Lock()
+# Buckets every shared limiter draws from instead of its own, if set
+_shared_budget: Tuple[Optional[TokenBucket], Optional[TokenBucket]] = (
+    None, None
+)
+
+
+def shared_rate_limiter(key: str = "default",
+                        requests_per_minute: Optional[int] = None,
+                        tokens_per_minute: Optional[int] = None,
+                        max_concurrency: int = 64) -> RateLimiter:
+    """Get the process-wide rate limiter for a quota (e.g. an API key).
+
+    The first call for a key creates the limiter; later calls share it.
+    """
+    with _shared_lock:
+        limiter = _shared_limiters.get(key)
+        if limiter is None:
+            requests_bucket, tokens_bucket = _shared_budget
+            limiter = RateLimiter(
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute,
+                max_concurrency=max_concurrency,
+                requests_bucket=requests_bucket,
+                tokens_bucket=tokens_bucket,
+            )
+            _shared_limiters[key] = limiter
+        return limiter
+
+
+def set_shared_budget(requests: Optional[TokenBucket] = None,
+                      tokens: Optional[TokenBucket] = None) -> None:
+    """Make the limiters created from now on draw from these buckets.
+
+    Used by worker processes to share one global budget, held in
+    ``SharedTokenBucket``s, across every quota key and process.
+    """
+    global _shared_budget
+    with _shared_lock:
+        _shared_budget = (requests, tokens)
+
+
+def clear_rate_limiters() -> None:
+    """Forget the process-wide rate limiters."""
+    global _shared_budget
+    with _shared_lock:
+        _shared_limiters.clear()
+        _shared_budget = (None, None)
@@ -0,0 +1,271 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .base_provider import ChatResponse, Message
+from src.ai_agent.core.exceptions import ConfigurationException
+
+
+def make_request_key(model: str, messages: List[Message], scope: str = "",
+                     **params: Any) -> str:
+    """Build a stable hash of a normalized chat request.
+
+    Only the role and content of each message take part, so timestamps
+    and cached token counts do not defeat the cache. ``scope`` names the
+    endpoint and credentials, so that agents talking to different
+    servers never serve each other's answers.
+    """
+    payload = {
+        "scope": scope,
+        "model": model,
+        "messages": [[m.role, m.content] for m in messages],
+        "params": params,
+    }
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"),
+                     ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(ABC):
+    """Storage for cached chat responses."""
+
+    # Backends doing disk I/O are called from a worker thread
+    blocking = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[ChatResponse]:
+        """Get a cached response, or None on a miss."""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, response: ChatResponse) -> None:
+        """Store a response."""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every cached response."""
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """In-memory LRU cache with a TTL and an entry limit."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, ChatResponse]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[ChatResponse]:
+        """Get a cached response, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, response = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response.model_copy(deep=True)
+
+    def set(self, key: str, response: ChatResponse) -> None:
+        """Store a response, evicting the least recently used ones."""
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl,
+                                  response.model_copy(deep=True))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(CacheBackend):
+    """On-disk cache in a SQLite database with a TTL and an entry limit.
+
+    Eviction of expired and least recently used entries runs every
+    ``prune_interval`` writes, so the entry limit may briefly be exceeded.
+    """
+
+    blocking = True
+    prune_interval = 64
+
+    def __init__(self, path: str, max_entries: int = 100_000,
+                 ttl: float = 86400.0):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(str(self.path),
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_access"
+            " ON responses (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[ChatResponse]:
+        """Get a cached response, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?",
+                                   (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                (now, key),
+            )
+            self._conn.commit()
+        return ChatResponse.model_validate_json(row[0])
+
+    def set(self, key: str, response: ChatResponse) -> None:
+        """Store a response, evicting the least recently used ones."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (key, value, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, response.model_dump_json(), now + self.ttl, now),
+            )
+            self._writes += 1
+            if self._writes >= self.prune_interval:
+                self._prune(now)
+            self._conn.commit()
+
+    def _prune(self, now: float) -> None:
+        self._writes = 0
+        self._conn.execute("DELETE FROM responses WHERE expires_at <= ?",
+                           (now,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM responses ORDER BY last_access DESC"
+            " LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()
+        return int(row[0])
+
+
+class CacheStats:
+    """Hit and miss counters of a response cache."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of cacheable lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the counters as a dictionary."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hit_rate,
+        }
+
+
+_shared_backends: Dict[Tuple[Any, ...], CacheBackend] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_cache_backend(kind: str, max_entries: int = 1024,
+                         ttl: float = 3600.0,
+                         path: str = ".cache/responses.sqlite3"
+                         ) -> CacheBackend:
+    """Get the process-wide cache backend of a kind ("memory"/"sqlite").
+
+    Agents configured alike share one backend, so a response cached by
+    one session is served to every other session in the process. Memory
+    backends are keyed by their limits; a SQLite file is opened once and
+    takes the limits of the latest agent using it.
+    """
+    kind = kind.lower()
+    if kind == "sqlite":
+        key: Tuple[Any, ...] = (kind, path)
+    else:
+        key = (kind, max_entries, ttl)
+    with _shared_lock:
+        backend = _shared_backends.get(key)
+        if isinstance(backend, SQLiteCache):
+            backend.max_entries = max_entries
+            backend.ttl = ttl
+        if backend is not None:
+            return backend
+        if kind == "memory":
+            backend = MemoryCache(max_entries=max_entries, ttl=ttl)
+        elif kind == "sqlite":
+            backend = SQLiteCache(path, max_entries=max_entries, ttl=ttl)
+        else:
+            raise ConfigurationException(f"Unknown response cache: {kind}")
+        _shared_backends[key] = backend
+        return backend
+
+
+def clear_shared_cache_backends() -> None:
+    """Forget the process-wide cache backends."""
+    with _shared_lock:
+        for backend in _shared_backends.values():
+            if isinstance(backend, SQLiteCache):
+                backend.close()
+        _shared_backends.clear()
@@ -0,0 +1,269 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional,
+    Set
+)
+
+from pydantic import BaseModel
+
+from .base_provider import BaseProvider, ChatResponse, Message
+from src.ai_agent.core.exceptions import (
+    TimeoutException, TransientAPIException
+)
+from src.ai_agent.telemetry.instrumentation import current_call
+from src.ai_agent.utils.logger import setup_logger
+
+
+class RetryPolicy(BaseModel):
+    """Retry, timeout and hedging configuration."""
+
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    # Deadline of each attempt and of the whole call, in seconds
+    attempt_timeout: Optional[float] = 60.0
+    total_timeout: Optional[float] = 180.0
+    # Send a duplicate request after a fixed delay, or after the given
+    # latency percentile of recent successful calls
+    hedge_after: Optional[float] = None
+    hedge_percentile: Optional[float] = None
+    hedge_min_samples: int = 20
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential delay before retry number ``attempt``."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error is transient (timeouts, 5xx, 429)."""
+    return isinstance(error, (TransientAPIException, asyncio.TimeoutError))
+
+
+async def _aclose(tokens: AsyncIterator[str]) -> None:
+    """Close a token stream that is an async generator."""
+    aclose = getattr(tokens, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        """Record the latency of a successful call."""
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Latency below which ``fraction`` of the samples fall."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(fraction * len(ordered)))
+        return ordered[index]
+
+
+class RetryingProvider(BaseProvider):
+    """Provider wrapper adding retries, deadlines and hedged requests.
+
+    Transient failures are retried with full-jitter exponential backoff;
+    fatal ones (bad requests, authentication) are raised immediately.
+    Each attempt and the call as a whole have their own deadline. With
+    hedging enabled, a duplicate request is sent when the first one is
+    slower than usual and whichever finishes first wins.
+    """
+
+    def __init__(self, provider: BaseProvider,
+                 policy: Optional[RetryPolicy] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.provider = provider
+        self.policy = policy or RetryPolicy()
+        self.latency = LatencyTracker()
+        self.stats: Dict[str, int] = {
+            "calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0,
+            "timeouts": 0, "failures": 0,
+        }
+        self.logger = setup_logger(self.__class__.__name__)
+
+    @property
+    def model(self) -> str:
+        """Model of the wrapped provider."""
+        return str(getattr(self.provider, "model", "unknown"))
+
+    def _remaining(self, deadline: Optional[float]) -> Optional[float]:
+        if deadline is None:
+            return None
+        return deadline - time.monotonic()
+
+    def _attempt_timeout(self, deadline: Optional[float]) -> Optional[float]:
+        remaining = self._remaining(deadline)
+        if remaining is not None and remaining <= 0:
+            raise TimeoutException("Request deadline exceeded")
+        timeouts = [t for t in (self.policy.attempt_timeout, remaining)
+                    if t is not None]
+        return min(timeouts) if timeouts else None
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self.policy.hedge_after is not None:
+            return self.policy.hedge_after
+        if (self.policy.hedge_percentile is not None
+                and len(self.latency) >= self.policy.hedge_min_samples):
+            return self.latency.percentile(self.policy.hedge_percentile)
+        return None
+
+    async def _attempt(self, call: Callable[[], Awaitable[ChatResponse]],
+                       timeout: Optional[float]) -> ChatResponse:
+        try:
+            return await asyncio.wait_for(call(), timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise TimeoutException(
+                f"Request timed out after {timeout:.2f}s"
+            )
+
+    async def _hedged(self, call: Callable[[], Awaitable[ChatResponse]],
+                      timeout: Optional[float]) -> ChatResponse:
+        delay = self._hedge_delay()
+        if delay is None or (timeout is not None and delay >= timeout):
+            return await self._attempt(call, timeout)
+
+        primary = asyncio.ensure_future(self._attempt(call, timeout))
+        tasks: Set["asyncio.Future[ChatResponse]"] = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.stats["hedges"] += 1
+                hedge_timeout = None if timeout is None else timeout - delay
+                tasks.add(asyncio.ensure_future(
+                    self._attempt(call, hedge_timeout)
+                ))
+            error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.stats["hedge_wins"] += 1
+                        return task.result()
+                    error = task.exception()
+            assert error is not None
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def _record_retry() -> None:
+        record = current_call()
+        if record is not None:
+            record.retries += 1
+
+    async def chat(self, messages: List[Message],
+                   **kwargs: Any) -> ChatResponse:
+        """Chat with retries, deadlines and optional hedging."""
+        self.stats["calls"] += 1
+        deadline = (time.monotonic() + self.policy.total_timeout
+                    if self.policy.total_timeout is not None else None)
+
+        async def call() -> ChatResponse:
+            return await self.provider.chat(messages, **kwargs)
+
+        attempt = 1
+        while True:
+            start = time.monotonic()
+            try:
+                response = await self._hedged(
+                    call, self._attempt_timeout(deadline)
+                )
+                self.latency.record(time.monotonic() - start)
+                return response
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.policy.max_attempts:
+                    self.stats["failures"] += 1
+                    raise
+                delay = self.policy.backoff(attempt)
+                remaining = self._remaining(deadline)
+                if remaining is not None and delay >= remaining:
+                    self.stats["failures"] += 1
+                    raise
+                self.stats["retries"] += 1
+                self._record_retry()
+                self.logger.warning(
+                    "Attempt %s failed (%s); retrying in %.2fs",
+                    attempt, e, delay,
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def stream(self, messages: List[Message],
+                     **kwargs: Any) -> AsyncIterator[str]:
+        """Stream with retries until the first token has been yielded."""
+        self.stats["calls"] += 1
+        deadline = (time.monotonic() + self.policy.total_timeout
+                    if self.policy.total_timeout is not None else None)
+
+        attempt = 1
+        while True:
+            started = False
+            tokens = self.provider.stream(messages, **kwargs).__aiter__()
+            try:
+                try:
+                    while True:
+                        timeout = (
+                            self._attempt_timeout(deadline) if not started
+                            else self._remaining(deadline)
+                        )
+                        try:
+                            token = await asyncio.wait_for(
+                                tokens.__anext__(), timeout
+                            )
+                        except StopAsyncIteration:
+                            return
+                        except asyncio.TimeoutError:
+                            self.stats["timeouts"] += 1
+                            raise TimeoutException(
+                                "Stream deadline exceeded"
+                            )
+                        started = True
+                        yield token
+                finally:
+                    # Release an abandoned stream's HTTP response before
+                    # retrying, not when it is garbage collected
+                    await _aclose(tokens)
+            except Exception as e:
+                if (started or not is_retryable(e)
+                        or attempt >= self.policy.max_attempts):
+                    self.stats["failures"] += 1
+                    raise
+                delay = self.policy.backoff(attempt)
+                remaining = self._remaining(deadline)
+                if remaining is not None and delay >= remaining:
+                    self.stats["failures"] += 1
+                    raise
+                self.stats["retries"] += 1
+                self._record_retry()
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def validate_config(self) -> bool:
+        """Validate the wrapped provider."""
+        return self.provider.validate_config()
+
+    async def avalidate_config(self) -> bool:
+        """Validate the wrapped provider without blocking the loop."""
+        return await self.provider.avalidate_config()
+
+    async def aclose(self) -> None:
+        """Release the wrapped provider's resources."""
+        await self.provider.aclose()
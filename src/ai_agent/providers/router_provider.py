@@ -0,0 +1,361 @@
+import asyncio
+import random
+import threading
+import time
+from typing import (
+    Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Set
+)
+
+from .base_provider import BaseProvider, ChatResponse, Message
+from .retrying_provider import is_retryable
+from src.ai_agent.core.exceptions import (
+    ConfigurationException, TransientAPIException
+)
+from src.ai_agent.utils.logger import setup_logger
+
+ROUTING_STRATEGIES = ("weighted", "least_outstanding", "ewma")
+
+
+class CircuitBreaker:
+    """Stops sending requests to a backend that keeps failing.
+
+    After ``failure_threshold`` consecutive failures the circuit opens
+    and the backend is skipped. Once ``recovery_time`` seconds have
+    passed it is half-open: a single probe request is let through, and
+    its outcome closes the circuit or opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5,
+                 recovery_time: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        """"closed", "open" or "half_open"."""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.recovery_time:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now."""
+        state = self.state
+        if state == "closed":
+            return True
+        return state == "half_open" and not self._probing
+
+    def on_send(self) -> None:
+        """Note a request being sent, claiming the probe if half-open."""
+        if self.opened_at is not None:
+            self._probing = True
+
+    def release_probe(self) -> None:
+        """Let another probe through after one ended without an outcome."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the circuit past the threshold."""
+        self.consecutive_failures += 1
+        self._probing = False
+        if (self.opened_at is not None
+                or self.consecutive_failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+
+
+class Backend:
+    """A routed provider with its load, latency and health."""
+
+    def __init__(self, provider: BaseProvider, name: str,
+                 weight: float = 1.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        if weight <= 0:
+            raise ConfigurationException(
+                f"Backend weight must be positive: {name}"
+            )
+        self.provider = provider
+        self.name = name
+        self.weight = weight
+        self.breaker = breaker or CircuitBreaker()
+        self.outstanding = 0
+        self.ewma_latency: Optional[float] = None
+        self.requests = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def observe_latency(self, seconds: float, alpha: float) -> None:
+        """Fold a latency sample into the moving average."""
+        if self.ewma_latency is None:
+            self.ewma_latency = seconds
+        else:
+            self.ewma_latency += alpha * (seconds - self.ewma_latency)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the health of the backend as a dictionary."""
+        return {
+            "name": self.name,
+            "state": self.breaker.state,
+            "weight": self.weight,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ewma_latency": self.ewma_latency,
+            "last_error": self.last_error,
+        }
+
+
+class RouterProvider(BaseProvider):
+    """Provider spreading requests over several backends.
+
+    Backends are picked by ``strategy``:
+
+    - ``weighted``: at random in proportion to their weights
+    - ``least_outstanding``: fewest requests in flight per unit of weight
+    - ``ewma``: lowest moving-average latency times (in-flight + 1), so a
+      backend that slows down is avoided before it starts failing;
+      backends without samples are tried first
+
+    Transient failures (timeouts, 5xx, 429) fail over to the next best
+    backend and count towards the backend's circuit breaker; other
+    errors are raised as they are. Streams fail over only until their
+    first token, whose delay is the latency sample of a stream.
+    """
+
+    def __init__(self, providers: Sequence[BaseProvider],
+                 strategy: str = "ewma",
+                 weights: Optional[Sequence[float]] = None,
+                 names: Optional[Sequence[str]] = None,
+                 failure_threshold: int = 5,
+                 recovery_time: float = 30.0,
+                 ewma_alpha: float = 0.3,
+                 **kwargs: Any):
+        super().__init__(**kwargs)
+        if not providers:
+            raise ConfigurationException("Router needs at least one provider")
+        if strategy not in ROUTING_STRATEGIES:
+            raise ConfigurationException(
+                f"Unknown routing strategy: {strategy}"
+            )
+        weights = list(weights) if weights else [1.0] * len(providers)
+        if len(weights) != len(providers):
+            raise ConfigurationException(
+                "Router weights must match the providers"
+            )
+        self.backends = [
+            Backend(
+                provider,
+                names[i] if names else self._default_name(provider, i),
+                weights[i],
+                CircuitBreaker(failure_threshold, recovery_time),
+            )
+            for i, provider in enumerate(providers)
+        ]
+        self.strategy = strategy
+        self.ewma_alpha = ewma_alpha
+        self.logger = setup_logger(self.__class__.__name__)
+
+    @staticmethod
+    def _default_name(provider: BaseProvider, index: int) -> str:
+        base_url = getattr(provider, "base_url", None)
+        if isinstance(base_url, str) and base_url:
+            return base_url
+        return f"{provider.__class__.__name__}-{index}"
+
+    @property
+    def model(self) -> str:
+        """Model of the first backend."""
+        return str(getattr(self.backends[0].provider, "model", "unknown"))
+
+    def health(self) -> List[Dict[str, Any]]:
+        """Get the health stats of every backend."""
+        return [backend.as_dict() for backend in self.backends]
+
+    def _score(self, backend: Backend) -> float:
+        if self.strategy == "least_outstanding":
+            return backend.outstanding / backend.weight
+        if backend.ewma_latency is None:
+            # Unmeasured backends go first, spread by load
+            return -1.0 / (backend.outstanding + 1)
+        return (backend.ewma_latency * (backend.outstanding + 1)
+                / backend.weight)
+
+    def _pick(self, tried: Set[int]) -> Optional[int]:
+        """Index of the backend for the next attempt, if any is left."""
+        candidates = [
+            i for i, backend in enumerate(self.backends)
+            if i not in tried and backend.breaker.allow()
+        ]
+        if not candidates:
+            return None
+        if self.strategy == "weighted":
+            return random.choices(
+                candidates,
+                weights=[self.backends[i].weight for i in candidates],
+            )[0]
+        best = min(self._score(self.backends[i]) for i in candidates)
+        # Break ties at random so equal backends share the load
+        return random.choice([
+            i for i in candidates if self._score(self.backends[i]) == best
+        ])
+
+    def _unavailable(self, error: Optional[BaseException]) -> BaseException:
+        if error is not None:
+            return error
+        return TransientAPIException("All backends are unavailable")
+
+    def _start(self, backend: Backend) -> float:
+        backend.breaker.on_send()
+        backend.outstanding += 1
+        backend.requests += 1
+        return time.monotonic()
+
+    def _succeed(self, backend: Backend, start: float) -> None:
+        backend.observe_latency(time.monotonic() - start, self.ewma_alpha)
+        backend.breaker.record_success()
+
+    def _cancelled(self, backend: Backend, start: float) -> None:
+        """Account for a request cancelled by a deadline or a hedge.
+
+        Its duration is a lower bound of the backend's latency, so it
+        only ever raises the average; the circuit breaker is untouched.
+        """
+        elapsed = time.monotonic() - start
+        if backend.ewma_latency is None or elapsed > backend.ewma_latency:
+            backend.observe_latency(elapsed, self.ewma_alpha)
+        backend.breaker.release_probe()
+
+    def _fail(self, backend: Backend, start: Optional[float],
+              error: BaseException) -> None:
+        if start is not None:
+            # A failed request took at least this long
+            backend.observe_latency(time.monotonic() - start,
+                                    self.ewma_alpha)
+        backend.failures += 1
+        backend.last_error = f"{error.__class__.__name__}: {error}"
+        backend.breaker.record_failure()
+        self.logger.warning("Backend %s failed: %s", backend.name, error)
+
+    async def chat(self, messages: List[Message],
+                   **kwargs: Any) -> ChatResponse:
+        """Chat through the best backend, failing over on errors."""
+        tried: Set[int] = set()
+        error: Optional[BaseException] = None
+        while True:
+            index = self._pick(tried)
+            if index is None:
+                raise self._unavailable(error)
+            tried.add(index)
+            backend = self.backends[index]
+            start = self._start(backend)
+            try:
+                response = await backend.provider.chat(messages, **kwargs)
+            except asyncio.CancelledError:
+                self._cancelled(backend, start)
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # The backend answered; the request itself was bad
+                    backend.breaker.record_success()
+                    raise
+                self._fail(backend, start, e)
+                error = e
+                continue
+            finally:
+                backend.outstanding -= 1
+            self._succeed(backend, start)
+            return response
+
+    async def stream(self, messages: List[Message],
+                     **kwargs: Any) -> AsyncIterator[str]:
+        """Stream through the best backend, failing over until a token."""
+        tried: Set[int] = set()
+        error: Optional[BaseException] = None
+        while True:
+            index = self._pick(tried)
+            if index is None:
+                raise self._unavailable(error)
+            tried.add(index)
+            backend = self.backends[index]
+            start = self._start(backend)
+            started = False
+            try:
+                async for token in backend.provider.stream(messages,
+                                                           **kwargs):
+                    if not started:
+                        started = True
+                        self._succeed(backend, start)
+                    yield token
+                if not started:
+                    self._succeed(backend, start)
+                return
+            except asyncio.CancelledError:
+                if not started:
+                    self._cancelled(backend, start)
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    if not started:
+                        backend.breaker.record_success()
+                    raise
+                if started:
+                    # Too late to fail over once tokens were yielded
+                    self._fail(backend, None, e)
+                    raise
+                self._fail(backend, start, e)
+                error = e
+            finally:
+                backend.outstanding -= 1
+
+    def validate_config(self) -> bool:
+        """Valid if at least one backend is."""
+        return any(backend.provider.validate_config()
+                   for backend in self.backends)
+
+    async def avalidate_config(self) -> bool:
+        """Valid if at least one backend is, checked concurrently."""
+        results = await asyncio.gather(
+            *(backend.provider.avalidate_config()
+              for backend in self.backends),
+            return_exceptions=True,
+        )
+        return any(result is True for result in results)
+
+    async def aclose(self) -> None:
+        """Release the resources of every backend."""
+        for backend in self.backends:
+            await backend.provider.aclose()
+
+
+_shared_routers: Dict[str, RouterProvider] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_router(key: str,
+                  factory: Callable[[], RouterProvider]) -> RouterProvider:
+    """Get the process-wide router for a set of backends.
+
+    Sharing one router lets every agent see the same in-flight counts,
+    latencies and circuit breakers. ``factory`` builds it on first use.
+    """
+    with _shared_lock:
+        router = _shared_routers.get(key)
+        if router is None:
+            router = factory()
+            _shared_routers[key] = router
+        return router
+
+
+def clear_routers() -> None:
+    """Forget the process-wide routers."""
+    with _shared_lock:
+        _shared_routers.clear()
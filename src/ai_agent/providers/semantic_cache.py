@@ -0,0 +1,365 @@
+import heapq
+import math
+import re
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from typing import (
+    Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+)
+
+from .base_provider import ChatResponse
+from .response_cache import CacheStats
+from src.ai_agent.core.exceptions import ConfigurationException
+from src.ai_agent.core.stats import LatencyHistogram
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+Vector = List[float]
+
+# Words too common to tell two prompts apart
+STOP_WORDS = frozenset(
+    "a an and are as at be by can could do does for from how i in is it "
+    "me my of on or please s so that the this to was what whats when "
+    "where which who why will with would you your".split()
+)
+_WORD = re.compile(r"\w+")
+
+
+class Embedder(ABC):
+    """Turns texts into unit-length vectors of a fixed size."""
+
+    dimensions: int
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> List[Vector]:
+        """Embed a batch of texts."""
+        pass
+
+
+class HashingEmbedder(Embedder):
+    """Local, offline embedder hashing words and character trigrams.
+
+    Features are hashed into ``dimensions`` signed buckets with
+    sublinear term frequencies, so paraphrases sharing most of their
+    words (or word stems, through the trigrams) end up close. ``fit``
+    optionally learns inverse document frequencies from a corpus; it
+    must be called before any vector is stored, or stored vectors and
+    new ones are no longer comparable.
+    """
+
+    def __init__(self, dimensions: int = 512, trigram_weight: float = 0.5):
+        if dimensions <= 0:
+            raise ConfigurationException("Embedding size must be positive")
+        self.dimensions = dimensions
+        self.trigram_weight = trigram_weight
+        self._idf: Optional[List[float]] = None
+
+    def _features(self, text: str) -> Dict[str, float]:
+        features: Dict[str, float] = defaultdict(float)
+        for word in _WORD.findall(text.lower()):
+            if word in STOP_WORDS:
+                continue
+            features[word] += 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                features[padded[i:i + 3]] += self.trigram_weight
+        return features
+
+    def _embed_one(self, text: str) -> Vector:
+        vector = [0.0] * self.dimensions
+        for feature, count in self._features(text).items():
+            digest = zlib.crc32(feature.encode("utf-8"))
+            index = digest % self.dimensions
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            # Sublinear term frequency; trigram weights stay below 1
+            weight = 1.0 + math.log(count) if count >= 1 else count
+            vector[index] += sign * weight
+        if self._idf is not None:
+            vector = [v * w for v, w in zip(vector, self._idf)]
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm:
+            vector = [v / norm for v in vector]
+        return vector
+
+    def embed(self, texts: Sequence[str]) -> List[Vector]:
+        """Embed a batch of texts."""
+        return [self._embed_one(text) for text in texts]
+
+    def fit(self, corpus: Iterable[str]) -> "HashingEmbedder":
+        """Learn smoothed inverse document frequencies per bucket."""
+        documents = 0
+        frequencies = [0] * self.dimensions
+        for text in corpus:
+            documents += 1
+            buckets = {
+                zlib.crc32(feature.encode("utf-8")) % self.dimensions
+                for feature in self._features(text)
+            }
+            for index in buckets:
+                frequencies[index] += 1
+        self._idf = [
+            math.log((1 + documents) / (1 + df)) + 1.0
+            for df in frequencies
+        ]
+        return self
+
+
+class VectorIndex(ABC):
+    """Nearest-neighbour index over unit vectors by cosine similarity.
+
+    Vectors are identified by the integer the index assigns them. An
+    approximate index can replace the brute-force one behind this
+    interface.
+    """
+
+    @abstractmethod
+    def add(self, vector: Vector) -> int:
+        """Add a vector and get its id."""
+        pass
+
+    @abstractmethod
+    def remove(self, vector_id: int) -> None:
+        """Remove a vector."""
+        pass
+
+    @abstractmethod
+    def search_many(self, vectors: Sequence[Vector],
+                    k: int) -> List[List[Tuple[int, float]]]:
+        """Get the ``k`` most similar (id, similarity) per query."""
+        pass
+
+    def search(self, vector: Vector, k: int) -> List[Tuple[int, float]]:
+        """Get the ``k`` most similar (id, similarity), best first."""
+        return self.search_many([vector], k)[0]
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class BruteForceIndex(VectorIndex):
+    """Exact index comparing a query with every stored vector.
+
+    With NumPy, vectors live in one preallocated float32 matrix and a
+    batch of queries is a single matrix product. Without it, vectors are
+    kept sparse, which suits the mostly-empty hashing embeddings.
+    """
+
+    def __init__(self, dimensions: int, capacity: int = 1024):
+        self.dimensions = dimensions
+        self.capacity = capacity
+        self._free: List[int] = []
+        self._next = 0
+        self._count = 0
+        if np is not None:
+            self._matrix = np.zeros((capacity, dimensions), np.float32)
+            self._valid = np.zeros(capacity, bool)
+        else:
+            self._sparse: Dict[int, Dict[int, float]] = {}
+
+    def add(self, vector: Vector) -> int:
+        """Add a vector and get its id."""
+        if self._free:
+            vector_id = self._free.pop()
+        elif self._next < self.capacity:
+            vector_id = self._next
+            self._next += 1
+        else:
+            raise ConfigurationException("Vector index is full")
+        if np is not None:
+            self._matrix[vector_id] = vector
+            self._valid[vector_id] = True
+        else:
+            self._sparse[vector_id] = {
+                i: v for i, v in enumerate(vector) if v
+            }
+        self._count += 1
+        return vector_id
+
+    def remove(self, vector_id: int) -> None:
+        """Remove a vector, freeing its slot."""
+        if np is not None:
+            if not self._valid[vector_id]:
+                return
+            self._valid[vector_id] = False
+        elif self._sparse.pop(vector_id, None) is None:
+            return
+        self._free.append(vector_id)
+        self._count -= 1
+
+    def search_many(self, vectors: Sequence[Vector],
+                    k: int) -> List[List[Tuple[int, float]]]:
+        """Get the ``k`` most similar (id, similarity) per query."""
+        if not self._count or not vectors:
+            return [[] for _ in vectors]
+        if np is not None:
+            return self._search_dense(vectors, k)
+        results = []
+        for vector in vectors:
+            query = {i: v for i, v in enumerate(vector) if v}
+            scores = [
+                (vector_id, sum(query[i] * v for i, v in stored.items()
+                                if i in query))
+                for vector_id, stored in self._sparse.items()
+            ]
+            results.append(heapq.nlargest(k, scores,
+                                          key=lambda item: item[1]))
+        return results
+
+    def _search_dense(self, vectors: Sequence[Vector],
+                      k: int) -> List[List[Tuple[int, float]]]:
+        used = self._next
+        queries = np.asarray(vectors, np.float32)
+        scores = queries @ self._matrix[:used].T
+        scores[:, ~self._valid[:used]] = -np.inf
+        k = min(k, self._count)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(scores, top):
+            ordered = candidates[np.argsort(-row[candidates])]
+            results.append([(int(i), float(row[i])) for i in ordered])
+        return results
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class SemanticCacheStats(CacheStats):
+    """Hit and miss counters plus the time spent on lookups."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lookup_latency = LatencyHistogram(min_value=1e-6)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the counters as a dictionary."""
+        stats = super().as_dict()
+        stats.update({
+            "lookup_latency_mean": self.lookup_latency.mean,
+            "lookup_latency_p50": self.lookup_latency.percentile(0.5),
+            "lookup_latency_p99": self.lookup_latency.percentile(0.99),
+        })
+        return stats
+
+
+class _Entry(NamedTuple):
+    scope: str
+    text: str
+    response: ChatResponse
+    expires_at: float
+
+
+class SemanticCache:
+    """Responses found by the similarity of the prompt that produced them.
+
+    A lookup returns the response of the most similar stored prompt with
+    the same ``scope`` (the rest of the request) and a cosine similarity
+    of at least ``threshold``. At most ``max_entries`` are kept; the least
+    recently used entry is evicted first and entries expire after ``ttl``
+    seconds.
+    """
+
+    # Neighbours checked for a matching scope
+    candidates = 8
+
+    def __init__(self, embedder: Optional[Embedder] = None,
+                 index: Optional[VectorIndex] = None,
+                 threshold: float = 0.9, max_entries: int = 1024,
+                 ttl: float = 3600.0):
+        self.embedder = embedder or HashingEmbedder()
+        # An empty index is falsy, so compare with None
+        self.index = index if index is not None else BruteForceIndex(
+            self.embedder.dimensions, capacity=max_entries
+        )
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = SemanticCacheStats()
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, scope: str,
+               text: str) -> Optional[Tuple[ChatResponse, float]]:
+        """Get the cached response and similarity for a prompt, if any."""
+        start = time.perf_counter()
+        vector = self.embedder.embed([text])[0]
+        with self._lock:
+            found = self._find(scope, vector)
+            if found is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+            self.stats.lookup_latency.record(time.perf_counter() - start)
+        if found is None:
+            return None
+        response, similarity = found
+        return response.model_copy(deep=True), similarity
+
+    def _find(self, scope: str,
+              vector: Vector) -> Optional[Tuple[ChatResponse, float]]:
+        now = time.time()
+        for vector_id, similarity in self.index.search(vector,
+                                                       self.candidates):
+            if similarity < self.threshold:
+                break
+            entry = self._entries[vector_id]
+            if entry.expires_at <= now:
+                self._drop(vector_id)
+            elif entry.scope == scope:
+                self._entries.move_to_end(vector_id)
+                return entry.response, similarity
+        return None
+
+    def store(self, scope: str, text: str, response: ChatResponse) -> None:
+        """Cache a response, evicting the least recently used ones."""
+        vector = self.embedder.embed([text])[0]
+        entry = _Entry(scope, text, response.model_copy(deep=True),
+                       time.time() + self.ttl)
+        with self._lock:
+            while len(self._entries) >= self.max_entries:
+                self._drop(next(iter(self._entries)))
+            self._entries[self.index.add(vector)] = entry
+
+    def _drop(self, vector_id: int) -> None:
+        del self._entries[vector_id]
+        self.index.remove(vector_id)
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            for vector_id in list(self._entries):
+                self._drop(vector_id)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_shared_caches: Dict[Tuple[float, int, float, int], SemanticCache] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_semantic_cache(threshold: float = 0.9, max_entries: int = 1024,
+                          ttl: float = 3600.0,
+                          dimensions: int = 512) -> SemanticCache:
+    """Get the process-wide semantic cache configured this way."""
+    key = (threshold, max_entries, ttl, dimensions)
+    with _shared_lock:
+        cache = _shared_caches.get(key)
+        if cache is None:
+            cache = SemanticCache(HashingEmbedder(dimensions),
+                                  threshold=threshold,
+                                  max_entries=max_entries, ttl=ttl)
+            _shared_caches[key] = cache
+        return cache
+
+
+def clear_semantic_caches() -> None:
+    """Forget the process-wide semantic caches."""
+    with _shared_lock:
+        _shared_caches.clear()
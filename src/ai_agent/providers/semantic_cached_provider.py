@@ -0,0 +1,110 @@
+import asyncio
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from .base_provider import BaseProvider, ChatResponse, Message
+from .response_cache import make_request_key
+from .semantic_cache import SemanticCache, SemanticCacheStats
+from src.ai_agent.telemetry.instrumentation import current_call
+
+
+class SemanticCachedProvider(BaseProvider):
+    """Provider wrapper serving near-duplicate prompts from a cache.
+
+    The latest user message is embedded and looked up in a
+    ``SemanticCache``; the rest of the request (model, parameters and
+    earlier messages) must match exactly. Only deterministic requests
+    (temperature 0) are cached unless ``cache_all`` is set; ``scope`` and
+    ``temperature`` work as in ``CachedProvider``.
+    """
+
+    def __init__(self, provider: BaseProvider, cache: SemanticCache,
+                 cache_all: bool = False, scope: str = "",
+                 temperature: Optional[float] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.provider = provider
+        self.cache = cache
+        self.cache_all = cache_all
+        self.scope = scope
+        self.temperature = temperature
+
+    @property
+    def model(self) -> str:
+        """Model of the wrapped provider."""
+        return str(getattr(self.provider, "model", "unknown"))
+
+    @property
+    def stats(self) -> SemanticCacheStats:
+        """Hit, miss and lookup latency stats of the cache."""
+        return self.cache.stats
+
+    def _cache_key(self, messages: List[Message],
+                   kwargs: Any) -> Optional[Tuple[str, str]]:
+        """Scope and prompt of a cacheable request."""
+        params = dict(kwargs)
+        if self.temperature is not None:
+            params.setdefault("temperature", self.temperature)
+        if (not messages or messages[-1].role != "user"
+                or (not self.cache_all and params.get("temperature") != 0)):
+            self.cache.stats.bypassed += 1
+            return None
+        scope = make_request_key(self.model, messages[:-1], self.scope,
+                                 **params)
+        return scope, messages[-1].content
+
+    @staticmethod
+    def _record_hit() -> None:
+        record = current_call()
+        if record is not None:
+            record.cache = "semantic"
+
+    async def chat(self, messages: List[Message],
+                   **kwargs: Any) -> ChatResponse:
+        """Serve the chat from the cache or the wrapped provider."""
+        key = self._cache_key(messages, kwargs)
+        if key is None:
+            return await self.provider.chat(messages, **kwargs)
+
+        # Embedding and search are CPU-bound, keep them off the loop
+        found = await asyncio.to_thread(self.cache.lookup, *key)
+        if found is not None:
+            self._record_hit()
+            return found[0]
+
+        response = await self.provider.chat(messages, **kwargs)
+        await asyncio.to_thread(self.cache.store, *key, response)
+        return response
+
+    async def stream(self, messages: List[Message],
+                     **kwargs: Any) -> AsyncIterator[str]:
+        """Stream from the wrapped provider, replaying cached replies."""
+        key = self._cache_key(messages, kwargs)
+        if key is None:
+            async for token in self.provider.stream(messages, **kwargs):
+                yield token
+            return
+
+        found = await asyncio.to_thread(self.cache.lookup, *key)
+        if found is not None:
+            self._record_hit()
+            yield found[0].content
+            return
+
+        parts: List[str] = []
+        async for token in self.provider.stream(messages, **kwargs):
+            parts.append(token)
+            yield token
+        response = ChatResponse(content="".join(parts).strip(),
+                                model=self.model)
+        await asyncio.to_thread(self.cache.store, *key, response)
+
+    def validate_config(self) -> bool:
+        """Validate the wrapped provider."""
+        return self.provider.validate_config()
+
+    async def avalidate_config(self) -> bool:
+        """Validate the wrapped provider without blocking the loop."""
+        return await self.provider.avalidate_config()
+
+    async def aclose(self) -> None:
+        """Release the wrapped provider's resources."""
+        await self.provider.aclose()
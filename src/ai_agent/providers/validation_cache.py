@@ -0,0 +1,106 @@
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class ValidationCache:
+    """Remembers successful provider validations for a limited time.
+
+    Entries are keyed by a hash of the credentials and endpoint, so the
+    raw API key never ends up on disk. With a ``path`` the cache is also
+    persisted as JSON, letting short-lived CLI processes skip the
+    validation round trip.
+    """
+
+    def __init__(self, ttl: float = 3600.0, path: Optional[str] = None):
+        self.ttl = ttl
+        self.path = Path(path).expanduser() if path else None
+        self._expiry: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def make_key(*parts: Optional[str]) -> str:
+        """Build a cache key from credentials and endpoint."""
+        raw = "\0".join(part or "" for part in parts)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def is_valid(self, key: str) -> bool:
+        """Return True if the key was validated within the TTL."""
+        with self._lock:
+            expiry = self._expiry.get(key)
+            if expiry is None:
+                return False
+            if expiry <= time.time():
+                del self._expiry[key]
+                return False
+            return True
+
+    def mark_valid(self, key: str) -> None:
+        """Record a successful validation."""
+        with self._lock:
+            self._expiry[key] = time.time() + self.ttl
+            self._save()
+
+    def invalidate(self, key: str) -> None:
+        """Forget a validation, e.g. after an authentication error."""
+        with self._lock:
+            if self._expiry.pop(key, None) is not None:
+                self._save()
+
+    def clear(self) -> None:
+        """Forget all validations."""
+        with self._lock:
+            self._expiry.clear()
+            self._save()
+
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            now = time.time()
+            self._expiry = {
+                key: float(expiry) for key, expiry in data.items()
+                if float(expiry) > now
+            }
+        except (OSError, ValueError, AttributeError):
+            # A corrupt cache only costs one extra validation
+            self._expiry = {}
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self._expiry), encoding="utf-8")
+            tmp_path.replace(self.path)
+        except OSError:
+            pass
+
+
+_shared_caches: Dict[Optional[str], ValidationCache] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_validation_cache(ttl: float = 3600.0,
+                            path: Optional[str] = None) -> ValidationCache:
+    """Get the process-wide validation cache for a storage path."""
+    with _shared_lock:
+        cache = _shared_caches.get(path)
+        if cache is None:
+            cache = ValidationCache(ttl=ttl, path=path)
+            _shared_caches[path] = cache
+        cache.ttl = ttl
+        return cache
+
+
+def clear_validation_caches() -> None:
+    """Clear every process-wide validation cache."""
+    with _shared_lock:
+        for cache in _shared_caches.values():
+            cache.clear()
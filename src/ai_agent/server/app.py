@@ -0,0 +1,424 @@
+import asyncio
+import json
+import re
+import signal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import h11
+
+from .sessions import Session, SessionManager
+from src.ai_agent.core.agent import AIAgent
+from src.ai_agent.core.config import Settings
+from src.ai_agent.core.exceptions import (
+    AIAgentException, APIException, RateLimitException,
+    TransientAPIException, ValidationException
+)
+from src.ai_agent.providers.base_provider import BaseProvider
+from src.ai_agent.providers.client_registry import shutdown_clients
+from src.ai_agent.telemetry.instrumentation import shared_metrics_registry
+from src.ai_agent.utils.logger import configure_logging, setup_logger
+
+MAX_BODY_BYTES = 1024 * 1024
+SESSION_ROUTE = re.compile(
+    r"^/sessions/(?P<session_id>[A-Za-z0-9_.\-]{1,128})"
+    r"(?:/(?P<action>chat|stream|history|summary))?/?$"
+)
+
+
+class HTTPError(Exception):
+    """Error answered with an HTTP status and a JSON message."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _error_status(error: Exception) -> int:
+    """HTTP status reported for an exception raised by an agent."""
+    if isinstance(error, ValidationException):
+        return 400
+    if isinstance(error, RateLimitException):
+        return 429
+    if isinstance(error, TransientAPIException):
+        return 503
+    if isinstance(error, APIException):
+        return 502
+    return 500
+
+
+class AgentServer:
+    """Async HTTP API serving many agent sessions in one event loop.
+
+    Endpoints (JSON unless noted):
+
+    - ``GET /health``
+    - ``GET /metrics`` in the Prometheus text format, when enabled
+    - ``POST /sessions/{id}/chat`` with ``{"message": ...}``
+    - ``POST /sessions/{id}/stream``, answered with server-sent events
+    - ``GET /sessions/{id}/history?limit=N``
+    - ``GET /sessions/{id}/summary``
+    - ``DELETE /sessions/{id}``
+
+    Sessions are created by their first chat and share the process-wide
+    connection pools, caches and rate limiters. On shutdown the server
+    stops accepting connections, lets in-flight requests finish for up to
+    ``shutdown_timeout`` seconds and then closes every session.
+    """
+
+    def __init__(self, settings: Optional[Settings] = None,
+                 host: Optional[str] = None, port: Optional[int] = None,
+                 max_sessions: Optional[int] = None,
+                 session_ttl: Optional[float] = None,
+                 provider_factory: Optional[
+                     Callable[[], BaseProvider]] = None,
+                 shutdown_timeout: float = 10.0):
+        self.settings = settings or Settings()
+        self.host = host or self.settings.server_host
+        self.port = port if port is not None else self.settings.server_port
+        self.provider_factory = provider_factory
+        self.shutdown_timeout = shutdown_timeout
+        self.sessions = SessionManager(
+            self._create_agent,
+            max_sessions=max_sessions or self.settings.server_max_sessions,
+            idle_ttl=session_ttl or self.settings.server_session_ttl,
+        )
+        configure_logging(self.settings.log_format,
+                          self.settings.log_debug_sample_rate)
+        self.logger = setup_logger(self.__class__.__name__,
+                                   level=self.settings.log_level)
+        self._server: Optional[asyncio.Server] = None
+        self._sweeper: Optional["asyncio.Task[None]"] = None
+        # Connection handler tasks -> whether a request is in flight
+        self._connections: Dict["asyncio.Task[Any]", bool] = {}
+        self._closing = False
+        self._stopped = asyncio.Event()
+
+    def _create_agent(self, session_id: str) -> AIAgent:
+        provider = self.provider_factory() if self.provider_factory else None
+        return AIAgent(settings=self.settings, provider=provider)
+
+    @property
+    def base_url(self) -> str:
+        """URL the server is listening on."""
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        """Start listening and sweeping idle sessions."""
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.host, self.port
+        )
+        # Report the actual port when an ephemeral one was requested
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._sweeper = asyncio.create_task(self.sessions.sweep(
+            max(1.0, min(60.0, self.sessions.idle_ttl / 4))
+        ))
+        self.logger.info("Serving on %s", self.base_url)
+
+    def stop(self) -> None:
+        """Ask ``serve_forever`` to shut down."""
+        self._stopped.set()
+
+    async def serve_forever(self) -> None:
+        """Serve until SIGINT/SIGTERM or ``stop``, then shut down."""
+        await self.start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):  # pragma: no cover
+                pass
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.shutdown()
+
+    async def shutdown(self) -> None:
+        """Stop accepting, drain in-flight requests and close sessions."""
+        if self._closing:
+            return
+        self._closing = True
+        self.logger.info("Shutting down")
+        if self._server is not None:
+            self._server.close()
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+
+        # Idle keep-alive connections are closed right away
+        for task, busy in list(self._connections.items()):
+            if not busy:
+                task.cancel()
+        if self._connections:
+            _, pending = await asyncio.wait(
+                list(self._connections), timeout=self.shutdown_timeout
+            )
+            for task in pending:
+                task.cancel()
+            if pending:
+                self.logger.warning("Cancelled %s requests on shutdown",
+                                    len(pending))
+                await asyncio.wait(pending)
+
+        if self._server is not None:
+            await self._server.wait_closed()
+        self.sessions.close_all()
+        await shutdown_clients()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        """Serve HTTP/1.1 requests of one connection until it closes."""
+        task = asyncio.current_task()
+        assert task is not None
+        self._connections[task] = False
+        conn = h11.Connection(h11.SERVER, max_incomplete_event_size=65536)
+        try:
+            while not self._closing:
+                request = await self._read_request(conn, reader, writer)
+                if request is None:
+                    break
+                self._connections[task] = True
+                await self._dispatch(conn, writer, *request)
+                self._connections[task] = False
+                if conn.our_state is not h11.DONE \
+                        or conn.their_state is not h11.DONE:
+                    break
+                conn.start_next_cycle()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            if not self._closing:
+                raise
+        except Exception as e:
+            self.logger.error("Connection failed: %s", e)
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    async def _read_request(
+        self, conn: h11.Connection, reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> Optional[Tuple[h11.Request, bytes]]:
+        """Read the next request and its body, or None at end of stream."""
+        request: Optional[h11.Request] = None
+        body: List[bytes] = []
+        size = 0
+        while True:
+            try:
+                event = conn.next_event()
+            except h11.RemoteProtocolError as e:
+                if conn.our_state in (h11.IDLE, h11.SEND_RESPONSE):
+                    await self._send_json(conn, writer, e.error_status_hint,
+                                          {"error": str(e)})
+                return None
+            if event is h11.NEED_DATA:
+                conn.receive_data(await reader.read(65536))
+            elif isinstance(event, h11.Request):
+                request = event
+            elif isinstance(event, h11.Data):
+                size += len(event.data)
+                if size > MAX_BODY_BYTES:
+                    await self._send_json(conn, writer, 413,
+                                          {"error": "Body too large"})
+                    return None
+                body.append(event.data)
+            elif isinstance(event, h11.EndOfMessage):
+                assert request is not None
+                return request, b"".join(body)
+            else:
+                # ConnectionClosed or PAUSED
+                return None
+
+    async def _write(self, conn: h11.Connection,
+                     writer: asyncio.StreamWriter, event: Any) -> None:
+        data = conn.send(event)
+        if data:
+            writer.write(data)
+            await writer.drain()
+
+    def _headers(self, content_type: str,
+                 length: Optional[int] = None) -> List[Tuple[str, str]]:
+        headers = [("Content-Type", content_type)]
+        if length is not None:
+            headers.append(("Content-Length", str(length)))
+        if self._closing:
+            headers.append(("Connection", "close"))
+        return headers
+
+    async def _send_json(self, conn: h11.Connection,
+                         writer: asyncio.StreamWriter, status: int,
+                         payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        await self._write(conn, writer, h11.Response(
+            status_code=status,
+            headers=self._headers("application/json", len(body)),
+        ))
+        await self._write(conn, writer, h11.Data(data=body))
+        await self._write(conn, writer, h11.EndOfMessage())
+
+    async def _send_text(self, conn: h11.Connection,
+                         writer: asyncio.StreamWriter, text: str,
+                         content_type: str) -> None:
+        body = text.encode("utf-8")
+        await self._write(conn, writer, h11.Response(
+            status_code=200, headers=self._headers(content_type, len(body)),
+        ))
+        await self._write(conn, writer, h11.Data(data=body))
+        await self._write(conn, writer, h11.EndOfMessage())
+
+    async def _dispatch(self, conn: h11.Connection,
+                        writer: asyncio.StreamWriter,
+                        request: h11.Request, body: bytes) -> None:
+        """Route a request and write its response."""
+        method = request.method.decode("ascii").upper()
+        target = urlsplit(request.target.decode("utf-8", "replace"))
+        try:
+            if target.path == "/health":
+                if method != "GET":
+                    raise HTTPError(405, "Method not allowed")
+                await self._send_json(conn, writer, 200, {
+                    "status": "closing" if self._closing else "ok",
+                    "sessions": len(self.sessions),
+                    **self.sessions.stats,
+                })
+                return
+
+            if target.path == "/metrics" and self.settings.metrics_enabled:
+                if method != "GET":
+                    raise HTTPError(405, "Method not allowed")
+                await self._send_text(
+                    conn, writer, shared_metrics_registry().render(),
+                    "text/plain; version=0.0.4; charset=utf-8",
+                )
+                return
+
+            match = SESSION_ROUTE.match(target.path)
+            if match is None:
+                raise HTTPError(404, "Not found")
+            session_id = match.group("session_id")
+            action = match.group("action")
+
+            if action is None and method == "DELETE":
+                if not self.sessions.remove(session_id):
+                    raise HTTPError(404, f"Unknown session: {session_id}")
+                await self._send_json(conn, writer, 200,
+                                      {"session_id": session_id})
+            elif action in ("chat", "stream") and method == "POST":
+                message = self._parse_message(body)
+                session = self.sessions.get_or_create(session_id)
+                if action == "chat":
+                    await self._chat(conn, writer, session, message)
+                else:
+                    await self._stream(conn, writer, session, message)
+            elif action in ("history", "summary") and method == "GET":
+                existing = self.sessions.get(session_id)
+                if existing is None:
+                    raise HTTPError(404, f"Unknown session: {session_id}")
+                agent = existing.agent
+                if action == "history":
+                    limit = self._parse_limit(target.query)
+                    payload: Dict[str, Any] = {
+                        "messages": agent.get_recent_messages(limit)
+                    }
+                else:
+                    payload = agent.get_conversation_summary()
+                await self._send_json(conn, writer, 200,
+                                      {"session_id": session_id, **payload})
+            else:
+                raise HTTPError(405, "Method not allowed")
+
+        except HTTPError as e:
+            await self._send_json(conn, writer, e.status,
+                                  {"error": e.message})
+        except (ConnectionError, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            if conn.our_state is not h11.SEND_RESPONSE:
+                raise
+            if not isinstance(e, AIAgentException):
+                self.logger.error("Request failed: %s", e)
+            await self._send_json(conn, writer, _error_status(e),
+                                  {"error": str(e)})
+
+    @staticmethod
+    def _parse_message(body: bytes) -> str:
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Request body must be JSON")
+        message = payload.get("message") if isinstance(payload, dict) \
+            else None
+        if not isinstance(message, str) or not message.strip():
+            raise HTTPError(400, "'message' must be a non-empty string")
+        return message
+
+    @staticmethod
+    def _parse_limit(query: str) -> int:
+        values = parse_qs(query).get("limit", ["20"])
+        try:
+            return max(1, min(1000, int(values[-1])))
+        except ValueError:
+            raise HTTPError(400, "'limit' must be an integer")
+
+    async def _chat(self, conn: h11.Connection,
+                    writer: asyncio.StreamWriter, session: Session,
+                    message: str) -> None:
+        session.active += 1
+        try:
+            async with session.lock:
+                response = await session.agent.chat(message)
+        finally:
+            session.active -= 1
+        await self._send_json(conn, writer, 200, {
+            "session_id": session.session_id,
+            "response": response,
+        })
+
+    async def _stream(self, conn: h11.Connection,
+                      writer: asyncio.StreamWriter, session: Session,
+                      message: str) -> None:
+        """Stream reply tokens as ``data:`` events, then a ``done`` event.
+
+        Errors after the response has started are reported as an
+        ``error`` event, since the status line has already been sent.
+        """
+        session.active += 1
+        try:
+            async with session.lock:
+                await self._write(conn, writer, h11.Response(
+                    status_code=200,
+                    headers=self._headers("text/event-stream")
+                    + [("Cache-Control", "no-cache")],
+                ))
+                try:
+                    async for token in session.agent.chat_stream(message):
+                        await self._write_event(conn, writer,
+                                                {"token": token})
+                    await self._write_event(
+                        conn, writer, {"session_id": session.session_id},
+                        event="done",
+                    )
+                except AIAgentException as e:
+                    await self._write_event(
+                        conn, writer,
+                        {"error": str(e), "status": _error_status(e)},
+                        event="error",
+                    )
+                await self._write(conn, writer, h11.EndOfMessage())
+        finally:
+            session.active -= 1
+
+    async def _write_event(self, conn: h11.Connection,
+                           writer: asyncio.StreamWriter,
+                           payload: Dict[str, Any],
+                           event: Optional[str] = None) -> None:
+        data = f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+        if event:
+            data = f"event: {event}\n{data}"
+        await self._write(conn, writer, h11.Data(data=data.encode("utf-8")))
+
+
+async def serve(settings: Optional[Settings] = None,
+                **kwargs: Any) -> None:
+    """Run an ``AgentServer`` until interrupted."""
+    await AgentServer(settings, **kwargs).serve_forever()
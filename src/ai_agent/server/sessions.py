@@ -0,0 +1,119 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from src.ai_agent.core.agent import AIAgent
+from src.ai_agent.utils.logger import setup_logger
+
+
+class Session:
+    """An agent serving one client conversation."""
+
+    def __init__(self, session_id: str, agent: AIAgent):
+        self.session_id = session_id
+        self.agent = agent
+        # Turns of one conversation must not interleave
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.active = 0
+
+    def close(self) -> None:
+        """Release the files held by the agent."""
+        self.agent.detach_log()
+        self.agent.detach_store()
+
+
+class SessionManager:
+    """Sessions created on first use and evicted by LRU order and TTL.
+
+    At most ``max_sessions`` are kept; the least recently used idle
+    session makes room for a new one, and sessions idle for longer than
+    ``idle_ttl`` seconds are dropped by ``evict_expired``. Sessions with
+    a request in flight are never evicted.
+    """
+
+    def __init__(self, agent_factory: Callable[[str], AIAgent],
+                 max_sessions: int = 1000, idle_ttl: float = 1800.0):
+        self.agent_factory = agent_factory
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.stats: Dict[str, int] = {"created": 0, "evicted": 0,
+                                      "expired": 0}
+        self.logger = setup_logger(self.__class__.__name__)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: object) -> bool:
+        return session_id in self._sessions
+
+    def ids(self) -> List[str]:
+        """Ids of the live sessions, least recently used first."""
+        return list(self._sessions)
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """Get a live session and mark it as recently used."""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def get_or_create(self, session_id: str) -> Session:
+        """Get a session, creating it (and evicting if full) on first use."""
+        session = self.get(session_id)
+        if session is not None:
+            return session
+        self._evict_lru(self.max_sessions - 1)
+        session = Session(session_id, self.agent_factory(session_id))
+        self._sessions[session_id] = session
+        self.stats["created"] += 1
+        return session
+
+    def _evict_lru(self, keep: int) -> None:
+        """Evict idle sessions, oldest first, until ``keep`` remain."""
+        for session_id in list(self._sessions):
+            if len(self._sessions) <= keep:
+                break
+            if self._sessions[session_id].active == 0:
+                self._sessions.pop(session_id).close()
+                self.stats["evicted"] += 1
+
+    def evict_expired(self) -> int:
+        """Drop sessions idle for longer than the TTL."""
+        deadline = time.monotonic() - self.idle_ttl
+        expired = 0
+        for session_id, session in list(self._sessions.items()):
+            # Sessions are in LRU order, so the rest are fresher
+            if session.last_used > deadline:
+                break
+            if session.active == 0:
+                del self._sessions[session_id]
+                session.close()
+                expired += 1
+        self.stats["expired"] += expired
+        return expired
+
+    def remove(self, session_id: str) -> bool:
+        """Close and forget a session."""
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def close_all(self) -> None:
+        """Close every session."""
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+
+    async def sweep(self, interval: float) -> None:
+        """Evict expired sessions every ``interval`` seconds, forever."""
+        while True:
+            await asyncio.sleep(interval)
+            expired = self.evict_expired()
+            if expired:
+                self.logger.info("Evicted %s idle sessions", expired)
@@ -0,0 +1,133 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from src.ai_agent.core.exceptions import AIAgentException
+from src.ai_agent.providers.base_provider import Message
+
+from .journal import Journal, dump_record, iter_records
+
+
+class ConversationLog(Journal):
+    """Append-only JSONL log of a conversation.
+
+    The first record is a header with the agent name, model and system
+    prompt; every message is appended as its own record, so saving a turn
+    costs O(1) instead of rewriting the whole conversation. ``clear`` and
+    system prompt records supersede earlier ones and are folded away by
+    ``compact``, which atomically rewrites the log. Appends are made
+    durable according to the ``Journal`` fsync policy.
+    """
+
+    def __init__(self, filepath: str, fsync: str = "interval",
+                 fsync_interval: float = 1.0,
+                 compact_min_records: int = 1000):
+        super().__init__(filepath, fsync=fsync,
+                         fsync_interval=fsync_interval)
+        self.compact_min_records = compact_min_records
+        self.live_records = 0
+        self.dead_records = 0
+
+    def create(self, header: Dict[str, Any],
+               messages: Iterable[Message] = ()) -> None:
+        """Atomically (re)write the log and open it for appending."""
+        count = 0
+
+        def write(f: TextIO) -> None:
+            nonlocal count
+            f.write(dump_record({"type": "header", **header}) + "\n")
+            for message in messages:
+                f.write(dump_record({"type": "message",
+                                     **message.model_dump()}) + "\n")
+                count += 1
+
+        self.rewrite(write)
+        self.live_records = count
+        self.dead_records = 0
+
+    def reopen(self) -> None:
+        """Open an existing log for appending."""
+        if not Path(self.filepath).exists():
+            raise AIAgentException(
+                f"Conversation log not found: {self.filepath}"
+            )
+        self.open()
+
+    def append(self, message: Message) -> None:
+        """Append one message."""
+        self.write({"type": "message", **message.model_dump()})
+        self.live_records += 1
+
+    def record_clear(self) -> None:
+        """Record that the history was cleared."""
+        self.write({"type": "clear"})
+        self.dead_records += self.live_records + 1
+        self.live_records = 0
+
+    def record_system_prompt(self, prompt: str) -> None:
+        """Record a new system prompt."""
+        self.write({"type": "system_prompt", "content": prompt})
+        self.dead_records += 1
+
+    def needs_compaction(self) -> bool:
+        """Whether superseded records outweigh live ones."""
+        return (self.dead_records >= self.compact_min_records
+                and self.dead_records > self.live_records)
+
+
+class LoadedLog:
+    """Header of a conversation log plus a lazy stream of its messages."""
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._records = iter_records(filepath)
+        first = next(self._records, None)
+        if first is None or first.get("type") != "header":
+            raise AIAgentException(
+                f"Missing conversation log header: {filepath}"
+            )
+        self.header: Dict[str, Any] = {
+            k: v for k, v in first.items() if k != "type"
+        }
+        self.system_prompt: Optional[str] = self.header.get("system_prompt")
+
+    def events(self) -> Iterator[Dict[str, Any]]:
+        """Stream the records after the header, updating the prompt."""
+        for record in self._records:
+            if record.get("type") == "system_prompt":
+                self.system_prompt = record.get("content")
+            yield record
+
+
+def read_conversation_file(filepath: str) -> Dict[str, Any]:
+    """Read a saved conversation (JSON or JSONL log) as a dictionary.
+
+    The result has the layout of the JSON format: ``agent_name``,
+    ``model``, ``system_prompt``, ``saved_at`` and ``conversation``.
+    """
+    if not is_log_path(filepath):
+        with open(filepath, "r", encoding="utf-8") as f:
+            data: Dict[str, Any] = json.load(f)
+        return data
+
+    loaded = LoadedLog(filepath)
+    conversation: List[Dict[str, Any]] = []
+    for record in loaded.events():
+        if record.get("type") == "message":
+            conversation.append(
+                {k: v for k, v in record.items() if k != "type"}
+            )
+        elif record.get("type") == "clear":
+            conversation = []
+    return {
+        "agent_name": loaded.header.get("agent_name"),
+        "model": loaded.header.get("model"),
+        "system_prompt": loaded.system_prompt,
+        "saved_at": loaded.header.get("created_at"),
+        "conversation": conversation,
+    }
+
+
+def is_log_path(filepath: str) -> bool:
+    """Whether a conversation path uses the JSONL log format."""
+    return Path(filepath).suffix.lower() == ".jsonl"
@@ -0,0 +1,396 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from pydantic import BaseModel
+
+from .conversation_log import read_conversation_file
+from src.ai_agent.core.exceptions import AIAgentException
+from src.ai_agent.providers.base_provider import Message
+
+
+class SessionInfo(BaseModel):
+    """Metadata of a stored conversation session."""
+
+    session_id: str
+    agent_name: str = ""
+    model: str = ""
+    system_prompt: Optional[str] = None
+    created_at: float
+    updated_at: float
+    message_count: int = 0
+
+
+class ConversationStore(ABC):
+    """Storage for many conversation sessions and their messages.
+
+    Messages of a session are numbered from 0 in the order they were
+    appended, so a caller can keep only recent ones in memory and page
+    older ones back in with ``load_messages(before=...)``.
+    """
+
+    @abstractmethod
+    def create_session(self, session_id: Optional[str] = None,
+                       agent_name: str = "", model: str = "",
+                       system_prompt: Optional[str] = None,
+                       messages: Iterable[Message] = (),
+                       created_at: Optional[float] = None) -> SessionInfo:
+        """Create a session, generating an id if none is given."""
+        pass
+
+    @abstractmethod
+    def get_session(self, session_id: str) -> Optional[SessionInfo]:
+        """Get a session, or None if it does not exist."""
+        pass
+
+    @abstractmethod
+    def list_sessions(self, agent_name: Optional[str] = None,
+                      model: Optional[str] = None,
+                      since: Optional[float] = None,
+                      until: Optional[float] = None,
+                      limit: int = 50,
+                      offset: int = 0) -> List[SessionInfo]:
+        """List sessions, most recently updated first."""
+        pass
+
+    @abstractmethod
+    def set_system_prompt(self, session_id: str, prompt: str) -> None:
+        """Replace the system prompt of a session."""
+        pass
+
+    @abstractmethod
+    def append_messages(self, session_id: str,
+                        messages: Iterable[Message]) -> int:
+        """Append messages to a session, returning its message count."""
+        pass
+
+    @abstractmethod
+    def load_messages(self, session_id: str, limit: Optional[int] = None,
+                      before: Optional[int] = None) -> List[Message]:
+        """Load the last ``limit`` messages numbered below ``before``."""
+        pass
+
+    @abstractmethod
+    def count_roles(self, session_id: str,
+                    before: Optional[int] = None) -> Dict[str, int]:
+        """Count the messages per role numbered below ``before``."""
+        pass
+
+    @abstractmethod
+    def clear_messages(self, session_id: str) -> None:
+        """Remove every message of a session."""
+        pass
+
+    @abstractmethod
+    def delete_session(self, session_id: str) -> None:
+        """Remove a session and its messages."""
+        pass
+
+    def close(self) -> None:
+        """Release the resources held by the store."""
+        pass
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Conversation store in a SQLite database in WAL mode.
+
+    Sessions are indexed by agent name, model and update time; messages
+    are clustered by session and sequence number, so listing, resuming
+    and paging a session do not scan unrelated conversations.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path),
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " agent_name TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " system_prompt TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " message_count INTEGER NOT NULL DEFAULT 0);"
+            "CREATE INDEX IF NOT EXISTS sessions_updated_at"
+            " ON sessions (updated_at);"
+            "CREATE INDEX IF NOT EXISTS sessions_agent_name"
+            " ON sessions (agent_name, updated_at);"
+            "CREATE INDEX IF NOT EXISTS sessions_model"
+            " ON sessions (model, updated_at);"
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " session_id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " role TEXT NOT NULL,"
+            " content TEXT NOT NULL,"
+            " timestamp TEXT,"
+            " PRIMARY KEY (session_id, seq)) WITHOUT ROWID;"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _to_session(row: sqlite3.Row) -> SessionInfo:
+        return SessionInfo(
+            session_id=row[0], agent_name=row[1], model=row[2],
+            system_prompt=row[3], created_at=row[4], updated_at=row[5],
+            message_count=row[6],
+        )
+
+    def create_session(self, session_id: Optional[str] = None,
+                       agent_name: str = "", model: str = "",
+                       system_prompt: Optional[str] = None,
+                       messages: Iterable[Message] = (),
+                       created_at: Optional[float] = None) -> SessionInfo:
+        """Create a session, generating an id if none is given."""
+        now = created_at if created_at is not None else time.time()
+        session_id = session_id or uuid.uuid4().hex
+        rows = [
+            (session_id, seq, m.role, m.content, m.timestamp)
+            for seq, m in enumerate(messages)
+        ]
+        info = SessionInfo(
+            session_id=session_id, agent_name=agent_name, model=model,
+            system_prompt=system_prompt, created_at=now, updated_at=now,
+            message_count=len(rows),
+        )
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT INTO sessions (session_id, agent_name, model,"
+                    " system_prompt, created_at, updated_at, message_count)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (session_id, agent_name, model, system_prompt,
+                     now, now, len(rows)),
+                )
+                self._insert_messages(rows)
+        except sqlite3.IntegrityError:
+            raise AIAgentException(
+                f"Session already exists: {info.session_id}"
+            )
+        return info
+
+    def get_session(self, session_id: str) -> Optional[SessionInfo]:
+        """Get a session, or None if it does not exist."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT session_id, agent_name, model, system_prompt,"
+                " created_at, updated_at, message_count"
+                " FROM sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        return self._to_session(row) if row is not None else None
+
+    def list_sessions(self, agent_name: Optional[str] = None,
+                      model: Optional[str] = None,
+                      since: Optional[float] = None,
+                      until: Optional[float] = None,
+                      limit: int = 50,
+                      offset: int = 0) -> List[SessionInfo]:
+        """List sessions, most recently updated first."""
+        clauses = []
+        params: List[object] = []
+        if agent_name is not None:
+            clauses.append("agent_name = ?")
+            params.append(agent_name)
+        if model is not None:
+            clauses.append("model = ?")
+            params.append(model)
+        if since is not None:
+            clauses.append("updated_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("updated_at < ?")
+            params.append(until)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT session_id, agent_name, model, system_prompt,"
+                " created_at, updated_at, message_count"
+                f" FROM sessions{where}"
+                " ORDER BY updated_at DESC LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+        return [self._to_session(row) for row in rows]
+
+    def _require(self, session_id: str) -> int:
+        """Get the message count of a session that must exist."""
+        row = self._conn.execute(
+            "SELECT message_count FROM sessions WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        if row is None:
+            raise AIAgentException(f"Session not found: {session_id}")
+        return int(row[0])
+
+    def _insert_messages(self, rows: List[tuple]) -> None:
+        self._conn.executemany(
+            "INSERT INTO messages"
+            " (session_id, seq, role, content, timestamp)"
+            " VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def set_system_prompt(self, session_id: str, prompt: str) -> None:
+        """Replace the system prompt of a session."""
+        with self._lock, self._conn:
+            self._require(session_id)
+            self._conn.execute(
+                "UPDATE sessions SET system_prompt = ?, updated_at = ?"
+                " WHERE session_id = ?",
+                (prompt, time.time(), session_id),
+            )
+
+    def append_messages(self, session_id: str,
+                        messages: Iterable[Message]) -> int:
+        """Append messages to a session, returning its message count."""
+        with self._lock, self._conn:
+            count = self._require(session_id)
+            rows = []
+            for message in messages:
+                rows.append((session_id, count, message.role,
+                             message.content, message.timestamp))
+                count += 1
+            if rows:
+                self._insert_messages(rows)
+                self._conn.execute(
+                    "UPDATE sessions SET message_count = ?, updated_at = ?"
+                    " WHERE session_id = ?",
+                    (count, time.time(), session_id),
+                )
+        return count
+
+    def load_messages(self, session_id: str, limit: Optional[int] = None,
+                      before: Optional[int] = None) -> List[Message]:
+        """Load the last ``limit`` messages numbered below ``before``."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, content, timestamp FROM messages"
+                " WHERE session_id = ? AND seq < ?"
+                " ORDER BY seq DESC LIMIT ?",
+                (session_id, before if before is not None else 2 ** 62,
+                 limit if limit is not None else -1),
+            ).fetchall()
+        return [
+            Message(role=role, content=content, timestamp=timestamp)
+            for role, content, timestamp in reversed(rows)
+        ]
+
+    def count_roles(self, session_id: str,
+                    before: Optional[int] = None) -> Dict[str, int]:
+        """Count the messages per role numbered below ``before``."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT role, COUNT(*) FROM messages"
+                " WHERE session_id = ? AND seq < ? GROUP BY role",
+                (session_id, before if before is not None else 2 ** 62),
+            ).fetchall()
+        return {role: count for role, count in rows}
+
+    def clear_messages(self, session_id: str) -> None:
+        """Remove every message of a session."""
+        with self._lock, self._conn:
+            self._require(session_id)
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?",
+                               (session_id,))
+            self._conn.execute(
+                "UPDATE sessions SET message_count = 0, updated_at = ?"
+                " WHERE session_id = ?",
+                (time.time(), session_id),
+            )
+
+    def delete_session(self, session_id: str) -> None:
+        """Remove a session and its messages."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?",
+                               (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?",
+                               (session_id,))
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM sessions"
+            ).fetchone()
+        return int(row[0])
+
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return None
+
+
+def import_session_id(filepath: Union[str, Path]) -> str:
+    """Session id of an imported file: its stem plus a path hash.
+
+    The hash of the resolved path keeps ``x.json`` and ``x.jsonl``, or
+    same-named files in different directories, apart.
+    """
+    path = Path(filepath).resolve()
+    digest = hashlib.sha256(str(path).encode("utf-8")).hexdigest()
+    return f"{path.stem}-{digest[:8]}"
+
+
+def import_conversations(store: ConversationStore,
+                         paths: Iterable[Union[str, Path]]) -> int:
+    """Import saved JSON and JSONL conversations into a store.
+
+    Directories are searched for ``*.json`` and ``*.jsonl`` files. Each
+    file becomes a session named by ``import_session_id``, and files
+    imported before are skipped, so the import can be rerun. Returns the
+    number of sessions created.
+    """
+    files: List[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(
+                p for p in path.iterdir()
+                if p.suffix.lower() in (".json", ".jsonl")
+            ))
+        else:
+            files.append(path)
+
+    imported = 0
+    seen: Dict[str, Path] = {}
+    for filepath in files:
+        session_id = import_session_id(filepath)
+        if session_id in seen:
+            if seen[session_id] != filepath.resolve():
+                raise AIAgentException(
+                    f"Conversations {seen[session_id]} and {filepath} "
+                    f"map to the same session: {session_id}"
+                )
+            continue
+        seen[session_id] = filepath.resolve()
+        if store.get_session(session_id) is not None:
+            continue
+        data = read_conversation_file(str(filepath))
+        store.create_session(
+            session_id,
+            agent_name=data.get("agent_name") or "",
+            model=data.get("model") or "",
+            system_prompt=data.get("system_prompt"),
+            messages=[Message(**msg)
+                      for msg in data.get("conversation", [])],
+            created_at=_parse_time(data.get("saved_at")),
+        )
+        imported += 1
+    return imported
@@ -0,0 +1,113 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, TextIO
+
+from src.ai_agent.core.exceptions import AIAgentException
+from src.ai_agent.utils.files import atomic_write, truncate_torn_tail
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+
+def dump_record(record: Dict[str, Any]) -> str:
+    """Serialize a record as one compact JSON line, without newline."""
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+def iter_records(filepath: str) -> Iterator[Dict[str, Any]]:
+    """Stream the records of a JSONL journal one line at a time.
+
+    A torn final line left by a crash mid-write is skipped; corruption
+    anywhere else is an error.
+    """
+    with open(filepath, "r", encoding="utf-8") as f:
+        pending_error: Optional[ValueError] = None
+        for line_number, line in enumerate(f, start=1):
+            if pending_error is not None:
+                raise AIAgentException(
+                    f"Corrupt line {line_number - 1} of {filepath}: "
+                    f"{pending_error}"
+                )
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                pending_error = e
+
+
+class Journal:
+    """Append-only JSONL file of records.
+
+    Opening an existing journal first cuts off a torn final line left by
+    a crash, so that appending never buries it mid-file. Durability
+    follows the fsync policy: ``always`` syncs every append, ``interval``
+    at most once per ``fsync_interval`` seconds, and ``never`` leaves it
+    to the operating system.
+    """
+
+    def __init__(self, filepath: str, fsync: str = "interval",
+                 fsync_interval: float = 1.0):
+        if fsync not in FSYNC_POLICIES:
+            raise AIAgentException(f"Unknown fsync policy: {fsync}")
+        self.filepath = filepath
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._file: Optional[TextIO] = None
+        self._last_sync = time.monotonic()
+        self._dirty = False
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """Stream the records written so far, if the file exists."""
+        if os.path.exists(self.filepath):
+            yield from iter_records(self.filepath)
+
+    def open(self) -> None:
+        """Open the journal for appending, creating it if needed."""
+        self.close()
+        if os.path.exists(self.filepath):
+            truncate_torn_tail(self.filepath)
+        else:
+            Path(self.filepath).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.filepath, "a", encoding="utf-8")
+        self._last_sync = time.monotonic()
+
+    def rewrite(self, write: Callable[[TextIO], None]) -> None:
+        """Atomically replace the journal and open it for appending."""
+        self.close()
+        atomic_write(self.filepath, write)
+        self.open()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Append one record."""
+        if self._file is None:
+            raise AIAgentException(f"Journal is not open: {self.filepath}")
+        self._file.write(dump_record(record) + "\n")
+        self._file.flush()
+        self._dirty = True
+        if self.fsync == "always" or (
+            self.fsync == "interval"
+            and time.monotonic() - self._last_sync >= self.fsync_interval
+        ):
+            self.sync()
+
+    def sync(self) -> None:
+        """Force appended records to disk."""
+        if self._file is not None and self._dirty:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._dirty = False
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        """Sync and close the journal."""
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the journal is open for appending."""
+        return self._file is not None
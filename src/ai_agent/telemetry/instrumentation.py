@@ -0,0 +1,245 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .metrics import MetricsRegistry
+from .tracing import JsonlSpanExporter, Span, SpanExporter
+
+
+class CallRecord:
+    """Measurements of one agent or provider call.
+
+    Provider calls made on behalf of an agent call are its
+    ``children``. Wrappers add what they observe (retries, cache hits,
+    rate-limit queueing) to the record of the call in progress, found
+    with ``current_call``.
+    """
+
+    __slots__ = ("name", "model", "parent", "children", "start",
+                 "start_unix_nano", "duration", "ttfb", "queue_time",
+                 "prompt_tokens", "completion_tokens", "cached_tokens",
+                 "retries", "cache", "error")
+
+    def __init__(self, name: str, model: str,
+                 parent: Optional["CallRecord"] = None):
+        self.name = name
+        self.model = model
+        self.parent = parent
+        self.children: List["CallRecord"] = []
+        self.start = time.perf_counter()
+        self.start_unix_nano = time.time_ns()
+        self.duration = 0.0
+        self.ttfb: Optional[float] = None
+        self.queue_time = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.retries = 0
+        self.cache: Optional[str] = None
+        self.error: Optional[str] = None
+
+    def first_byte(self) -> None:
+        """Note the arrival of the first response byte or token."""
+        if self.ttfb is None:
+            self.ttfb = time.perf_counter() - self.start
+
+    def add_usage(self, usage: Optional[Dict[str, int]]) -> None:
+        """Add the token counts of a ``ChatResponse.usage``."""
+        if usage:
+            self.prompt_tokens += usage.get("prompt_tokens") or 0
+            self.completion_tokens += usage.get("completion_tokens") or 0
+            self.cached_tokens += usage.get("cached_tokens") or 0
+
+    def walk(self) -> Iterator["CallRecord"]:
+        """This record and all its descendants, parents first."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+_current_call: ContextVar[Optional[CallRecord]] = ContextVar(
+    "ai_agent_current_call", default=None
+)
+
+
+def current_call() -> Optional[CallRecord]:
+    """Record of the instrumented call in progress, if any.
+
+    Costs a single context variable lookup, so uninstrumented code paths
+    can call it unconditionally.
+    """
+    return _current_call.get()
+
+
+class TelemetryHook:
+    """Receives every finished top-level call with its provider calls."""
+
+    def on_call(self, record: CallRecord) -> None:
+        """Handle a finished call."""
+        pass
+
+
+class PrometheusHook(TelemetryHook):
+    """Aggregates calls into counters and histograms of a registry."""
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.requests = registry.counter(
+            "ai_agent_requests_total", "Calls by operation and status"
+        )
+        self.errors = registry.counter(
+            "ai_agent_errors_total", "Failed calls by operation and error"
+        )
+        self.duration = registry.histogram(
+            "ai_agent_request_duration_seconds", "Total call latency"
+        )
+        self.ttfb = registry.histogram(
+            "ai_agent_time_to_first_byte_seconds",
+            "Time to the first response byte or token",
+        )
+        self.queue = registry.histogram(
+            "ai_agent_queue_seconds",
+            "Time provider calls waited for the client-side rate limiter",
+        )
+        self.tokens = registry.counter(
+            "ai_agent_tokens_total", "Tokens by type"
+        )
+        self.retries = registry.counter(
+            "ai_agent_retries_total", "Retried provider calls"
+        )
+        self.cache_hits = registry.counter(
+            "ai_agent_cache_hits_total", "Calls answered by a cache"
+        )
+
+    def on_call(self, record: CallRecord) -> None:
+        """Add a finished call and its provider calls to the metrics."""
+        for call in record.walk():
+            operation = call.name
+            status = "error" if call.error else "ok"
+            self.requests.inc(operation=operation, status=status)
+            self.duration.observe(call.duration, operation=operation)
+            if call.error:
+                self.errors.inc(operation=operation, error=call.error)
+            if call.ttfb is not None:
+                self.ttfb.observe(call.ttfb, operation=operation)
+            if call.queue_time:
+                self.queue.observe(call.queue_time, operation=operation)
+            if call.retries:
+                self.retries.inc(call.retries, operation=operation)
+            if call.cache:
+                self.cache_hits.inc(cache=call.cache)
+            # Outer calls report the tokens of their provider calls again
+            if not call.children:
+                self._count_tokens(call)
+
+    def _count_tokens(self, call: CallRecord) -> None:
+        for kind, count in (("prompt", call.prompt_tokens),
+                            ("completion", call.completion_tokens),
+                            ("cached", call.cached_tokens)):
+            if count:
+                self.tokens.inc(count, type=kind)
+
+
+class SpanHook(TelemetryHook):
+    """Turns each call tree into OpenTelemetry-style spans.
+
+    Attribute names follow the OpenTelemetry semantic conventions for
+    generative AI where one exists.
+    """
+
+    def __init__(self, exporter: SpanExporter):
+        self.exporter = exporter
+
+    def _spans(self, record: CallRecord,
+               parent: Optional[Span]) -> List[Span]:
+        span = Span(record.name, record.start_unix_nano, parent, {
+            "gen_ai.request.model": record.model,
+            "gen_ai.usage.input_tokens": record.prompt_tokens or None,
+            "gen_ai.usage.output_tokens": record.completion_tokens or None,
+            "ai_agent.cached_tokens": record.cached_tokens or None,
+            "ai_agent.time_to_first_byte": record.ttfb,
+            "ai_agent.queue_time": record.queue_time or None,
+            "ai_agent.retries": record.retries or None,
+            "ai_agent.cache": record.cache,
+        })
+        span.end_time_unix_nano = (record.start_unix_nano
+                                   + int(record.duration * 1e9))
+        if record.error:
+            span.set_error(record.error)
+        spans = [span]
+        for child in record.children:
+            spans.extend(self._spans(child, span))
+        return spans
+
+    def on_call(self, record: CallRecord) -> None:
+        """Export the spans of a finished call."""
+        self.exporter(self._spans(record, None))
+
+
+class Telemetry:
+    """Records agent and provider calls and hands them to hooks."""
+
+    def __init__(self, hooks: Sequence[TelemetryHook] = ()):
+        self.hooks = list(hooks)
+
+    def start(self, name: str, model: str) -> CallRecord:
+        """Start recording a call, nested in the call in progress."""
+        parent = _current_call.get()
+        record = CallRecord(name, model, parent)
+        if parent is not None:
+            parent.children.append(record)
+        _current_call.set(record)
+        return record
+
+    def finish(self, record: CallRecord,
+               error: Optional[BaseException] = None) -> None:
+        """Stop recording a call; top-level calls go to the hooks."""
+        record.duration = time.perf_counter() - record.start
+        if error is not None:
+            record.error = error.__class__.__name__
+        # Restoring the parent (rather than resetting a token) also works
+        # when an async generator is finalized in another context
+        _current_call.set(record.parent)
+        if record.parent is None:
+            for hook in self.hooks:
+                hook.on_call(record)
+
+
+_shared_registry = MetricsRegistry()
+_shared_telemetry: Dict[Tuple[bool, Optional[str]], Telemetry] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_metrics_registry() -> MetricsRegistry:
+    """Get the process-wide metrics registry."""
+    return _shared_registry
+
+
+def shared_telemetry(metrics: bool = True,
+                     trace_path: Optional[str] = None) -> Telemetry:
+    """Get the process-wide telemetry exporting metrics and/or traces.
+
+    Metrics go to ``shared_metrics_registry()``; traces are appended to
+    ``trace_path`` as OTLP/JSON.
+    """
+    key = (metrics, trace_path)
+    with _shared_lock:
+        telemetry = _shared_telemetry.get(key)
+        if telemetry is None:
+            hooks: List[TelemetryHook] = []
+            if metrics:
+                hooks.append(PrometheusHook(_shared_registry))
+            if trace_path:
+                hooks.append(SpanHook(JsonlSpanExporter(trace_path)))
+            telemetry = Telemetry(hooks)
+            _shared_telemetry[key] = telemetry
+        return telemetry
+
+
+def clear_telemetry() -> None:
+    """Forget the process-wide telemetry and its metrics."""
+    global _shared_registry
+    with _shared_lock:
+        _shared_telemetry.clear()
+        _shared_registry = MetricsRegistry()
@@ -0,0 +1,167 @@
+import bisect
+import math
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Seconds, from fast cache hits to long completions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0)
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value: str) -> str:
+    return (value.replace("\\", "\\\\").replace("\n", "\\n")
+            .replace('"', '\\"'))
+
+
+def _format_labels(key: LabelKey,
+                   extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(
+        f'{name}="{_escape(value)}"' for name, value in pairs
+    ) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add ``amount`` to the count of a label set."""
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Current count of a label set."""
+        return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        """Sample lines in the Prometheus text format."""
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Histogram:
+    """Distribution of observations in cumulative buckets per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: bucket counts (last one is +Inf), sum, count
+        self._values: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation."""
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = ([0] * (len(self.buckets) + 1), [0.0])
+                self._values[key] = entry
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def count(self, **labels: str) -> int:
+        """Number of observations of a label set."""
+        entry = self._values.get(_label_key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        """Sample lines in the Prometheus text format."""
+        with self._lock:
+            items = sorted(
+                (key, (list(counts), total[0]))
+                for key, (counts, total) in self._values.items()
+            )
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{_format_labels(key, ('le', _format_value(bound)))}"
+                    f" {cumulative}"
+                )
+            labels = _format_labels(key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+Metric = Union[Counter, Histogram]
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if existing.kind != metric.kind:
+                    raise ValueError(
+                        f"Metric {metric.name} is already a {existing.kind}"
+                    )
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, description: str) -> Counter:
+        """Get or create a counter."""
+        metric = self._register(Counter(name, description))
+        assert isinstance(metric, Counter)
+        return metric
+
+    def histogram(self, name: str, description: str,
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Get or create a histogram."""
+        metric = self._register(Histogram(name, description, buckets))
+        assert isinstance(metric, Histogram)
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
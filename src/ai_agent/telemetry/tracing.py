@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Status codes of the OpenTelemetry data model
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+SpanExporter = Callable[[List["Span"]], None]
+
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+class Span:
+    """One timed operation, following the OpenTelemetry span data model.
+
+    ``to_otlp`` gives the OTLP/JSON form, which OpenTelemetry collectors
+    and backends can ingest as is.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id",
+                 "start_time_unix_nano", "end_time_unix_nano",
+                 "attributes", "status_code", "status_message")
+
+    def __init__(self, name: str, start_time_unix_nano: int,
+                 parent: Optional["Span"] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id: str = parent.trace_id if parent else _new_id(16)
+        self.span_id: str = _new_id(8)
+        self.parent_span_id: str = parent.span_id if parent else ""
+        self.start_time_unix_nano = start_time_unix_nano
+        self.end_time_unix_nano = start_time_unix_nano
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+
+    def set_error(self, message: str) -> None:
+        """Mark the operation as failed."""
+        self.status_code = STATUS_ERROR
+        self.status_message = message
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Get the span in the OTLP/JSON encoding."""
+        span: Dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 3,  # SPAN_KIND_CLIENT
+            "startTimeUnixNano": str(self.start_time_unix_nano),
+            "endTimeUnixNano": str(self.end_time_unix_nano),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+                if value is not None
+            ],
+            "status": {"code": self.status_code},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class JsonlSpanExporter:
+    """Appends finished traces to a file, one OTLP/JSON request per line.
+
+    Each line is an ``ExportTraceServiceRequest``, so the file can be
+    replayed to an OpenTelemetry collector.
+    """
+
+    def __init__(self, path: str, service_name: str = "ai-agent"):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def __call__(self, spans: List[Span]) -> None:
+        request = {"resourceSpans": [{
+            "resource": {"attributes": [{
+                "key": "service.name",
+                "value": {"stringValue": self.service_name},
+            }]},
+            "scopeSpans": [{
+                "scope": {"name": "ai_agent"},
+                "spans": [span.to_otlp() for span in spans],
+            }],
+        }]}
+        line = json.dumps(request, separators=(",", ":"))
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
@@ -0,0 +1,204 @@
+import asyncio
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional,
+    Tuple, TypeVar, Union, cast
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+Outcome = Union[R, Exception]
+
+
+async def bounded_map(
+    func: Callable[[T], Awaitable[R]],
+    items: Iterable[T],
+    concurrency: int,
+) -> AsyncIterator[Tuple[int, Outcome[R]]]:
+    """Run ``func`` over ``items`` with at most ``concurrency`` in flight.
+
+    Yields ``(index, result)`` pairs as they complete. An exception raised
+    for one item is yielded as its result instead of aborting the rest.
+    Items are pulled lazily, so ``items`` may be an unbounded iterator.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    queue: "asyncio.Queue[Tuple[int, Outcome[R]] | None]" = asyncio.Queue()
+    pending = enumerate(items)
+
+    async def worker() -> None:
+        try:
+            for index, item in pending:
+                try:
+                    result: Outcome[R] = await func(item)
+                except Exception as e:
+                    result = e
+                await queue.put((index, result))
+        finally:
+            await queue.put(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    running = len(workers)
+    try:
+        while running:
+            entry = await queue.get()
+            if entry is None:
+                running -= 1
+                continue
+            yield entry
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def in_order(
+    results: AsyncIterator[Tuple[int, T]],
+) -> AsyncIterator[Tuple[int, T]]:
+    """Re-order indexed results, yielding each as soon as its turn comes."""
+    buffered: Dict[int, T] = {}
+    next_index = 0
+    async for index, result in results:
+        buffered[index] = result
+        while next_index in buffered:
+            yield next_index, buffered.pop(next_index)
+            next_index += 1
+
+
+class _Flight:
+    """One upstream call and the callers waiting for it."""
+
+    def __init__(self, task: "asyncio.Future[Any]"):
+        self.task = task
+        self.loop = asyncio.get_running_loop()
+        self.waiters = 0
+
+
+class _StreamFlight:
+    """One upstream stream fanned out to its subscribers."""
+
+    def __init__(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.tokens: List[Any] = []
+        self.queues: List["asyncio.Queue[Any]"] = []
+        self.task: Optional["asyncio.Task[None]"] = None
+
+
+class _Failed:
+    """Marks the end of a stream that raised ``error``."""
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+_END = object()
+
+
+class SingleFlight:
+    """Runs identical concurrent calls once and shares the outcome.
+
+    The first caller for a key starts the call as a task; callers with
+    the same key arriving before it finishes wait for that task instead
+    of starting their own. Results are not kept once the call finished.
+    A cancelled caller only stops waiting; the call itself is cancelled
+    when every caller has gone.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _StreamFlight] = {}
+        self.stats: Dict[str, int] = {"calls": 0, "coalesced": 0,
+                                      "cancelled": 0}
+
+    def _current(self, flights: Dict[str, Any], key: str) -> Any:
+        flight = flights.get(key)
+        # A flight left behind by another (closed) event loop is unusable
+        if flight is not None and flight.loop is asyncio.get_running_loop():
+            return flight
+        return None
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """Await ``func()``, or the call already in flight for ``key``."""
+        flight = self._current(self._flights, key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(func()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(
+                lambda _: self._forget(self._flights, key, flight)
+            )
+            self.stats["calls"] += 1
+        else:
+            self.stats["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            return cast(T, await asyncio.shield(flight.task))
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                self.stats["cancelled"] += 1
+
+    async def stream(
+        self, key: str, func: Callable[[], AsyncIterator[T]]
+    ) -> AsyncIterator[T]:
+        """Iterate ``func()``, or join the stream in flight for ``key``.
+
+        A subscriber joining late first gets the items already produced,
+        so every subscriber sees the whole stream.
+        """
+        flight = self._current(self._streams, key)
+        if flight is None:
+            flight = _StreamFlight()
+            self._streams[key] = flight
+            flight.task = asyncio.create_task(self._pump(key, flight, func))
+            self.stats["calls"] += 1
+        else:
+            self.stats["coalesced"] += 1
+
+        queue: "asyncio.Queue[Any]" = asyncio.Queue()
+        for item in flight.tokens:
+            queue.put_nowait(item)
+        flight.queues.append(queue)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, _Failed):
+                    raise item.error
+                yield item
+        finally:
+            flight.queues.remove(queue)
+            task = flight.task
+            if not flight.queues and task is not None and not task.done():
+                task.cancel()
+                self.stats["cancelled"] += 1
+
+    async def _pump(self, key: str, flight: _StreamFlight,
+                    func: Callable[[], AsyncIterator[Any]]) -> None:
+        """Copy the upstream items to every subscriber queue."""
+        try:
+            async for item in func():
+                flight.tokens.append(item)
+                for queue in flight.queues:
+                    queue.put_nowait(item)
+            end: Any = _END
+        except asyncio.CancelledError:
+            self._forget(self._streams, key, flight)
+            raise
+        except Exception as e:
+            end = _Failed(e)
+        # Late subscribers must not join a finished stream
+        self._forget(self._streams, key, flight)
+        for queue in flight.queues:
+            queue.put_nowait(end)
+
+    def _forget(self, flights: Dict[str, Any], key: str,
+                flight: Any) -> None:
+        if flights.get(key) is flight:
+            del flights[key]
+
+    def __len__(self) -> int:
+        return len(self._flights) + len(self._streams)
@@ -0,0 +1,64 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, TextIO, Union
+
+
+def fsync_directory(path: Union[str, Path]) -> None:
+    """Persist a rename or file creation in ``path``."""
+    if os.name == "nt":  # pragma: no cover - directories cannot be opened
+        return
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: Union[str, Path],
+                 write: Callable[[TextIO], None]) -> None:
+    """Write a text file so that readers see the old or new file, never both.
+
+    The content goes to a temporary file in the same directory, which is
+    fsync'ed and renamed over ``path``.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=str(path.parent),
+                                    prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+    fsync_directory(path.parent)
+
+
+def truncate_torn_tail(path: Union[str, Path], chunk_size: int = 4096) -> int:
+    """Cut a line-oriented file back to its last complete line.
+
+    A crash mid-append can leave a final line without its newline;
+    appending after it would bury the torn line mid-file. Returns the
+    number of bytes removed.
+    """
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - chunk_size)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
+        return size - end
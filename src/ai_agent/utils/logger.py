@@ -1,13 +1,183 @@
+import atexit
+import json
 import logging
-from typing import Optional
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Set, TextIO
 from rich.logging import RichHandler
 from rich.console import Console
 
+LOG_FORMATS = ("rich", "json")
+
+# Attributes every LogRecord has; anything else was passed as ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord(
+    "", logging.INFO, "", 0, "", None, None
+))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects.
+
+    Fields passed with ``extra=`` are included next to the timestamp,
+    level, logger name and message.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Render a record as JSON."""
+        entry: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DebugSampler(logging.Filter):
+    """Lets through a fraction ``rate`` of DEBUG records.
+
+    Sampling is deterministic (every ``1 / rate``-th record), so a rate
+    of 0.1 keeps exactly one debug record in ten. Other levels pass.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError("Debug sample rate must be between 0 and 1")
+        self.rate = rate
+        self._credit = 0.0
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Whether to emit the record."""
+        if record.levelno > logging.DEBUG:
+            return True
+        with self._lock:
+            self._credit += self.rate
+            if self._credit >= 1.0:
+                self._credit -= 1.0
+                return True
+            return False
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queues records without formatting them in the logging thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge the arguments, so mutable ones cannot change before
+        # the listener runs; the formatter's work happens over there
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info
+            )
+            record.exc_info = None
+        return record
+
+
+class _LoggingConfig:
+    """Process-wide output of the loggers made by ``setup_logger``."""
+
+    def __init__(self) -> None:
+        self.log_format = "rich"
+        self.debug_sample_rate = 1.0
+        # Shared, so the rate applies to debug records of all loggers
+        self.sampler: Optional[DebugSampler] = None
+        self.loggers: Set[str] = set()
+        self.queue: Optional["queue.SimpleQueue[Any]"] = None
+        self.listener: Optional[QueueListener] = None
+        self.lock = threading.RLock()
+
+    def start_listener(self, stream: Optional[TextIO]) -> None:
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(JsonFormatter())
+        self.queue = queue.SimpleQueue()
+        self.listener = QueueListener(self.queue, handler)
+        self.listener.start()
+
+    def stop_listener(self) -> None:
+        """Write out every queued record and stop the listener thread."""
+        if self.listener is not None:
+            self.listener.stop()
+        self.listener = None
+        self.queue = None
+
+    def handler(self, console: Optional[Console]) -> logging.Handler:
+        handler: logging.Handler
+        if self.queue is not None and console is None:
+            handler = _DeferredQueueHandler(self.queue)
+        else:
+            handler = RichHandler(
+                console=console or Console(),
+                show_time=True,
+                show_path=False,
+                rich_tracebacks=True,
+            )
+            handler.setFormatter(
+                logging.Formatter(fmt="%(message)s", datefmt="[%X]")
+            )
+        if self.sampler is not None:
+            handler.addFilter(self.sampler)
+        return handler
+
+
+_config = _LoggingConfig()
+atexit.register(_config.stop_listener)
+
+
+def configure_logging(log_format: str = "rich",
+                      debug_sample_rate: float = 1.0,
+                      stream: Optional[TextIO] = None) -> None:
+    """Choose how every logger made by ``setup_logger`` writes records.
+
+    ``"rich"`` writes formatted records to the console as they are
+    logged. ``"json"`` puts them on a queue that a background thread
+    writes to ``stream`` (stderr by default) as JSON lines, so logging
+    never waits for terminal or disk I/O. Only a fraction
+    ``debug_sample_rate`` of DEBUG records is kept.
+    """
+    log_format = log_format.lower()
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"Unknown log format: {log_format}")
+    sampler = (DebugSampler(debug_sample_rate)
+               if debug_sample_rate != 1.0 else None)
+
+    with _config.lock:
+        unchanged = (log_format == _config.log_format
+                     and debug_sample_rate == _config.debug_sample_rate
+                     and stream is None)
+        if unchanged:
+            return
+        _config.stop_listener()
+        _config.log_format = log_format
+        _config.debug_sample_rate = debug_sample_rate
+        _config.sampler = sampler
+        if log_format == "json":
+            _config.start_listener(stream)
+        for name in _config.loggers:
+            logger = logging.getLogger(name)
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+            logger.addHandler(_config.handler(None))
+
 
 def setup_logger(
     name: str, level: str = "INFO", console: Optional[Console] = None
 ) -> logging.Logger:
-    """Setup a rich logger."""
+    """Setup a logger writing as chosen by ``configure_logging``."""
 
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, level.upper()))
@@ -16,19 +186,10 @@ def setup_logger(
     if logger.handlers:
         return logger
 
-    # Create rich handler
-    handler = RichHandler(
-        console=console or Console(),
-        show_time=True,
-        show_path=False,
-        rich_tracebacks=True,
-    )
-
-    # Set format
-    formatter = logging.Formatter(fmt="%(message)s", datefmt="[%X]")
-    handler.setFormatter(formatter)
-
-    logger.addHandler(handler)
+    with _config.lock:
+        logger.addHandler(_config.handler(console))
+        if console is None:
+            _config.loggers.add(name)
     logger.propagate = False
 
     return logger
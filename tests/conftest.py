@@ -3,6 +3,15 @@ from unittest.mock import Mock
 from src.ai_agent.core.config import Settings
 from src.ai_agent.core.agent import AIAgent
 from src.ai_agent.providers.openai_provider import OpenAIProvider
+from src.ai_agent.providers.client_registry import client_registry
+from src.ai_agent.providers.rate_limiter import clear_rate_limiters
+from src.ai_agent.providers.response_cache import (
+    clear_shared_cache_backends
+)
+from src.ai_agent.providers.router_provider import clear_routers
+from src.ai_agent.providers.semantic_cache import clear_semantic_caches
+from src.ai_agent.providers.validation_cache import clear_validation_caches
+from src.ai_agent.telemetry.instrumentation import clear_telemetry
 
 
 @pytest.fixture
@@ -32,3 +41,47 @@ def mock_openai_provider():
 def agent_with_mock_provider(mock_settings, mock_openai_provider):
     """AI Agent with mocked provider."""
     return AIAgent(settings=mock_settings, provider=mock_openai_provider)
+
+
+@pytest.fixture(autouse=True)
+def reset_validation_caches():
+    """Keep cached provider validations from leaking between tests."""
+    clear_validation_caches()
+    yield
+    clear_validation_caches()
+
+
+@pytest.fixture(autouse=True)
+def reset_client_registry():
+    """Keep shared (possibly mocked) clients from leaking between tests."""
+    client_registry.clear()
+    yield
+    client_registry.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_response_caches():
+    """Keep cached responses from leaking between tests."""
+    clear_shared_cache_backends()
+    clear_semantic_caches()
+    yield
+    clear_shared_cache_backends()
+    clear_semantic_caches()
+
+
+@pytest.fixture(autouse=True)
+def reset_routers():
+    """Keep shared routers and rate limiters from leaking between tests."""
+    clear_routers()
+    clear_rate_limiters()
+    yield
+    clear_routers()
+    clear_rate_limiters()
+
+
+@pytest.fixture(autouse=True)
+def reset_telemetry():
+    """Start every test with empty metrics."""
+    clear_telemetry()
+    yield
+    clear_telemetry()
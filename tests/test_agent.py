@@ -1,9 +1,26 @@
+import asyncio
+
 import pytest
 from unittest.mock import AsyncMock
 
 from src.ai_agent.core.agent import AIAgent
-from src.ai_agent.core.exceptions import ValidationException, AIAgentException
-from src.ai_agent.providers.base_provider import Message, ChatResponse
+from src.ai_agent.core.context import (
+    ContextWindow, Tokenizer, get_context_length, get_tokenizer
+)
+from src.ai_agent.core.stats import LatencyHistogram
+from src.ai_agent.core.history import (
+    ConversationHistory, decode_timestamp, encode_timestamp
+)
+from src.ai_agent.core.exceptions import (
+    ValidationException, AIAgentException, APIException,
+    ConfigurationException
+)
+from src.ai_agent.core.config import Settings
+from src.ai_agent.providers.base_provider import (
+    Message, ChatResponse, token_counts
+)
+from src.ai_agent.providers.client_registry import client_registry
+from benchmarks.mock_server import MockOpenAIServer
 
 
 class TestAIAgent:
@@ -17,6 +34,49 @@ class TestAIAgent:
         assert len(agent.conversation_history) == 0
         assert agent.system_prompt is not None
 
+    @pytest.mark.asyncio
+    async def test_lazy_validation_on_first_chat(self, mock_settings,
+                                                 mock_openai_provider):
+        """Test that validation is deferred until the first chat."""
+        mock_openai_provider.chat = AsyncMock(return_value=ChatResponse(
+            content="Hi!", model="gpt-3.5-turbo"
+        ))
+        agent = AIAgent(settings=mock_settings, provider=mock_openai_provider)
+
+        mock_openai_provider.validate_config.assert_not_called()
+        mock_openai_provider.avalidate_config.assert_not_called()
+
+        await agent.chat("Hello")
+        await agent.chat("Hello again")
+
+        mock_openai_provider.avalidate_config.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_lazy_validation_failure_raises(self, mock_settings,
+                                                  mock_openai_provider):
+        """Test that an invalid provider fails the first chat."""
+        mock_openai_provider.avalidate_config.return_value = False
+        agent = AIAgent(settings=mock_settings, provider=mock_openai_provider)
+
+        with pytest.raises(AIAgentException):
+            await agent.chat("Hello")
+        assert len(agent.conversation_history) == 0
+
+    def test_eager_and_skip_validation(self, mock_settings,
+                                       mock_openai_provider):
+        """Test eager validation runs at construction and skip never."""
+        mock_settings.provider_validation = "skip"
+        AIAgent(settings=mock_settings, provider=mock_openai_provider)
+        mock_openai_provider.validate_config.assert_not_called()
+
+        mock_settings.provider_validation = "eager"
+        AIAgent(settings=mock_settings, provider=mock_openai_provider)
+        mock_openai_provider.validate_config.assert_called_once()
+
+        mock_settings.provider_validation = "sometimes"
+        with pytest.raises(ConfigurationException):
+            AIAgent(settings=mock_settings, provider=mock_openai_provider)
+
     def test_set_system_prompt(self, agent_with_mock_provider):
         """Test setting system prompt."""
         new_prompt = "You are a test assistant."
@@ -56,6 +116,90 @@ class TestAIAgent:
         assert (agent_with_mock_provider.conversation_history[1]
                 .role == "assistant")
 
+    @pytest.mark.asyncio
+    async def test_chat_stream(self, agent_with_mock_provider):
+        """Test streaming chat records the assembled reply."""
+        async def fake_stream(messages, **kwargs):
+            for token in ["Hello", "! ", "How can I help?"]:
+                yield token
+
+        agent_with_mock_provider.provider.stream = fake_stream
+        ttfts = []
+
+        tokens = [
+            token async for token in agent_with_mock_provider.chat_stream(
+                "Hello", on_first_token=ttfts.append
+            )
+        ]
+
+        assert "".join(tokens) == "Hello! How can I help?"
+        assert len(ttfts) == 1 and ttfts[0] >= 0
+        history = agent_with_mock_provider.conversation_history
+        assert [m.role for m in history] == ["user", "assistant"]
+        assert history[1].content == "Hello! How can I help?"
+
+    @pytest.mark.asyncio
+    async def test_chat_respects_token_budget(self, mock_settings,
+                                              mock_openai_provider):
+        """Test that the prompt is trimmed to the token budget."""
+        mock_settings.context_token_budget = 200
+        agent = AIAgent(settings=mock_settings, provider=mock_openai_provider)
+        agent.conversation_history = [
+            Message(role="user", content="x" * 1000),
+            Message(role="assistant", content="short"),
+        ]
+        mock_openai_provider.chat = AsyncMock(return_value=ChatResponse(
+            content="Hi!", model="gpt-3.5-turbo"
+        ))
+
+        await agent.chat("Hello")
+
+        sent = mock_openai_provider.chat.call_args.kwargs["messages"]
+        assert [m.role for m in sent] == ["system", "assistant", "user"]
+        assert sum(agent.tokenizer.count_message(m) for m in sent) <= 200
+
+    @pytest.mark.asyncio
+    async def test_response_cache_shared_between_agents(
+            self, mock_settings, mock_openai_provider):
+        """Test identical deterministic prompts are served from cache."""
+        mock_settings.response_cache = "memory"
+        mock_settings.openai_temperature = 0
+        mock_openai_provider.chat = AsyncMock(return_value=ChatResponse(
+            content="Cached!", model="gpt-3.5-turbo"
+        ))
+
+        first = AIAgent(settings=mock_settings, provider=mock_openai_provider)
+        second = AIAgent(settings=mock_settings,
+                         provider=mock_openai_provider)
+
+        assert await first.chat("Hello") == "Cached!"
+        assert await second.chat("Hello") == "Cached!"
+        mock_openai_provider.chat.assert_awaited_once()
+        assert second.provider.stats.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_chat_many(self, agent_with_mock_provider):
+        """Test batch answers come back in order with per-item errors."""
+        async def fake_chat(messages, **kwargs):
+            prompt = messages[-1].content
+            if prompt == "boom":
+                raise APIException("Upstream failed")
+            await asyncio.sleep(0.01 * len(prompt))
+            return ChatResponse(content=prompt.upper(), model="gpt-3.5-turbo")
+
+        agent_with_mock_provider.provider.chat = fake_chat
+
+        results = await agent_with_mock_provider.chat_many(
+            ["long prompt", "boom", "", "hi"], concurrency=2
+        )
+
+        assert [r.index for r in results] == [0, 1, 2, 3]
+        assert results[0].response.content == "LONG PROMPT"
+        assert results[3].response.content == "HI"
+        assert not results[1].ok and "Upstream failed" in results[1].error
+        assert "ValidationException" in results[2].error
+        assert agent_with_mock_provider.conversation_history == []
+
     @pytest.mark.asyncio
     async def test_chat_empty_message_raises_error(self,
                                                    agent_with_mock_provider):
@@ -157,3 +301,295 @@ class TestAIAgent:
         """Test loading nonexistent file raises error."""
         with pytest.raises(AIAgentException):
             agent_with_mock_provider.load_conversation("nonexistent.json")
+
+
+class TestContextWindow:
+
+    def test_get_context_length(self):
+        """Test model context lengths match on the longest prefix."""
+        assert get_context_length("gpt-4") == 8192
+        assert get_context_length("gpt-4-turbo-preview") == 128000
+        assert get_context_length("unknown-model") == 4096
+
+    def test_token_counts_are_cached_on_messages(self):
+        """Test that each message is tokenized once per tokenizer."""
+        tokenizer = Tokenizer("gpt-3.5-turbo")
+        message = Message(role="user", content="Hello there")
+
+        first = tokenizer.count_message(message)
+        message.content = "changed after counting"
+
+        assert tokenizer.count_message(message) == first
+        assert "_token_counts" not in message.model_dump()
+
+    def test_token_counts_do_not_affect_equality(self):
+        """Test a counted message still equals an identical one."""
+        message = Message(role="user", content="hi")
+        get_tokenizer("gpt-4").count_message(message)
+
+        assert message == Message(role="user", content="hi")
+
+    def test_window_slides_incrementally(self):
+        """Test the running total follows appends and evictions."""
+        tokenizer = Tokenizer("gpt-3.5-turbo")
+        window = ContextWindow(tokenizer)
+        history = [Message(role="user", content="a" * 40)]
+        cost = tokenizer.count_message(history[0])
+
+        assert window.select(history, budget=cost * 2) == history
+
+        for _ in range(4):
+            history.append(Message(role="user", content="a" * 40))
+            selected = window.select(history, budget=cost * 2)
+            assert selected == history[-2:]
+            assert window.total_tokens == cost * 2
+
+    def test_window_limits_and_resets(self):
+        """Test message caps, oversized messages and history resets."""
+        tokenizer = Tokenizer("gpt-3.5-turbo")
+        window = ContextWindow(tokenizer, max_messages=2)
+        history = [Message(role="user", content=str(i)) for i in range(5)]
+
+        assert window.select(history, budget=10_000) == history[-2:]
+        assert window.select(history, budget=1) == history[-1:]
+
+        # A larger budget or a new history list recounts from scratch
+        assert window.select(history, budget=10_000) == history[-2:]
+        replaced = history[:3]
+        assert window.select(replaced, budget=10_000) == replaced[-2:]
+
+    def test_chunked_window_keeps_prefix_stable(self):
+        """Test the window start only moves in aligned chunks."""
+        tokenizer = Tokenizer("gpt-3.5-turbo")
+        window = ContextWindow(tokenizer, max_messages=4, chunk=2)
+        history = []
+        starts = []
+        for i in range(9):
+            history.append(Message(role="user", content=str(i)))
+            selected = window.select(history, budget=10_000)
+            starts.append(int(selected[0].content))
+
+        assert starts == [0, 0, 0, 0, 2, 2, 4, 4, 6]
+        assert ContextWindow(tokenizer, max_messages=4, chunk=2).select(
+            history, budget=10_000
+        ) == history[6:]
+
+    @pytest.mark.asyncio
+    async def test_stable_prefix_raises_prompt_cache_hits(self):
+        """Test chunked windows get more cached tokens than sliding."""
+        hit_rates = []
+        with MockOpenAIServer(latency=0) as server:
+            for chunk in (None, 6):
+                settings = Settings(
+                    OPENAI_API_KEY="test-key",
+                    OPENAI_BASE_URL=server.base_url,
+                    PROVIDER_VALIDATION="skip",
+                    CONVERSATION_HISTORY_LIMIT=6,
+                    CONTEXT_WINDOW_CHUNK=chunk,
+                    LOG_LEVEL="CRITICAL",
+                )
+                agent = AIAgent(settings=settings)
+                # A different prefix per run keeps their caches apart
+                agent.pin_message(f"Always answer in English ({chunk}).")
+                for i in range(12):
+                    await agent.chat(f"Question number {i} of the chat")
+                hit_rates.append(agent.usage_stats.prompt_cache_hit_rate)
+            await client_registry.aclose()
+
+        sliding, stable = hit_rates
+        assert stable > sliding + 0.2
+        summary = agent.get_conversation_summary()
+        assert summary["cached_tokens"] > 0
+
+
+class TestConversationHistory:
+
+    def test_timestamps_round_trip(self):
+        """Test packed timestamps restore the original strings."""
+        for timestamp in ["2024-05-01T12:30:45.123456", "2024-05-01T12:30",
+                          "2024-05-01T12:30:45+02:00", "yesterday", None]:
+            assert decode_timestamp(encode_timestamp(timestamp)) == timestamp
+        assert isinstance(encode_timestamp("2024-05-01T12:30:45.000001"), int)
+
+    def test_old_messages_spill_to_disk(self, tmp_path):
+        """Test spilled messages are still readable in order."""
+        history = ConversationHistory(max_resident=4,
+                                      spill_dir=str(tmp_path))
+        messages = [
+            Message(role="user" if i % 2 == 0 else "assistant",
+                    content=f"message {i}",
+                    timestamp=f"2024-05-01T12:00:{i:02d}")
+            for i in range(20)
+        ]
+        history.extend(messages)
+
+        assert len(history) == 20
+        assert history.spilled >= 20 - 4 - 4 // 4
+        assert len(list(tmp_path.iterdir())) == 1
+        assert list(history) == messages
+        assert history[3] == messages[3]
+        assert history[-1] == messages[-1]
+        assert history[2:18] == messages[2:18]
+        assert history.count_role("user") == 10
+
+        history.clear()
+        assert len(history) == 0
+        assert list(tmp_path.iterdir()) == []
+
+    def test_token_counts_survive_materialization(self):
+        """Test tokens counted on a returned message are kept."""
+        tokenizer = Tokenizer("gpt-3.5-turbo")
+        history = ConversationHistory([Message(role="user", content="hi")])
+        tokenizer.count_message(history[0])
+        assert token_counts(history[0]) == {
+            tokenizer.name: tokenizer.count_message(history[0])
+        }
+
+    def test_history_spilling_is_opt_in(self, mock_settings,
+                                        mock_openai_provider):
+        """Test the default history keeps every message in memory."""
+        settings = Settings(OPENAI_API_KEY="test-key")
+        assert settings.history_resident_messages is None
+        agent = AIAgent(settings=mock_settings, provider=mock_openai_provider)
+        assert agent.conversation_history.max_resident is None
+
+    @pytest.mark.asyncio
+    async def test_agent_history_is_bounded(self, mock_settings,
+                                            mock_openai_provider, tmp_path):
+        """Test a long conversation keeps a bounded in-memory tail."""
+        mock_settings.history_resident_messages = 8
+        mock_settings.history_spill_dir = str(tmp_path)
+        agent = AIAgent(settings=mock_settings, provider=mock_openai_provider)
+        mock_openai_provider.chat = AsyncMock(return_value=ChatResponse(
+            content="Hi!", model="gpt-3.5-turbo"
+        ))
+
+        for i in range(20):
+            await agent.chat(f"Hello {i}")
+
+        history = agent.conversation_history
+        assert history.spilled > 0
+        summary = agent.get_conversation_summary()
+        assert summary["total_messages"] == 40
+        assert summary["user_messages"] == 20
+        assert agent.get_recent_messages(2)[0]["content"] == "Hello 19"
+
+        filepath = tmp_path / "conversation.json"
+        agent.save_conversation(str(filepath))
+        agent.clear_history()
+        agent.load_conversation(str(filepath))
+        assert agent.conversation_history[0].content == "Hello 0"
+
+
+class TestConversationSummary:
+
+    @staticmethod
+    def _provider(mock_openai_provider):
+        """Answer summary requests and echo chat messages."""
+        async def chat(messages, **kwargs):
+            if messages[0].content.startswith("You keep a concise"):
+                return ChatResponse(content="They said 0 and 1.",
+                                    model="gpt-3.5-turbo")
+            return ChatResponse(content=f"Re: {messages[-1].content}",
+                                model="gpt-3.5-turbo")
+
+        mock_openai_provider.chat = AsyncMock(side_effect=chat)
+        return mock_openai_provider
+
+    @pytest.mark.asyncio
+    async def test_old_turns_are_summarized(self, mock_settings,
+                                            mock_openai_provider):
+        """Test turns beyond the kept window are replaced by a summary."""
+        mock_settings.conversation_summary = True
+        mock_settings.summary_keep_messages = 2
+        mock_settings.summary_batch_messages = 2
+        provider = self._provider(mock_openai_provider)
+        agent = AIAgent(settings=mock_settings, provider=provider)
+
+        for i in range(3):
+            await agent.chat(f"Message {i}")
+            await agent.wait_for_summary()
+
+        summary_request = provider.chat.call_args_list[2].kwargs["messages"]
+        assert "user: Message 0" in summary_request[1].content
+        assert agent.summarizer.covered == 4
+
+        await agent.chat("Message 3")
+        sent = provider.chat.call_args_list[-1].kwargs["messages"]
+        assert sent[1].content.endswith("They said 0 and 1.")
+        assert [m.content for m in sent[2:]] == [
+            "Message 2", "Re: Message 2", "Message 3"
+        ]
+        assert agent.get_conversation_summary()["summarized_messages"] == 4
+
+        agent.clear_history()
+        assert agent.summarizer.message is None
+
+    @pytest.mark.asyncio
+    async def test_failed_summary_keeps_history(self, mock_settings,
+                                                mock_openai_provider):
+        """Test a failed update leaves the turns to be sent verbatim."""
+        mock_settings.conversation_summary = True
+        mock_settings.summary_keep_messages = 1
+        mock_settings.summary_batch_messages = 1
+        mock_openai_provider.chat = AsyncMock(side_effect=[
+            ChatResponse(content="Hi!", model="gpt-3.5-turbo"),
+            APIException("boom"),
+            ChatResponse(content="Hi again!", model="gpt-3.5-turbo"),
+        ])
+        agent = AIAgent(settings=mock_settings,
+                        provider=mock_openai_provider)
+
+        await agent.chat("Hello")
+        await agent.wait_for_summary()
+        await agent.chat("Again")
+
+        sent = mock_openai_provider.chat.call_args_list[-1].kwargs["messages"]
+        assert len(sent) == 4
+        assert agent.summarizer.stats["failures"] == 1
+
+
+class TestUsageStats:
+
+    def test_histogram_percentiles(self):
+        """Test percentiles stay within one bucket of the exact value."""
+        histogram = LatencyHistogram()
+        assert histogram.percentile(0.5) is None
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+
+        assert histogram.count == 1000
+        assert histogram.mean == pytest.approx(0.5005)
+        for fraction in (0.5, 0.9, 0.99):
+            assert fraction <= histogram.percentile(fraction) \
+                <= fraction * histogram.growth
+        assert histogram.percentile(1.0) == 1.0
+
+    @pytest.mark.asyncio
+    async def test_summary_includes_usage(self, agent_with_mock_provider):
+        """Test token totals and latencies are accumulated per request."""
+        agent = agent_with_mock_provider
+        agent.provider.chat = AsyncMock(return_value=ChatResponse(
+            content="Hi!", model="gpt-3.5-turbo",
+            usage={"prompt_tokens": 10, "completion_tokens": 5,
+                   "total_tokens": 15},
+        ))
+        await agent.chat("Hello")
+        await agent.chat("Again")
+        agent.provider.chat = AsyncMock(side_effect=APIException("boom"))
+        with pytest.raises(APIException):
+            await agent.chat("Fail")
+
+        summary = agent.get_conversation_summary()
+        assert summary["messages_by_role"] == {"user": 3, "assistant": 2}
+        assert summary["requests"] == 3
+        assert summary["failed_requests"] == 1
+        assert summary["prompt_tokens"] == 20
+        assert summary["total_tokens"] == 30
+        assert summary["latency_p50"] is not None
+
+        # Clearing the history keeps the usage totals
+        agent.clear_history()
+        summary = agent.get_conversation_summary()
+        assert summary["total_messages"] == 0
+        assert summary["total_tokens"] == 30
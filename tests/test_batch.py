@@ -0,0 +1,226 @@
+import json
+import multiprocessing
+
+import pytest
+
+from benchmarks.mock_server import MockOpenAIServer
+from src.ai_agent.batch.runner import (
+    BatchProgress, ShardJob, iter_prompts, request_key, run_batch,
+    run_shard
+)
+from src.ai_agent.core.agent import AIAgent
+from src.ai_agent.core.config import Settings
+from src.ai_agent.core.exceptions import AIAgentException
+from src.ai_agent.providers.rate_limiter import SharedTokenBucket
+
+
+def _write_prompts(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"request_id": f"r{i}",
+                                "body": f"Prompt {i}"}) + "\n")
+            if i == 2:
+                f.write("\n")
+
+
+def _settings(server):
+    return {"OPENAI_API_KEY": "test-key",
+            "OPENAI_BASE_URL": server.base_url,
+            "PROVIDER_VALIDATION": "skip"}
+
+
+def _consume(bucket, amount):
+    bucket.consume(amount)
+
+
+class TestRunBatch:
+
+    def test_iter_prompts_shards(self, tmp_path):
+        """Test shards partition the prompts by non-empty line index."""
+        path = tmp_path / "in.jsonl"
+        _write_prompts(path, 5)
+
+        shards = [list(iter_prompts(str(path), "body", "request_id",
+                                    shard, 2)) for shard in range(2)]
+
+        assert [index for index, _, _ in shards[0]] == [0, 2, 4]
+        assert shards[1][0] == (1, "r1", "Prompt 1")
+
+    def test_workers_share_budget_and_merge_in_order(self, tmp_path):
+        """Test worker output is merged in input order."""
+        source = tmp_path / "in.jsonl"
+        output = tmp_path / "out.jsonl"
+        _write_prompts(source, 7)
+        progress = []
+
+        with MockOpenAIServer(latency=0.001) as server:
+            summary = run_batch(
+                str(source), str(output), workers=2, concurrency=2,
+                prompt_field="body", id_field="request_id",
+                settings=_settings(server), requests_per_minute=6000,
+                on_progress=lambda p: progress.append(p.as_dict()),
+            )
+            requests = server.request_count
+
+        lines = [json.loads(line) for line in
+                 output.read_text().splitlines()]
+        assert [line["id"] for line in lines] == [f"r{i}" for i in range(7)]
+        assert [line["index"] for line in lines] == list(range(7))
+        assert all(line["response"] for line in lines)
+        assert summary == {"succeeded": 7, "failed": 0, "skipped": 0,
+                           "retried": 0, "written": 7}
+        assert requests == 7
+        assert progress and progress[-1]["completed"] == 7
+        assert not (tmp_path / "out.jsonl.parts").exists()
+
+    def test_interrupted_run_resumes(self, tmp_path):
+        """Test checkpointed results are kept and a torn line redone."""
+        source = tmp_path / "in.jsonl"
+        output = tmp_path / "out.jsonl"
+        parts = tmp_path / "out.jsonl.parts"
+        _write_prompts(source, 6)
+        parts.mkdir()
+
+        with MockOpenAIServer(latency=0) as server:
+            # A first run answered shard 0, then died mid-write
+            run_shard(ShardJob(
+                input_file=str(source),
+                shard_file=str(parts / "shard-0000.jsonl"),
+                shard=0, shards=2, prompt_field="body",
+                id_field="request_id", settings=_settings(server),
+            ))
+            with open(parts / "shard-0001.jsonl", "w") as f:
+                f.write('{"id": "r1", "index": 1, "resp')
+
+            summary = run_batch(
+                str(source), str(output), workers=2,
+                prompt_field="body", id_field="request_id",
+                settings=_settings(server),
+            )
+            requests = server.request_count
+
+        assert requests == 6
+        assert summary["skipped"] == 3
+        assert summary["succeeded"] == 3
+        assert [json.loads(line)["index"] for line in
+                output.read_text().splitlines()] == list(range(6))
+
+    def test_failed_prompts_are_retried_by_next_run(self, tmp_path):
+        """Test a run with failures keeps its checkpoint for a rerun."""
+        source = tmp_path / "in.jsonl"
+        output = tmp_path / "out.jsonl"
+        _write_prompts(source, 6)
+
+        with MockOpenAIServer(latency=0) as server:
+            settings = {**_settings(server), "RETRY_MAX_ATTEMPTS": 1}
+            server.fail_next(3, status=429)
+            first = run_batch(str(source), str(output), workers=1,
+                              concurrency=1, prompt_field="body",
+                              id_field="request_id", settings=settings)
+            assert (tmp_path / "out.jsonl.parts").exists()
+
+            sent = server.request_count
+            second = run_batch(str(source), str(output), workers=1,
+                               prompt_field="body", id_field="request_id",
+                               settings=settings)
+            resent = server.request_count - sent
+
+        assert first["failed"] == 3
+        assert resent == 3
+        assert second == {"succeeded": 3, "failed": 0, "skipped": 3,
+                          "retried": 3, "written": 6}
+        lines = [json.loads(line) for line in
+                 output.read_text().splitlines()]
+        assert all("response" in line for line in lines)
+        assert not (tmp_path / "out.jsonl.parts").exists()
+
+    def test_resume_rejects_changed_options(self, tmp_path):
+        """Test a run cannot resume with a different worker count."""
+        source = tmp_path / "in.jsonl"
+        _write_prompts(source, 2)
+        parts = tmp_path / "out.jsonl.parts"
+        parts.mkdir()
+        (parts / "manifest.json").write_text('{"workers": 3}')
+
+        with pytest.raises(AIAgentException):
+            run_batch(str(source), str(tmp_path / "out.jsonl"), workers=2)
+
+    def test_shared_bucket_spans_processes(self):
+        """Test tokens consumed by a child are gone for the parent."""
+        context = multiprocessing.get_context("spawn")
+        bucket = SharedTokenBucket(60, context=context)
+        child = context.Process(target=_consume, args=(bucket, 10))
+        child.start()
+        child.join()
+
+        assert child.exitcode == 0
+        assert bucket.level < 1
+
+    def test_request_key_is_deterministic(self):
+        """Test keys depend on the input and the request options."""
+        agent = AIAgent(settings=Settings(OPENAI_API_KEY="test-key"))
+        key = request_key(agent, "r1", "Prompt")
+
+        assert request_key(agent, "r1", " Prompt ") == key
+        assert request_key(agent, "r2", "Prompt") != key
+        agent.settings.openai_temperature = 0.1
+        assert request_key(agent, "r1", "Prompt") != key
+
+    def test_resume_retries_only_failed_and_changed(self, tmp_path):
+        """Test answers for the same request key are not paid twice."""
+        source = tmp_path / "in.jsonl"
+        output = tmp_path / "out.jsonl"
+        parts = tmp_path / "out.jsonl.parts"
+        _write_prompts(source, 5)
+        parts.mkdir()
+
+        with MockOpenAIServer(latency=0) as server:
+            agent = AIAgent(settings=Settings(**_settings(server)))
+            keys = [request_key(agent, f"r{i}", f"Prompt {i}")
+                    for i in range(5)]
+            # The previous run answered 0 and 3, failed 1, answered 2
+            # for another request and died mid-write
+            records = [
+                {"id": "r0", "index": 0, "key": keys[0],
+                 "response": "Earlier 0", "usage": {}},
+                {"id": "r1", "index": 1, "key": keys[1],
+                 "error": "RateLimitError: quota"},
+                {"id": "r2", "index": 2, "key": "stale",
+                 "response": "Stale", "usage": {}},
+                {"id": "r3", "index": 3, "key": keys[3],
+                 "response": "Earlier 3", "usage": {}},
+            ]
+            with open(parts / "shard-0000.jsonl", "w") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+                f.write('{"id": "r4", "ind')
+
+            summary = run_batch(
+                str(source), str(output), workers=1,
+                prompt_field="body", id_field="request_id",
+                settings=_settings(server),
+            )
+            requests = server.request_count
+
+        lines = [json.loads(line) for line in
+                 output.read_text().splitlines()]
+        assert requests == 3
+        assert summary == {"succeeded": 3, "failed": 0, "skipped": 2,
+                           "retried": 2, "written": 5}
+        assert [line["index"] for line in lines] == list(range(5))
+        assert [line["key"] for line in lines] == keys
+        assert lines[0]["response"] == "Earlier 0"
+        assert lines[2]["response"] != "Stale"
+        assert all("error" not in line for line in lines)
+
+    def test_progress_eta(self, monkeypatch):
+        """Test throughput and ETA count only this run's answers."""
+        progress = BatchProgress(total=10)
+        progress.skipped = 4
+        assert progress.eta is None
+
+        progress.answered = 2
+        monkeypatch.setattr(BatchProgress, "elapsed", 4.0)
+        assert progress.remaining == 4
+        assert progress.throughput == 0.5
+        assert progress.eta == 8.0
@@ -0,0 +1,74 @@
+import json
+import time
+
+import pytest
+
+from benchmarks.mock_server import MockOpenAIServer
+from benchmarks.suite import compare, main
+from src.ai_agent.core.exceptions import TransientAPIException
+from src.ai_agent.providers.base_provider import Message
+from src.ai_agent.providers.openai_provider import OpenAIProvider
+
+
+class TestMockServer:
+
+    @pytest.mark.asyncio
+    async def test_streams_server_sent_events(self):
+        """Test the OpenAI client streams tokens and usage over SSE."""
+        with MockOpenAIServer(latency=0, token_delay=0.001) as server:
+            provider = OpenAIProvider(api_key="test-key",
+                                      base_url=server.base_url)
+            messages = [Message(role="user", content="Hi")]
+            tokens = [token async for token in provider.stream(messages)]
+            response = await provider.chat(messages)
+
+        assert "".join(tokens) == server.reply
+        assert len(tokens) == len(server.reply.split())
+        assert response.content == server.reply
+
+    @pytest.mark.asyncio
+    async def test_error_rate_and_jitter(self):
+        """Test injected errors and latency follow the configuration."""
+        with MockOpenAIServer(latency=0.01, jitter=0.005, error_rate=1.0,
+                              error_status=503, seed=1) as server:
+            provider = OpenAIProvider(api_key="test-key",
+                                      base_url=server.base_url)
+            start = time.perf_counter()
+            with pytest.raises(TransientAPIException):
+                await provider.chat([Message(role="user", content="Hi")])
+            elapsed = time.perf_counter() - start
+
+            delays = [server.delay() for _ in range(100)]
+
+        assert server.error_count == server.request_count >= 1
+        assert elapsed >= 0.005 * server.request_count
+        assert all(0.005 <= delay <= 0.015 for delay in delays)
+        assert len(set(delays)) > 1
+
+
+class TestBenchmarkSuite:
+
+    def test_results_are_written_and_compared(self, tmp_path):
+        """Test a small run writes JSON results and flags regressions."""
+        output = tmp_path / "bench.json"
+        args = ["--output", str(output), "--latency", "0",
+                "--jitter", "0", "--token-delay", "0", "--sessions", "2",
+                "--requests", "2", "--memory-sessions", "2",
+                "--memory-turns", "1", "--skip-startup"]
+
+        assert main(args) == 0
+        results = json.loads(output.read_text())
+        metrics = results["metrics"]
+        assert metrics["chat_throughput_rps"] > 0
+        assert metrics["chat_error_rate"] == 0
+        assert metrics["memory_per_session_kb"] > 0
+        assert results["config"]["sessions"] == 2
+
+        baseline = {"metrics": dict(
+            metrics,
+            chat_throughput_rps=metrics["chat_throughput_rps"] * 2,
+            chat_latency_p99_ms=metrics["chat_latency_p99_ms"] * 2,
+        )}
+        lines, regressed = compare(results, baseline, 0.1)
+        assert regressed == ["chat_throughput_rps"]
+        assert len(lines) == len(metrics)
@@ -0,0 +1,36 @@
+import subprocess
+import sys
+
+from benchmarks.bench_startup import import_profile
+
+# Modules only the commands talking to a provider need
+HEAVY_MODULES = ["openai", "pydantic_settings", "src.ai_agent.core.agent"]
+
+# Generous, so that slow CI machines pass; loading the agent takes longer
+CLI_IMPORT_BUDGET = 0.5
+
+
+class TestStartup:
+
+    def test_cli_import_budget(self):
+        """Test importing the CLI defers the agent and provider stack."""
+        profile = import_profile("src.ai_agent.cli.main")
+
+        assert not [name for name in HEAVY_MODULES if name in profile]
+        assert profile["src.ai_agent.cli.main"] < CLI_IMPORT_BUDGET
+
+    def test_load_command_imports(self):
+        """Test reading conversation files does not load the agent."""
+        profile = import_profile("src.ai_agent.storage.conversation_log")
+
+        assert not [name for name in HEAVY_MODULES if name in profile]
+
+    def test_package_exports_are_lazy(self):
+        """Test top-level exports are imported on first access."""
+        code = (
+            "import sys, src\n"
+            "assert 'src.ai_agent.core.agent' not in sys.modules\n"
+            "assert src.AIAgent.__name__ == 'AIAgent'\n"
+            "assert 'src.ai_agent.core.agent' in sys.modules\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
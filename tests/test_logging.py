@@ -0,0 +1,96 @@
+import io
+import json
+import logging
+from logging.handlers import QueueHandler
+
+import pytest
+
+from src.ai_agent.core.agent import AIAgent
+from src.ai_agent.core.config import Settings
+from src.ai_agent.core.exceptions import ConfigurationException
+from src.ai_agent.utils.logger import (
+    DebugSampler, JsonFormatter, configure_logging, setup_logger
+)
+
+
+@pytest.fixture
+def json_logs():
+    """Queued JSON logging into a buffer, restored to rich afterwards."""
+    stream = io.StringIO()
+    configure_logging("json", stream=stream)
+    yield stream
+    configure_logging("rich")
+
+
+def _lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+class TestLogging:
+
+    def test_json_formatter_includes_extra_fields(self):
+        """Test records become one JSON object with their extras."""
+        record = logging.LogRecord("test", logging.WARNING, __file__, 1,
+                                   "Retry %s of %s", (1, 3), None)
+        record.request_id = "abc"
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["level"] == "WARNING"
+        assert entry["logger"] == "test"
+        assert entry["message"] == "Retry 1 of 3"
+        assert entry["request_id"] == "abc"
+        assert entry["time"].endswith("+00:00")
+
+    def test_debug_sampler_keeps_a_fraction(self):
+        """Test debug records are sampled and other levels pass."""
+        sampler = DebugSampler(0.25)
+
+        def record(level):
+            return logging.LogRecord("test", level, __file__, 1, "m",
+                                     None, None)
+
+        kept = [sampler.filter(record(logging.DEBUG)) for _ in range(100)]
+        assert sum(kept) == 25
+        assert sampler.filter(record(logging.INFO))
+        with pytest.raises(ValueError):
+            DebugSampler(1.5)
+
+    def test_queued_json_logging(self, json_logs):
+        """Test loggers write JSON lines through the listener thread."""
+        logger = setup_logger("test.queued", level="DEBUG")
+        logger.info("Hello %s", "world", extra={"session": "a"})
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            logger.exception("Failed")
+
+        # Stopping the listener writes out everything queued
+        configure_logging("rich")
+        lines = _lines(json_logs)
+
+        assert lines[0]["message"] == "Hello world"
+        assert lines[0]["session"] == "a"
+        assert lines[1]["level"] == "ERROR"
+        assert "RuntimeError: boom" in lines[1]["exception"]
+
+    def test_agent_applies_log_settings(self, mock_openai_provider):
+        """Test the agent selects the log format from its settings."""
+        settings = Settings(OPENAI_API_KEY="test-key", LOG_FORMAT="json",
+                            LOG_DEBUG_SAMPLE_RATE=0.5, LOG_LEVEL="DEBUG")
+        try:
+            agent = AIAgent(settings=settings,
+                            provider=mock_openai_provider)
+            handler = agent.logger.handlers[0]
+            assert isinstance(handler, QueueHandler)
+            kept = [bool(handler.filter(agent.logger.makeRecord(
+                "AIAgent", logging.DEBUG, __file__, 1, "m", None, None
+            ))) for _ in range(4)]
+            assert kept == [False, True, False, True]
+        finally:
+            configure_logging("rich")
+
+        with pytest.raises(ConfigurationException):
+            AIAgent(settings=Settings(OPENAI_API_KEY="test-key",
+                                      LOG_FORMAT="xml"),
+                    provider=mock_openai_provider)
@@ -1,9 +1,49 @@
+import asyncio
+import json
+import time
+
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
+from src.ai_agent.providers.instrumented_provider import (
+    InstrumentedProvider
+)
 from src.ai_agent.providers.openai_provider import OpenAIProvider
 from src.ai_agent.providers.base_provider import Message, ChatResponse
-from src.ai_agent.core.exceptions import APIException, ConfigurationException
+from src.ai_agent.providers.cached_provider import CachedProvider
+from src.ai_agent.providers.coalescing_provider import CoalescingProvider
+from src.ai_agent.providers.client_registry import (
+    ClientRegistry, PoolConfig, client_registry
+)
+from src.ai_agent.providers.rate_limiter import RateLimiter
+from src.ai_agent.providers.retrying_provider import (
+    RetryingProvider, RetryPolicy
+)
+from src.ai_agent.providers.response_cache import (
+    MemoryCache, SQLiteCache, make_request_key, shared_cache_backend
+)
+from src.ai_agent.providers.router_provider import (
+    CircuitBreaker, RouterProvider
+)
+from src.ai_agent.providers.semantic_cache import (
+    BruteForceIndex, HashingEmbedder, SemanticCache
+)
+from src.ai_agent.providers.semantic_cached_provider import (
+    SemanticCachedProvider
+)
+from src.ai_agent.providers.validation_cache import ValidationCache
+from src.ai_agent.core.agent import AIAgent
+from src.ai_agent.core.config import Settings
+from src.ai_agent.core.exceptions import (
+    APIException, ConfigurationException, TimeoutException,
+    TransientAPIException
+)
+from src.ai_agent.telemetry.instrumentation import (
+    PrometheusHook, Telemetry, current_call, shared_metrics_registry
+)
+from src.ai_agent.telemetry.metrics import MetricsRegistry
+from src.ai_agent.utils.concurrency import bounded_map
+from benchmarks.mock_server import MockOpenAIServer
 
 
 class TestOpenAIProvider:
@@ -40,8 +80,35 @@ class TestOpenAIProvider:
         provider = OpenAIProvider(api_key="test-key")
         assert provider.validate_config() is False
 
-    @pytest.mark.asyncio
     @patch("openai.OpenAI")
+    def test_validate_config_is_cached(self, mock_openai_client):
+        """Test validation happens once per key and endpoint."""
+        mock_client = Mock()
+        mock_client.models.list.return_value = []
+        mock_openai_client.return_value = mock_client
+
+        assert OpenAIProvider(api_key="test-key").validate_config()
+        assert OpenAIProvider(api_key="test-key").validate_config()
+        assert mock_client.models.list.call_count == 1
+
+        OpenAIProvider(api_key="other-key").validate_config()
+        assert mock_client.models.list.call_count == 2
+
+    def test_validation_cache_persists_to_disk(self, tmp_path):
+        """Test on-disk validation cache survives a new process."""
+        path = str(tmp_path / "validation.json")
+        key = ValidationCache.make_key("test-key", None)
+
+        ValidationCache(path=path).mark_valid(key)
+
+        assert ValidationCache(path=path).is_valid(key)
+        assert "test-key" not in (tmp_path / "validation.json").read_text()
+        assert not ValidationCache(ttl=0, path=path).is_valid(
+            ValidationCache.make_key("other-key", None)
+        )
+
+    @pytest.mark.asyncio
+    @patch("openai.AsyncOpenAI")
     async def test_chat_success(self, mock_openai_client):
         """Test successful chat."""
         # Mock OpenAI response
@@ -53,7 +120,9 @@ class TestOpenAIProvider:
         mock_response.usage.total_tokens = 18
 
         mock_client = Mock()
-        mock_client.chat.completions.create.return_value = mock_response
+        mock_client.chat.completions.create = AsyncMock(
+            return_value=mock_response
+        )
         mock_openai_client.return_value = mock_client
 
         provider = OpenAIProvider(api_key="test-key")
@@ -66,12 +135,12 @@ class TestOpenAIProvider:
         assert response.usage["total_tokens"] == 18
 
     @pytest.mark.asyncio
-    @patch("openai.OpenAI")
+    @patch("openai.AsyncOpenAI")
     async def test_chat_api_error(self, mock_openai_client):
         """Test chat with API error."""
         mock_client = Mock()
-        mock_client.models.list.side_effect = (
-            Exception("Rate limit exceeded")
+        mock_client.chat.completions.create = AsyncMock(
+            side_effect=Exception("Rate limit exceeded")
         )
         mock_openai_client.return_value = mock_client
 
@@ -81,3 +150,957 @@ class TestOpenAIProvider:
 
         with pytest.raises(APIException):
             await provider.chat(messages)
+
+    @pytest.mark.asyncio
+    @patch("openai.AsyncOpenAI")
+    async def test_concurrent_chats_overlap(self, mock_openai_client):
+        """Test that in-flight chats do not block each other."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Hi"
+        mock_response.usage = None
+
+        async def slow_create(**kwargs):
+            await asyncio.sleep(0.1)
+            return mock_response
+
+        mock_client = Mock()
+        mock_client.chat.completions.create = slow_create
+        mock_openai_client.return_value = mock_client
+
+        provider = OpenAIProvider(api_key="test-key")
+        messages = [Message(role="user", content="Hello")]
+
+        start = time.perf_counter()
+        responses = await asyncio.gather(
+            *(provider.chat(messages) for _ in range(10))
+        )
+        elapsed = time.perf_counter() - start
+
+        assert [r.content for r in responses] == ["Hi"] * 10
+        assert elapsed < 0.5
+
+    @pytest.mark.asyncio
+    @patch("openai.AsyncOpenAI")
+    async def test_stream_yields_tokens(self, mock_openai_client):
+        """Test streaming chat yields content deltas in order."""
+        chunks = []
+        for token in ["Hel", "lo", None]:
+            chunk = Mock()
+            chunk.usage = None
+            chunk.choices = [Mock()]
+            chunk.choices[0].delta.content = token
+            chunks.append(chunk)
+        usage_chunk = Mock()
+        usage_chunk.choices = []
+        usage_chunk.usage.total_tokens = 5
+        chunks.append(usage_chunk)
+
+        async def fake_stream():
+            for chunk in chunks:
+                yield chunk
+
+        mock_client = Mock()
+        mock_client.chat.completions.create = AsyncMock(
+            return_value=fake_stream()
+        )
+        mock_openai_client.return_value = mock_client
+
+        provider = OpenAIProvider(api_key="test-key")
+        messages = [Message(role="user", content="Hello")]
+        tokens = [token async for token in provider.stream(messages)]
+
+        assert tokens == ["Hel", "lo"]
+        call_kwargs = mock_client.chat.completions.create.call_args.kwargs
+        assert call_kwargs["stream"] is True
+
+
+class TestClientRegistry:
+
+    def test_providers_share_client_per_credentials(self):
+        """Test that providers with the same credentials share a client."""
+        registry = ClientRegistry()
+
+        first = OpenAIProvider(api_key="test-key", registry=registry)
+        second = OpenAIProvider(api_key="test-key", registry=registry)
+        other = OpenAIProvider(api_key="other-key", registry=registry)
+        pooled = OpenAIProvider(
+            api_key="test-key", registry=registry,
+            pool_config=PoolConfig(max_connections=5),
+        )
+
+        assert first.client is second.client
+        assert first.client is not other.client
+        assert first.client is not pooled.client
+        assert len(registry) == 3
+
+    def test_http2_without_h2_raises_error(self):
+        """Test that HTTP/2 without the h2 package is a config error."""
+        registry = ClientRegistry()
+        with patch("importlib.util.find_spec", return_value=None):
+            with pytest.raises(ConfigurationException):
+                registry.get_async_client(
+                    "test-key", pool=PoolConfig(http2=True)
+                )
+
+    @pytest.mark.asyncio
+    async def test_aclose_closes_clients(self):
+        """Test that shutting down the registry closes every client."""
+        registry = ClientRegistry()
+        client = registry.get_async_client("test-key")
+
+        await registry.aclose()
+
+        assert client.is_closed()
+        assert len(registry) == 0
+        assert registry.get_async_client("test-key") is not client
+
+
+class TestResponseCache:
+
+    def test_request_key_is_normalized(self):
+        """Test that keys ignore timestamps and parameter order."""
+        first = [Message(role="user", content="Hi", timestamp="t1")]
+        second = [Message(role="user", content="Hi", timestamp="t2")]
+
+        assert make_request_key(
+            "gpt-4", first, temperature=0, max_tokens=10
+        ) == make_request_key("gpt-4", second, max_tokens=10, temperature=0)
+        assert make_request_key("gpt-4", first, temperature=0) != \
+            make_request_key("gpt-4", first, temperature=0.5)
+
+    def test_memory_cache_lru_and_ttl(self):
+        """Test LRU eviction and expiry of the memory cache."""
+        response = ChatResponse(content="Hi", model="gpt-4")
+        cache = MemoryCache(max_entries=2)
+        cache.set("a", response)
+        cache.set("b", response)
+        cache.get("a")
+        cache.set("c", response)
+
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert len(cache) == 2
+
+        expired = MemoryCache(ttl=0)
+        expired.set("a", response)
+        assert expired.get("a") is None
+
+    def test_sqlite_cache_persists(self, tmp_path):
+        """Test the SQLite cache survives reopening and evicts by LRU."""
+        path = str(tmp_path / "cache.sqlite3")
+        cache = SQLiteCache(path, max_entries=2)
+        cache.prune_interval = 1
+        for key in ["a", "b", "c"]:
+            cache.set(key, ChatResponse(content=key, model="gpt-4"))
+        cache.close()
+
+        reopened = SQLiteCache(path)
+        assert reopened.get("a") is None
+        assert reopened.get("c").content == "c"
+        assert len(reopened) == 2
+
+    @pytest.mark.asyncio
+    async def test_cached_provider_hits_and_bypass(self):
+        """Test deterministic requests are cached and others bypass."""
+        inner = Mock()
+        inner.model = "gpt-4"
+        inner.chat = AsyncMock(
+            return_value=ChatResponse(content="Hi", model="gpt-4")
+        )
+        provider = CachedProvider(inner, MemoryCache())
+        messages = [Message(role="user", content="Hello")]
+
+        await provider.chat(messages, temperature=0)
+        response = await provider.chat(messages, temperature=0)
+        await provider.chat(messages, temperature=0.7)
+
+        assert response.content == "Hi"
+        assert inner.chat.await_count == 2
+        assert provider.stats.as_dict()["hits"] == 1
+        assert provider.stats.misses == 1
+        assert provider.stats.bypassed == 1
+
+    def test_shared_backends_follow_limits(self, tmp_path):
+        """Test shared backends honour each agent's entry limit and TTL."""
+        small = shared_cache_backend("memory", max_entries=2, ttl=60)
+        large = shared_cache_backend("memory", max_entries=10, ttl=60)
+
+        assert small is not large
+        assert shared_cache_backend("memory", max_entries=2,
+                                    ttl=60) is small
+
+        path = str(tmp_path / "cache.sqlite3")
+        disk = shared_cache_backend("sqlite", max_entries=5, path=path)
+        again = shared_cache_backend("sqlite", max_entries=7, ttl=30,
+                                     path=path)
+        assert again is disk
+        assert (disk.max_entries, disk.ttl) == (7, 30)
+
+    @pytest.mark.asyncio
+    async def test_cached_provider_scopes_and_temperature(self):
+        """Test keys separate endpoints and use the set temperature."""
+        inner = Mock()
+        inner.model = "gpt-4"
+        inner.chat = AsyncMock(
+            return_value=ChatResponse(content="Hi", model="gpt-4")
+        )
+        backend = MemoryCache()
+        first = CachedProvider(inner, backend, scope="a", temperature=0)
+        second = CachedProvider(inner, backend, scope="b", temperature=0)
+        warm = CachedProvider(inner, backend, scope="a", temperature=0.7)
+        messages = [Message(role="user", content="Hello")]
+
+        await first.chat(messages)
+        await first.chat(messages, temperature=0)
+        await second.chat(messages)
+        await warm.chat(messages)
+
+        assert inner.chat.await_count == 3
+        assert first.stats.hits == 1
+        assert second.stats.misses == 1
+        assert warm.stats.bypassed == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_provider_stream_replays(self):
+        """Test a streamed reply is cached and replayed."""
+        async def fake_stream(messages, **kwargs):
+            for token in ["He", "llo"]:
+                yield token
+
+        inner = Mock()
+        inner.model = "gpt-4"
+        inner.stream = Mock(side_effect=fake_stream)
+        provider = CachedProvider(inner, MemoryCache(), cache_all=True)
+        messages = [Message(role="user", content="Hello")]
+
+        first = [t async for t in provider.stream(messages)]
+        second = [t async for t in provider.stream(messages)]
+
+        assert first == ["He", "llo"]
+        assert second == ["Hello"]
+        assert inner.stream.call_count == 1
+
+
+class TestSemanticCache:
+
+    def test_paraphrases_are_similar(self):
+        """Test near-duplicate prompts embed close and others do not."""
+        embedder = HashingEmbedder()
+        a, b, c = embedder.embed([
+            "What is the capital of France?",
+            "what's the capital of france",
+            "How do I bake sourdough bread?",
+        ])
+        similarity = sum(x * y for x, y in zip(a, b))
+        assert similarity > 0.95
+        assert sum(x * y for x, y in zip(a, c)) < 0.3
+
+    def test_index_search_and_slot_reuse(self):
+        """Test the brute-force index ranks by similarity and reuses ids."""
+        index = BruteForceIndex(dimensions=2, capacity=2)
+        first = index.add([1.0, 0.0])
+        second = index.add([0.0, 1.0])
+
+        assert index.search([0.6, 0.8], k=2)[0][0] == second
+        index.remove(second)
+        assert index.add([0.8, 0.6]) == second
+        assert [i for i, _ in index.search_many([[1.0, 0.0]], k=1)[0]] \
+            == [first]
+
+    def test_threshold_scope_and_eviction(self):
+        """Test lookups respect the threshold, scope and entry limit."""
+        cache = SemanticCache(threshold=0.9, max_entries=2)
+        cache.store("s", "What is the capital of France?",
+                    ChatResponse(content="Paris", model="gpt-4"))
+
+        found = cache.lookup("s", "what's the capital of france")
+        assert found is not None and found[0].content == "Paris"
+        assert cache.lookup("other", "What is the capital of France?") \
+            is None
+        assert cache.lookup("s", "What is the capital of Spain?") is None
+
+        cache.store("s", "first", ChatResponse(content="1", model="gpt-4"))
+        cache.store("s", "second", ChatResponse(content="2", model="gpt-4"))
+        assert len(cache) == 2
+        assert cache.lookup("s", "What is the capital of France?") is None
+
+        stats = cache.stats.as_dict()
+        assert stats["hits"] == 1 and stats["misses"] == 3
+        assert stats["lookup_latency_p50"] is not None
+
+    @pytest.mark.asyncio
+    async def test_provider_serves_paraphrases(self):
+        """Test a paraphrased prompt is answered from the cache."""
+        paris = ChatResponse(content="Paris", model="gpt-4")
+        inner = _inner_provider(paris, paris)
+        provider = SemanticCachedProvider(inner, SemanticCache())
+        system = Message(role="system", content="Be brief.")
+
+        await provider.chat(
+            [system, Message(role="user", content="Capital of France?")],
+            temperature=0,
+        )
+        response = await provider.chat(
+            [system, Message(role="user", content="capital of france")],
+            temperature=0,
+        )
+        await provider.chat(
+            [Message(role="user", content="capital of france")],
+            temperature=0.7,
+        )
+
+        assert response.content == "Paris"
+        assert inner.chat.await_count == 2
+        assert provider.stats.hits == 1
+        assert provider.stats.bypassed == 1
+
+    def test_agent_wraps_semantic_cache(self):
+        """Test the agent adds the semantic cache when enabled."""
+        settings = Settings(OPENAI_API_KEY="test-key", SEMANTIC_CACHE=True,
+                            PROVIDER_VALIDATION="skip")
+
+        agent = AIAgent(settings=settings)
+
+        assert isinstance(agent.provider, SemanticCachedProvider)
+
+
+def _slow_provider(delay: float = 0.05, error=None):
+    """Mock provider counting its calls, answering after a delay."""
+    provider = Mock()
+    provider.model = "gpt-4"
+    provider.calls = 0
+    provider.cancelled = 0
+
+    async def chat(messages, **kwargs):
+        provider.calls += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            provider.cancelled += 1
+            raise
+        if error is not None:
+            raise error
+        return ChatResponse(content=messages[-1].content, model="gpt-4")
+
+    async def stream(messages, **kwargs):
+        provider.calls += 1
+        for token in ["a", "b", "c"]:
+            await asyncio.sleep(delay / 3)
+            yield token
+
+    provider.chat = chat
+    provider.stream = stream
+    return provider
+
+
+class TestCoalescingProvider:
+
+    @pytest.mark.asyncio
+    async def test_identical_requests_share_one_call(self):
+        """Test concurrent identical chats make one upstream call."""
+        inner = _slow_provider()
+        provider = CoalescingProvider(inner)
+        same = [Message(role="user", content="Hi")]
+        other = [Message(role="user", content="Bye")]
+
+        responses = await asyncio.gather(
+            *(provider.chat(same) for _ in range(5)), provider.chat(other)
+        )
+
+        assert inner.calls == 2
+        assert all(r == responses[0] for r in responses[:5])
+        assert responses[5].content == "Bye"
+        # Each caller owns its response
+        responses[0].content = "Changed"
+        assert responses[1].content == "Hi"
+        assert provider.stats["coalesced"] == 4
+        assert len(provider.group) == 0
+
+    @pytest.mark.asyncio
+    async def test_cancellation(self):
+        """Test a cancelled waiter leaves the call to the others."""
+        inner = _slow_provider()
+        provider = CoalescingProvider(inner)
+        messages = [Message(role="user", content="Hi")]
+
+        first = asyncio.create_task(provider.chat(messages))
+        second = asyncio.create_task(provider.chat(messages))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert (await second).content == "Hi"
+        assert first.cancelled()
+        assert inner.cancelled == 0
+
+        only = asyncio.create_task(provider.chat(messages))
+        await asyncio.sleep(0.01)
+        only.cancel()
+        await asyncio.sleep(0.01)
+        assert inner.cancelled == 1
+        assert provider.stats["cancelled"] == 1
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_waiter(self):
+        """Test an upstream failure is raised to all waiters."""
+        provider = CoalescingProvider(
+            _slow_provider(error=TransientAPIException("down"))
+        )
+        messages = [Message(role="user", content="Hi")]
+
+        results = await asyncio.gather(
+            provider.chat(messages), provider.chat(messages),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(r, TransientAPIException) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_stream_subscribers_get_every_token(self):
+        """Test a late stream subscriber replays the earlier tokens."""
+        inner = _slow_provider(delay=0.06)
+        provider = CoalescingProvider(inner)
+        messages = [Message(role="user", content="Hi")]
+
+        async def collect(delay):
+            await asyncio.sleep(delay)
+            return [t async for t in provider.stream(messages)]
+
+        early, late = await asyncio.gather(collect(0), collect(0.03))
+
+        assert early == late == ["a", "b", "c"]
+        assert inner.calls == 1
+
+    @pytest.mark.asyncio
+    async def test_agents_coalesce_through_shared_group(self, mock_settings):
+        """Test agents sharing a provider send one request."""
+        mock_settings.request_coalescing = True
+        mock_settings.provider_validation = "skip"
+        inner = _slow_provider()
+        agents = [AIAgent(settings=mock_settings, provider=inner)
+                  for _ in range(3)]
+
+        replies = await asyncio.gather(*(a.chat("Hi") for a in agents))
+
+        assert isinstance(agents[0].provider, CoalescingProvider)
+        assert replies == ["Hi"] * 3
+        assert inner.calls == 1
+
+
+class TestBatchChat:
+
+    @pytest.mark.asyncio
+    async def test_bounded_map_limits_concurrency(self):
+        """Test that no more than the limit run at once."""
+        in_flight = 0
+        peak = 0
+
+        async def work(item):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if item == 3:
+                raise ValueError("bad item")
+            return item * 2
+
+        results = dict([r async for r in bounded_map(work, range(10), 3)])
+
+        assert peak == 3
+        assert results[4] == 8
+        assert isinstance(results[3], ValueError)
+
+    @pytest.mark.asyncio
+    @patch("openai.AsyncOpenAI")
+    async def test_provider_batch_chat(self, mock_openai_client):
+        """Test provider-level batch chat keeps order and isolates errors."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Hi"
+        mock_response.usage = None
+
+        async def create(**kwargs):
+            if kwargs["messages"][0]["content"] == "fail":
+                raise Exception("Rate limit exceeded")
+            return mock_response
+
+        mock_client = Mock()
+        mock_client.chat.completions.create = create
+        mock_openai_client.return_value = mock_client
+
+        provider = OpenAIProvider(api_key="test-key")
+        results = await provider.batch_chat([
+            [Message(role="user", content="Hello")],
+            [Message(role="user", content="fail")],
+        ], concurrency=2)
+
+        assert results[0].response.content == "Hi"
+        assert "APIException" in results[1].error
+
+
+class TestRateLimiter:
+
+    @pytest.mark.asyncio
+    async def test_requests_per_minute_budget(self):
+        """Test requests beyond the burst wait for the bucket to refill."""
+        limiter = RateLimiter(requests_per_minute=6000, burst_seconds=0.01)
+
+        start = time.perf_counter()
+        for _ in range(5):
+            await limiter.acquire()
+            limiter.release()
+        elapsed = time.perf_counter() - start
+
+        assert elapsed >= 0.03
+
+    @pytest.mark.asyncio
+    async def test_tokens_reconciled_with_usage(self):
+        """Test over-estimated tokens are given back after the call."""
+        limiter = RateLimiter(tokens_per_minute=60_000, burst_seconds=1)
+
+        async with limiter.reserve(500) as reservation:
+            assert limiter.tokens.level == pytest.approx(500, abs=5)
+            reservation.actual_tokens = 100
+
+        assert limiter.tokens.level == pytest.approx(900, abs=5)
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit_and_aimd(self):
+        """Test slots bound concurrency and 429s halve the limit."""
+        limiter = RateLimiter(max_concurrency=4)
+        in_flight = 0
+        peak = 0
+
+        async def call():
+            nonlocal in_flight, peak
+            async with limiter.reserve():
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+
+        await asyncio.gather(*(call() for _ in range(12)))
+        assert peak == 4
+
+        limiter.observe_headers({"x-ratelimit-remaining-requests": "3"}, 429)
+        assert limiter.concurrency_limit == 2
+        assert limiter.rate_limited == 1
+
+        for _ in range(2):
+            await limiter.acquire()
+            limiter.release()
+        assert limiter.concurrency_limit == 3
+
+    @pytest.mark.asyncio
+    @patch("openai.AsyncOpenAI")
+    async def test_provider_reserves_and_reconciles(self, mock_openai_client):
+        """Test the provider budgets each call and reports actual usage."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Hi"
+        mock_response.usage.prompt_tokens = 10
+        mock_response.usage.completion_tokens = 5
+        mock_response.usage.total_tokens = 15
+
+        mock_client = Mock()
+        mock_client.chat.completions.create = AsyncMock(
+            return_value=mock_response
+        )
+        mock_openai_client.return_value = mock_client
+
+        limiter = RateLimiter(requests_per_minute=600,
+                              tokens_per_minute=60_000, burst_seconds=1)
+        provider = OpenAIProvider(api_key="test-key", rate_limiter=limiter)
+
+        await provider.chat([Message(role="user", content="Hello")],
+                            max_tokens=100)
+
+        assert limiter.in_flight == 0
+        assert limiter.requests.level == pytest.approx(9, abs=0.1)
+        assert limiter.tokens.level == pytest.approx(985, abs=5)
+
+
+FAST_RETRIES = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.01)
+
+
+def _inner_provider(*side_effect):
+    provider = Mock()
+    provider.model = "gpt-4"
+    provider.chat = AsyncMock(side_effect=list(side_effect))
+    return provider
+
+
+class TestRetryingProvider:
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_errors(self):
+        """Test transient failures are retried until success."""
+        ok = ChatResponse(content="Hi", model="gpt-4")
+        inner = _inner_provider(TransientAPIException("503"),
+                                TransientAPIException("timeout"), ok)
+        provider = RetryingProvider(inner, FAST_RETRIES)
+
+        response = await provider.chat([Message(role="user", content="Hi")])
+
+        assert response is ok
+        assert inner.chat.await_count == 3
+        assert provider.stats["retries"] == 2
+
+    @pytest.mark.asyncio
+    async def test_fatal_errors_and_exhaustion_raise(self):
+        """Test fatal errors fail fast and retries are bounded."""
+        fatal = RetryingProvider(
+            _inner_provider(APIException("401")), FAST_RETRIES
+        )
+        with pytest.raises(APIException):
+            await fatal.chat([])
+        assert fatal.provider.chat.await_count == 1
+
+        flaky = RetryingProvider(
+            _inner_provider(*[TransientAPIException("503")] * 3),
+            FAST_RETRIES,
+        )
+        with pytest.raises(TransientAPIException):
+            await flaky.chat([])
+        assert flaky.stats["failures"] == 1
+
+    @pytest.mark.asyncio
+    async def test_attempt_and_total_timeouts(self):
+        """Test slow attempts time out and the call has a deadline."""
+        async def slow_chat(messages, **kwargs):
+            await asyncio.sleep(1)
+
+        inner = Mock()
+        inner.chat = slow_chat
+        provider = RetryingProvider(inner, RetryPolicy(
+            max_attempts=5, base_delay=0.001, attempt_timeout=0.02,
+            total_timeout=0.1,
+        ))
+
+        start = time.perf_counter()
+        with pytest.raises(TimeoutException):
+            await provider.chat([])
+
+        assert time.perf_counter() - start < 0.5
+        assert provider.stats["timeouts"] >= 2
+
+    @pytest.mark.asyncio
+    async def test_abandoned_streams_are_closed(self):
+        """Test inner streams are closed on retry and on early exit."""
+        closed = []
+        delays = [1.0, 0.0]
+
+        async def stream(messages, **kwargs):
+            delay = delays.pop(0)
+            try:
+                await asyncio.sleep(delay)
+                yield "Hi"
+                yield "there"
+            finally:
+                closed.append(delay)
+
+        inner = Mock()
+        inner.stream = stream
+        provider = RetryingProvider(inner, RetryPolicy(
+            base_delay=0.001, attempt_timeout=0.02,
+        ))
+
+        tokens = provider.stream([])
+        assert await tokens.__anext__() == "Hi"
+        await tokens.aclose()
+
+        assert closed == [1.0, 0.0]
+        assert provider.stats["retries"] == 1
+
+    @pytest.mark.asyncio
+    async def test_hedged_request_wins(self):
+        """Test a hedge is sent when the first request is slow."""
+        delays = [1.0, 0.01]
+
+        async def chat(messages, **kwargs):
+            await asyncio.sleep(delays.pop(0))
+            return ChatResponse(content="Hi", model="gpt-4")
+
+        inner = Mock()
+        inner.chat = chat
+        provider = RetryingProvider(inner, RetryPolicy(hedge_after=0.02))
+
+        start = time.perf_counter()
+        response = await provider.chat([])
+
+        assert response.content == "Hi"
+        assert time.perf_counter() - start < 0.5
+        assert provider.stats["hedges"] == 1
+        assert provider.stats["hedge_wins"] == 1
+
+    @pytest.mark.asyncio
+    async def test_agent_recovers_from_server_errors(self):
+        """Test retries against a local fake server returning 503s."""
+        with MockOpenAIServer(latency=0.001) as server:
+            server.fail_next(2, status=503)
+            settings = Settings(
+                OPENAI_API_KEY="test-key",
+                OPENAI_BASE_URL=server.base_url,
+                PROVIDER_VALIDATION="skip",
+                RETRY_BASE_DELAY=0.001,
+                LOG_LEVEL="CRITICAL",
+            )
+            agent = AIAgent(settings=settings)
+
+            response = await agent.chat("Hello")
+            await client_registry.aclose()
+
+        assert response == "Hello from the mock server."
+        assert server.request_count == 3
+        assert agent.provider.stats["retries"] == 2
+
+
+def _backend(delay: float = 0.0, errors=(), tokens=("Hi",)):
+    """Mock provider answering after a delay, raising ``errors`` first."""
+    provider = Mock()
+    provider.model = "gpt-4"
+    errors = list(errors)
+
+    async def chat(messages, **kwargs):
+        await asyncio.sleep(delay)
+        if errors:
+            raise errors.pop(0)
+        return ChatResponse(content="Hi", model="gpt-4")
+
+    async def stream(messages, **kwargs):
+        await asyncio.sleep(delay)
+        if errors:
+            raise errors.pop(0)
+        for token in tokens:
+            yield token
+
+    provider.chat = AsyncMock(side_effect=chat)
+    provider.stream = stream
+    return provider
+
+
+class TestRouterProvider:
+
+    @pytest.mark.asyncio
+    async def test_ewma_prefers_the_faster_backend(self):
+        """Test traffic moves to the backend with lower latency."""
+        slow, fast = _backend(0.03), _backend(0.001)
+        router = RouterProvider([slow, fast], names=["slow", "fast"])
+
+        for _ in range(10):
+            await router.chat([])
+
+        assert fast.chat.call_count > slow.chat.call_count
+        health = {b["name"]: b for b in router.health()}
+        assert health["slow"]["ewma_latency"] > \
+            health["fast"]["ewma_latency"]
+
+    @pytest.mark.asyncio
+    async def test_least_outstanding_spreads_concurrent_requests(self):
+        """Test concurrent requests are spread over idle backends."""
+        backends = [_backend(0.02) for _ in range(3)]
+        router = RouterProvider(backends, strategy="least_outstanding")
+
+        await asyncio.gather(*(router.chat([]) for _ in range(3)))
+
+        assert [b.chat.call_count for b in backends] == [1, 1, 1]
+
+    @pytest.mark.asyncio
+    async def test_fails_over_and_opens_the_circuit(self):
+        """Test transient failures fail over and trip the breaker."""
+        broken = _backend(errors=[TransientAPIException("down")] * 5)
+        healthy = _backend()
+        router = RouterProvider([broken, healthy], strategy="weighted",
+                                weights=[10 ** 6, 1], names=["a", "b"],
+                                failure_threshold=2, recovery_time=0.05)
+
+        for _ in range(4):
+            assert (await router.chat([])).content == "Hi"
+
+        assert broken.chat.call_count == 2
+        assert router.health()[0]["state"] == "open"
+
+        await asyncio.sleep(0.06)
+        assert router.backends[0].breaker.state == "half_open"
+        await router.chat([])
+        # The failed probe opens the circuit again
+        assert broken.chat.call_count == 3
+        assert router.backends[0].breaker.state == "open"
+
+    @pytest.mark.asyncio
+    async def test_non_retryable_errors_do_not_fail_over(self):
+        """Test client errors are raised without trying other backends."""
+        first = _backend(errors=[APIException("bad request")])
+        second = _backend()
+        router = RouterProvider([first, second], strategy="weighted",
+                                weights=[10 ** 6, 1])
+
+        with pytest.raises(APIException):
+            await router.chat([])
+
+        assert second.chat.call_count == 0
+        assert router.backends[0].breaker.state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_all_backends_down_raises_last_error(self):
+        """Test the last error is raised once every backend failed."""
+        router = RouterProvider([
+            _backend(errors=[TransientAPIException("one")]),
+            _backend(errors=[TransientAPIException("two")]),
+        ])
+
+        with pytest.raises(TransientAPIException):
+            await router.chat([])
+
+    @pytest.mark.asyncio
+    async def test_stream_fails_over_before_the_first_token(self):
+        """Test a stream failing to start is sent to another backend."""
+        broken = _backend(errors=[TimeoutException("slow")])
+        healthy = _backend(tokens=("Hello", " there"))
+        router = RouterProvider([broken, healthy], strategy="weighted",
+                                weights=[10 ** 6, 1])
+
+        tokens = [token async for token in router.stream([])]
+
+        assert tokens == ["Hello", " there"]
+        assert router.backends[0].failures == 1
+        assert all(b.outstanding == 0 for b in router.backends)
+
+    def test_circuit_breaker_allows_one_probe(self):
+        """Test a half-open breaker lets a single request through."""
+        breaker = CircuitBreaker(failure_threshold=1, recovery_time=0)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.on_send()
+        assert not breaker.allow()
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+    def test_invalid_configuration(self):
+        """Test bad strategies and weights are rejected."""
+        with pytest.raises(ConfigurationException):
+            RouterProvider([_backend()], strategy="fastest")
+        with pytest.raises(ConfigurationException):
+            RouterProvider([_backend()], weights=[1, 2])
+        with pytest.raises(ConfigurationException):
+            RouterProvider([])
+
+    def test_agents_share_a_router(self):
+        """Test agents with the same endpoints share one router."""
+        settings = Settings(
+            OPENAI_API_KEY="test-key",
+            OPENAI_BASE_URL="http://primary/v1",
+            ROUTER_ENDPOINTS="http://a/v1, http://b/v1",
+            ROUTER_WEIGHTS="2,1,1",
+            PROVIDER_VALIDATION="skip",
+        )
+
+        first = AIAgent(settings=settings).provider
+        second = AIAgent(settings=settings).provider
+
+        assert isinstance(first, RetryingProvider)
+        assert isinstance(first.provider, RouterProvider)
+        assert first.provider is second.provider
+        assert [b["name"] for b in first.provider.health()] == [
+            "http://primary/v1", "http://a/v1", "http://b/v1"
+        ]
+        assert [b["weight"] for b in first.provider.health()] == [2, 1, 1]
+
+    def test_router_configurations_are_not_shared(self):
+        """Test agents with different router settings get own routers."""
+        base = {
+            "OPENAI_API_KEY": "test-key",
+            "OPENAI_BASE_URL": "http://primary/v1",
+            "ROUTER_ENDPOINTS": "http://a/v1",
+            "PROVIDER_VALIDATION": "skip",
+        }
+        routers = [
+            AIAgent(settings=Settings(**base, **extra)).provider.provider
+            for extra in ({}, {"ROUTER_WEIGHTS": "3,1"},
+                          {"ROUTER_FAILURE_THRESHOLD": 1},
+                          {"ROUTER_RECOVERY_TIME": 5.0})
+        ]
+
+        assert len({id(router) for router in routers}) == 4
+        assert [b["weight"] for b in routers[1].health()] == [3, 1]
+        assert routers[2].backends[0].breaker.failure_threshold == 1
+        assert routers[3].backends[0].breaker.recovery_time == 5.0
+
+
+class TestTelemetry:
+
+    @pytest.mark.asyncio
+    async def test_retries_are_counted_on_the_agent_call(self):
+        """Test provider attempts nest in the call that retried them."""
+        registry = MetricsRegistry()
+        telemetry = Telemetry([PrometheusHook(registry)])
+        ok = ChatResponse(content="Hi", model="gpt-4",
+                          usage={"prompt_tokens": 5, "completion_tokens": 2})
+        provider = RetryingProvider(
+            InstrumentedProvider(
+                _inner_provider(TransientAPIException("503"), ok), telemetry
+            ),
+            FAST_RETRIES,
+        )
+
+        record = telemetry.start("agent.chat", "gpt-4")
+        response = await provider.chat([Message(role="user", content="Hi")])
+        record.add_usage(response.usage)
+        telemetry.finish(record)
+
+        assert [c.error for c in record.children] == [
+            "TransientAPIException", None
+        ]
+        assert record.retries == 1
+        text = registry.render()
+        assert ('ai_agent_requests_total{operation="provider.chat",'
+                'status="error"} 1') in text
+        assert 'ai_agent_retries_total{operation="agent.chat"} 1' in text
+        # Tokens are counted once, not again for the provider call
+        assert 'ai_agent_tokens_total{type="prompt"} 5' in text
+        assert 'ai_agent_tokens_total{type="completion"} 2' in text
+
+    @pytest.mark.asyncio
+    async def test_agent_exports_metrics_and_spans(self, tmp_path):
+        """Test an instrumented agent fills the registry and trace file."""
+        settings = Settings(OPENAI_API_KEY="test-key",
+                            METRICS_ENABLED=True,
+                            TRACE_EXPORT_PATH=str(tmp_path / "spans.jsonl"),
+                            RESPONSE_CACHE="memory",
+                            RESPONSE_CACHE_ALL=True,
+                            PROVIDER_VALIDATION="skip")
+        inner = _inner_provider(ChatResponse(
+            content="Hi", model="gpt-4",
+            usage={"prompt_tokens": 5, "completion_tokens": 2},
+        ))
+        agent = AIAgent(settings=settings, provider=inner)
+
+        await agent.chat("Hello")
+        agent.clear_history()
+        await agent.chat("Hello")
+
+        assert inner.chat.await_count == 1
+        text = shared_metrics_registry().render()
+        assert ('ai_agent_requests_total{operation="agent.chat",'
+                'status="ok"} 2') in text
+        assert 'ai_agent_cache_hits_total{cache="exact"} 1' in text
+        assert 'ai_agent_tokens_total{type="prompt"} 5' in text
+        assert "ai_agent_request_duration_seconds_bucket" in text
+
+        traces = [json.loads(line) for line in
+                  (tmp_path / "spans.jsonl").read_text().splitlines()]
+        assert len(traces) == 2
+        spans = traces[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert [s["name"] for s in spans] == ["agent.chat", "provider.chat"]
+        assert spans[1]["parentSpanId"] == spans[0]["spanId"]
+        assert spans[1]["traceId"] == spans[0]["traceId"]
+
+    def test_disabled_by_default(self, mock_settings, mock_openai_provider):
+        """Test agents leave providers unwrapped without telemetry."""
+        agent = AIAgent(settings=mock_settings,
+                        provider=mock_openai_provider)
+
+        assert agent.telemetry is None
+        assert agent.provider is mock_openai_provider
+        assert current_call() is None
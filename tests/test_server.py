@@ -0,0 +1,167 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, Mock
+
+from src.ai_agent.core.exceptions import RateLimitException
+from src.ai_agent.providers.base_provider import ChatResponse
+from src.ai_agent.providers.openai_provider import OpenAIProvider
+from src.ai_agent.server.app import AgentServer
+from src.ai_agent.server.sessions import SessionManager
+
+
+def _provider(delay: float = 0.0):
+    """Mocked provider answering after an optional delay."""
+    provider = Mock(spec=OpenAIProvider)
+    provider.model = "gpt-3.5-turbo"
+    provider.avalidate_config = AsyncMock(return_value=True)
+
+    async def chat(messages, **kwargs):
+        await asyncio.sleep(delay)
+        return ChatResponse(content=f"Echo: {messages[-1].content}",
+                            model="gpt-3.5-turbo")
+
+    async def stream(messages, **kwargs):
+        for token in ["Hello", " there"]:
+            yield token
+
+    provider.chat = chat
+    provider.stream = stream
+    return provider
+
+
+@pytest_asyncio.fixture
+async def server(mock_settings):
+    """Agent server on an ephemeral port with mocked providers."""
+    server = AgentServer(mock_settings, host="127.0.0.1", port=0,
+                         provider_factory=_provider)
+    await server.start()
+    yield server
+    await server.shutdown()
+
+
+class TestAgentServer:
+
+    @pytest.mark.asyncio
+    async def test_chat_history_and_summary(self, server):
+        """Test sessions are created by the first chat and kept apart."""
+        async with httpx.AsyncClient(base_url=server.base_url) as http:
+            response = await http.post("/sessions/a/chat",
+                                       json={"message": "Hi"})
+            assert response.status_code == 200
+            assert response.json() == {"session_id": "a",
+                                       "response": "Echo: Hi"}
+            await http.post("/sessions/b/chat", json={"message": "Other"})
+
+            history = (await http.get("/sessions/a/history")).json()
+            assert [m["content"] for m in history["messages"]] == [
+                "Hi", "Echo: Hi"
+            ]
+            summary = (await http.get("/sessions/a/summary")).json()
+            assert summary["total_messages"] == 2
+            assert (await http.get("/health")).json()["sessions"] == 2
+
+            assert (await http.get("/sessions/c/summary")).status_code \
+                == 404
+            assert (await http.post("/sessions/a/chat",
+                                    json={"message": " "})).status_code \
+                == 400
+            assert (await http.delete("/sessions/a")).status_code == 200
+            assert (await http.get("/sessions/a/history")).status_code \
+                == 404
+
+    @pytest.mark.asyncio
+    async def test_stream_sends_server_sent_events(self, server):
+        """Test tokens are streamed as SSE and end with a done event."""
+        async with httpx.AsyncClient(base_url=server.base_url) as http:
+            response = await http.post("/sessions/s/stream",
+                                       json={"message": "Hi"})
+            assert response.headers["content-type"] == "text/event-stream"
+            events = response.text.strip().split("\n\n")
+            assert [json.loads(e[len("data: "):])["token"]
+                    for e in events[:-1]] == ["Hello", " there"]
+            assert events[-1].startswith("event: done")
+
+            history = (await http.get("/sessions/s/history")).json()
+            assert history["messages"][-1]["content"] == "Hello there"
+
+    @pytest.mark.asyncio
+    async def test_agent_errors_map_to_status(self, server):
+        """Test provider failures are answered with a matching status."""
+        async with httpx.AsyncClient(base_url=server.base_url) as http:
+            await http.post("/sessions/x/chat", json={"message": "Hi"})
+            server.sessions.get("x").agent.provider.chat = AsyncMock(
+                side_effect=RateLimitException("slow down")
+            )
+            response = await http.post("/sessions/x/chat",
+                                       json={"message": "Again"})
+            assert response.status_code == 429
+            assert "slow down" in response.json()["error"]
+
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint(self, mock_settings):
+        """Test metrics are served only when enabled."""
+        mock_settings.metrics_enabled = True
+        server = AgentServer(mock_settings, host="127.0.0.1", port=0,
+                             provider_factory=_provider)
+        await server.start()
+        try:
+            async with httpx.AsyncClient(base_url=server.base_url) as http:
+                await http.post("/sessions/a/chat", json={"message": "Hi"})
+                response = await http.get("/metrics")
+        finally:
+            await server.shutdown()
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert ('ai_agent_requests_total{operation="agent.chat",'
+                'status="ok"} 1') in response.text
+
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint_disabled(self, server):
+        """Test the metrics endpoint is absent by default."""
+        async with httpx.AsyncClient(base_url=server.base_url) as http:
+            assert (await http.get("/metrics")).status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_shutdown_drains_in_flight_requests(self, mock_settings):
+        """Test a request in flight finishes before the server stops."""
+        server = AgentServer(mock_settings, host="127.0.0.1", port=0,
+                             provider_factory=lambda: _provider(0.2))
+        await server.start()
+        async with httpx.AsyncClient(base_url=server.base_url) as http:
+            request = asyncio.create_task(
+                http.post("/sessions/a/chat", json={"message": "Hi"})
+            )
+            await asyncio.sleep(0.05)
+            await server.shutdown()
+            response = await request
+        assert response.status_code == 200
+        assert len(server.sessions) == 0
+
+
+class TestSessionManager:
+
+    def test_least_recently_used_session_is_evicted(self):
+        """Test the session limit evicts the oldest idle session."""
+        manager = SessionManager(lambda session_id: Mock(),
+                                 max_sessions=2)
+        manager.get_or_create("a")
+        manager.get_or_create("b")
+        manager.get("a")
+        manager.get_or_create("c")
+
+        assert manager.ids() == ["a", "c"]
+        assert manager.stats["evicted"] == 1
+
+    def test_idle_sessions_expire(self):
+        """Test sessions past the TTL are dropped unless busy."""
+        manager = SessionManager(lambda session_id: Mock(), idle_ttl=0)
+        manager.get_or_create("idle")
+        manager.get_or_create("busy").active = 1
+
+        assert manager.evict_expired() == 1
+        assert manager.ids() == ["busy"]
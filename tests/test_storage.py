@@ -0,0 +1,286 @@
+import json
+
+import pytest
+from unittest.mock import AsyncMock
+
+from src.ai_agent.core.agent import AIAgent
+from src.ai_agent.core.exceptions import AIAgentException
+from src.ai_agent.providers.base_provider import ChatResponse, Message
+from src.ai_agent.storage.conversation_log import (
+    ConversationLog, iter_records, read_conversation_file
+)
+from src.ai_agent.storage.conversation_store import (
+    SQLiteConversationStore, import_conversations, import_session_id
+)
+
+
+def _read_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestConversationLog:
+
+    @pytest.mark.asyncio
+    async def test_attached_log_appends_each_turn(
+            self, agent_with_mock_provider, mock_settings, tmp_path):
+        """Test every message is appended to an attached log."""
+        agent = agent_with_mock_provider
+        agent.provider.chat = AsyncMock(return_value=ChatResponse(
+            content="Hi!", model="gpt-3.5-turbo"
+        ))
+        filepath = tmp_path / "session.jsonl"
+
+        agent.attach_log(str(filepath))
+        await agent.chat("Hello")
+        await agent.chat("How are you?")
+        agent.detach_log()
+
+        records = _read_lines(filepath)
+        assert records[0]["type"] == "header"
+        assert [r["role"] for r in records[1:]] == [
+            "user", "assistant", "user", "assistant"
+        ]
+
+        restored = AIAgent(settings=mock_settings,
+                           provider=agent_with_mock_provider.provider)
+        restored.load_conversation(str(filepath))
+        assert len(restored.conversation_history) == 4
+        assert restored.system_prompt == agent.system_prompt
+
+    def test_repeated_saves_only_append(self, agent_with_mock_provider,
+                                        tmp_path):
+        """Test saving to a JSONL file twice appends the new messages."""
+        agent = agent_with_mock_provider
+        filepath = tmp_path / "session.jsonl"
+        agent.conversation_history.append(Message(role="user", content="A"))
+        agent.save_conversation(str(filepath))
+        header = _read_lines(filepath)[0]
+
+        agent.conversation_history.append(
+            Message(role="assistant", content="B")
+        )
+        agent.set_system_prompt("You are terse.")
+        agent.save_conversation(str(filepath))
+
+        records = _read_lines(filepath)
+        assert records[0] == header
+        assert [r["type"] for r in records[1:]] == [
+            "message", "system_prompt", "message"
+        ]
+        data = read_conversation_file(str(filepath))
+        assert [m["content"] for m in data["conversation"]] == ["A", "B"]
+        assert data["system_prompt"] == "You are terse."
+
+    def test_clear_and_compaction(self, agent_with_mock_provider, tmp_path):
+        """Test cleared history is dropped on load and compacted away."""
+        agent = agent_with_mock_provider
+        filepath = tmp_path / "session.jsonl"
+        agent.attach_log(str(filepath))
+        agent._log.compact_min_records = 3
+
+        for content in ["A", "B"]:
+            agent._append_message(Message(role="user", content=content))
+        agent.clear_history()
+        agent._append_message(Message(role="user", content="C"))
+
+        data = read_conversation_file(str(filepath))
+        assert [m["content"] for m in data["conversation"]] == ["C"]
+        # The clear superseded three records, so the log was rewritten
+        assert [r["type"] for r in _read_lines(filepath)] == [
+            "header", "message"
+        ]
+        agent.detach_log()
+
+    def test_torn_last_line_is_skipped(self, tmp_path):
+        """Test a crash mid-append loses only the partial record."""
+        filepath = tmp_path / "session.jsonl"
+        log = ConversationLog(str(filepath), fsync="always")
+        log.create({"agent_name": "Test"},
+                   [Message(role="user", content="Hello")])
+        log.close()
+        with open(filepath, "a") as f:
+            f.write('{"type": "message", "role": "assis')
+
+        records = list(iter_records(str(filepath)))
+        assert len(records) == 2
+
+        with open(filepath, "a") as f:
+            f.write('\n{"type": "clear"}\n')
+        with pytest.raises(AIAgentException):
+            list(iter_records(str(filepath)))
+
+    def test_reopen_cuts_torn_last_line(self, tmp_path):
+        """Test appending after a crash does not bury the torn record."""
+        filepath = tmp_path / "session.jsonl"
+        log = ConversationLog(str(filepath), fsync="always")
+        log.create({"agent_name": "Test"},
+                   [Message(role="user", content="Hello")])
+        log.close()
+        with open(filepath, "a") as f:
+            f.write('{"type": "message", "role": "assis')
+
+        log.reopen()
+        log.append(Message(role="user", content="Again"))
+        log.close()
+
+        data = read_conversation_file(str(filepath))
+        assert [m["content"] for m in data["conversation"]] == [
+            "Hello", "Again"
+        ]
+
+    def test_replaced_history_is_rewritten(self, agent_with_mock_provider,
+                                           tmp_path):
+        """Test a new or cleared history is not appended to an old save."""
+        agent = agent_with_mock_provider
+        filepath = tmp_path / "session.jsonl"
+        agent.conversation_history.append(Message(role="user", content="A"))
+        agent.save_conversation(str(filepath))
+
+        agent.conversation_history.clear()
+        agent.conversation_history.extend([
+            Message(role="user", content="B"),
+            Message(role="user", content="C"),
+        ])
+        agent.save_conversation(str(filepath))
+        agent.conversation_history = [Message(role="user", content="D"),
+                                      Message(role="user", content="E"),
+                                      Message(role="user", content="F")]
+        agent.save_conversation(str(filepath))
+
+        data = read_conversation_file(str(filepath))
+        assert [m["content"] for m in data["conversation"]] == [
+            "D", "E", "F"
+        ]
+
+    def test_unknown_fsync_policy_raises(self, tmp_path):
+        """Test an invalid fsync policy is rejected."""
+        with pytest.raises(AIAgentException):
+            ConversationLog(str(tmp_path / "x.jsonl"), fsync="sometimes")
+
+
+@pytest.fixture
+def store(tmp_path):
+    """SQLite conversation store in a temporary directory."""
+    store = SQLiteConversationStore(tmp_path / "store.sqlite3")
+    yield store
+    store.close()
+
+
+class TestConversationStore:
+
+    def test_sessions_are_listed_by_filter(self, store):
+        """Test listing sessions by agent, model and update time."""
+        store.create_session("a", agent_name="Bot", model="gpt-4",
+                             created_at=100.0)
+        store.create_session("b", agent_name="Bot", model="gpt-3.5-turbo",
+                             created_at=200.0)
+        store.create_session("c", agent_name="Other", model="gpt-4",
+                             created_at=300.0)
+
+        def ids(**filters):
+            return [s.session_id for s in store.list_sessions(**filters)]
+
+        assert ids() == ["c", "b", "a"]
+        assert ids(agent_name="Bot") == ["b", "a"]
+        assert ids(model="gpt-4") == ["c", "a"]
+        assert ids(since=150.0, until=250.0) == ["b"]
+        assert ids(limit=1, offset=1) == ["b"]
+        with pytest.raises(AIAgentException):
+            store.create_session("a")
+
+    def test_messages_are_paged_by_sequence(self, store):
+        """Test loading the last messages before a sequence number."""
+        store.create_session("s")
+        count = store.append_messages(
+            "s", [Message(role="user", content=str(i)) for i in range(10)]
+        )
+        assert count == 10
+        assert store.get_session("s").message_count == 10
+
+        def contents(**kwargs):
+            return [m.content for m in store.load_messages("s", **kwargs)]
+
+        assert contents(limit=3) == ["7", "8", "9"]
+        assert contents(limit=3, before=7) == ["4", "5", "6"]
+        assert len(contents()) == 10
+
+        store.clear_messages("s")
+        assert contents() == []
+        assert store.append_messages(
+            "s", [Message(role="user", content="again")]
+        ) == 1
+        with pytest.raises(AIAgentException):
+            store.append_messages("missing", [])
+
+    @pytest.mark.asyncio
+    async def test_agent_pages_history_through_store(
+            self, agent_with_mock_provider, mock_settings, store):
+        """Test an attached agent keeps only recent messages resident."""
+        agent = agent_with_mock_provider
+        agent.provider.chat = AsyncMock(return_value=ChatResponse(
+            content="Hi!", model="gpt-3.5-turbo"
+        ))
+        session_id = agent.attach_store(store, resident_messages=4)
+        for i in range(5):
+            await agent.chat(f"Message {i}")
+
+        assert store.get_session(session_id).message_count == 10
+        resident = len(agent.conversation_history)
+        assert 4 <= resident < 5
+        assert agent.conversation_history[-1].content == "Hi!"
+        summary = agent.get_conversation_summary()
+        assert summary["total_messages"] == 10
+        assert summary["messages_by_role"] == {"user": 5, "assistant": 5}
+
+        assert agent.load_older_messages(100) == 10 - resident
+        assert len(agent.conversation_history) == 10
+        assert agent.conversation_history[0].content == "Message 0"
+
+        agent.set_system_prompt("Be brief.")
+        resumed = AIAgent(settings=mock_settings, provider=agent.provider)
+        resumed.attach_store(store, session_id, resident_messages=2)
+        assert resumed.system_prompt == "Be brief."
+        assert [m.content for m in resumed.conversation_history] == [
+            "Message 4", "Hi!"
+        ]
+        summary = resumed.get_conversation_summary()
+        assert summary["total_messages"] == 10
+        assert summary["user_messages"] == 5
+        assert summary["assistant_messages"] == 5
+
+    def test_import_saved_conversations(self, agent_with_mock_provider,
+                                        store, tmp_path):
+        """Test JSON and JSONL files are imported once each."""
+        agent = agent_with_mock_provider
+        agent.conversation_history = [
+            Message(role="user", content="Hello"),
+            Message(role="assistant", content="Hi!"),
+        ]
+        save_dir = tmp_path / "conversations"
+        agent.save_conversation(str(save_dir / "first.json"))
+        agent.save_conversation(str(save_dir / "second.jsonl"))
+
+        assert import_conversations(store, [save_dir]) == 2
+        assert import_conversations(store, [save_dir]) == 0
+
+        info = store.get_session(import_session_id(save_dir / "first.json"))
+        assert info.agent_name == "Test Agent"
+        assert info.message_count == 2
+        second = import_session_id(save_dir / "second.jsonl")
+        assert [m.content for m in store.load_messages(second)] == [
+            "Hello", "Hi!"
+        ]
+
+    def test_import_keeps_same_named_files_apart(
+            self, agent_with_mock_provider, store, tmp_path):
+        """Test files sharing a stem become separate sessions."""
+        agent = agent_with_mock_provider
+        agent.conversation_history = [Message(role="user", content="Hi")]
+        paths = [tmp_path / "a" / "chat.json", tmp_path / "a" / "chat.jsonl",
+                 tmp_path / "b" / "chat.json"]
+        for path in paths:
+            agent.save_conversation(str(path))
+
+        assert import_conversations(store, paths + [paths[0]]) == 3
+        assert len({import_session_id(path) for path in paths}) == 3
+        assert import_session_id(paths[0]).startswith("chat-")